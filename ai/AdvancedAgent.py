@@ -1,11 +1,94 @@
 from ai.base_agent import BaseAgent
-from ai.algorithm import Minimax
+from ai.algorithm import Minimax, MAX_DEPTH
+from ai.endgame import EndgameSolver, DEFAULT_ENDGAME_EMPTIES
+from ai.opening_book import OpeningBook
+from ai.search_stats import SearchStats
+from ai.selective import LMR_MOVES, LMR_REDUCTION, PROBCUT_CONFIDENCE
+from ai.transposition import TranspositionTable
+import time
 
 class AdvancedAgent(BaseAgent):
-    def __init__(self, color):
+    DEFAULT_DEPTH = 5
+
+    def __init__(self, color, depth=None, time_limit=None, node_limit=None, workers=1, tt_size_mb=32,
+                 endgame_empties=DEFAULT_ENDGAME_EMPTIES, wld_empties=DEFAULT_ENDGAME_EMPTIES + 2, use_book=False,
+                 pattern_eval=True, weights=None, probcut=False, probcut_confidence=PROBCUT_CONFIDENCE,
+                 lmr=False, lmr_moves=LMR_MOVES, lmr_reduction=LMR_REDUCTION):
         super().__init__(color)
-        self.ai = Minimax()
+        # One transposition table for the whole game, so results carry over between moves
+        self.tt = TranspositionTable(size_mb=tt_size_mb)
+        # workers > 1 splits the search across that many processes;
+        # pattern_eval scores leaves with the pattern tables instead of the disc count,
+        # read from the weight file `weights` if given (see ai.training);
+        # probcut and lmr make the search selective (see ai.selective)
+        self.ai = Minimax(transposition_table=self.tt, workers=workers, pattern_eval=pattern_eval, weights=weights,
+                          probcut=probcut, probcut_confidence=probcut_confidence,
+                          lmr=lmr, lmr_moves=lmr_moves, lmr_reduction=lmr_reduction)
+
+        # With a time/node budget the search deepens until the budget runs out
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        if depth is None:
+            depth = self.DEFAULT_DEPTH if time_limit is None and node_limit is None else MAX_DEPTH
+        self.depth = depth
+
+        # Early positions can come straight from the precomputed opening book, if one was built.
+        # Off by default: against the same agent without it, the book has not yet shown a gain.
+        self.book = OpeningBook.default() if use_book else None
+
+        # Perfect play once few squares are left: exact margin at endgame_empties,
+        # win/loss/draw only at wld_empties. The solver shares the time/node budget and
+        # falls back to the search if it runs out; with a depth only, it is used once the
+        # search would reach the end of the game anyway.
+        self.solver = EndgameSolver()
+        self.endgame_empties = endgame_empties
+        self.wld_empties = max(wld_empties, endgame_empties)
+
+    def close(self):
+        self.ai.close()
+
+    def set_stop_event(self, event):
+        self.ai.stop_event = event
+        self.solver.stop_event = event
 
     def get_move(self, board):
-        
-        return self.ai.get_move_using_minimax(board, self.color, depth=5)
+        self.status = None
+        # time_limit covers the whole move: the search only gets what the solver left
+        start = time.perf_counter()
+        if self.book:
+            move = self.book.get_move(board, self.color)
+            if move:
+                self.status = "book"
+                self.stats = SearchStats.without_search("book", self.color, move)
+                return move
+
+        # The solver works on 8x8 bitboards; other sizes are searched to the end instead
+        empties = board.empty_count
+        budgeted = self.time_limit is not None or self.node_limit is not None
+        solver_nodes = 0
+        if empties <= self.wld_empties and board.size == 8 and (budgeted or empties <= self.depth + 1):
+            wld = empties > self.endgame_empties
+            result = self.solver.solve(board, self.color, wld=wld, time_limit=self.time_limit,
+                                       node_limit=self.node_limit)
+            solver_nodes = self.solver.nodes
+            if result is not None:
+                move, score = result
+                self.stats = SearchStats.without_search("solver", self.color, move, score=score, depth=empties,
+                                                        nodes=self.solver.nodes,
+                                                        elapsed=time.perf_counter() - start)
+                if wld:
+                    self.status = "solved (" + ("win" if score > 0 else "loss" if score < 0 else "draw") + ")"
+                else:
+                    self.status = f"solved ({score:+d})"
+                return move
+
+        time_limit = self.time_limit
+        if time_limit is not None:
+            time_limit = max(0.0, time_limit - (time.perf_counter() - start))
+        node_limit = self.node_limit
+        if node_limit is not None:
+            node_limit = max(0, node_limit - solver_nodes)
+        self.ai.on_progress = self.on_progress
+        move, self.stats = self.ai.search(board, self.color, depth=self.depth,
+                                          time_limit=time_limit, node_limit=node_limit)
+        return move
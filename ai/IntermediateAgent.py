@@ -1,11 +1,46 @@
 from ai.base_agent import BaseAgent
-from ai.algorithm import Minimax
+from ai.algorithm import Minimax, MAX_DEPTH
+from ai.opening_book import OpeningBook
+from ai.search_stats import SearchStats
+from ai.transposition import TranspositionTable
 
 class IntermediateAgent(BaseAgent):
-    def __init__(self, color):
+    DEFAULT_DEPTH = 3
+
+    def __init__(self, color, depth=None, time_limit=None, node_limit=None, workers=1, tt_size_mb=8, use_book=False):
         super().__init__(color)
-        self.ai = Minimax()
+        # One transposition table for the whole game, so results carry over between moves
+        self.tt = TranspositionTable(size_mb=tt_size_mb)
+        # workers > 1 splits the search across that many processes
+        self.ai = Minimax(transposition_table=self.tt, workers=workers)
+
+        # With a time/node budget the search deepens until the budget runs out
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        if depth is None:
+            depth = self.DEFAULT_DEPTH if time_limit is None and node_limit is None else MAX_DEPTH
+        self.depth = depth
+
+        # Early positions can come straight from the precomputed opening book, if one was built.
+        # Off by default: against the same agent without it, the book has not yet shown a gain.
+        self.book = OpeningBook.default() if use_book else None
+
+    def close(self):
+        self.ai.close()
+
+    def set_stop_event(self, event):
+        self.ai.stop_event = event
 
     def get_move(self, board):
-        
-        return self.ai.get_move_using_minimax(board, self.color, depth=3)
+        self.status = None
+        if self.book:
+            move = self.book.get_move(board, self.color)
+            if move:
+                self.status = "book"
+                self.stats = SearchStats.without_search("book", self.color, move)
+                return move
+
+        self.ai.on_progress = self.on_progress
+        move, self.stats = self.ai.search(board, self.color, depth=self.depth,
+                                          time_limit=self.time_limit, node_limit=self.node_limit)
+        return move
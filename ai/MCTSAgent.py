@@ -0,0 +1,40 @@
+from ai.base_agent import BaseAgent
+from ai.mcts import MCTS, EXPLORATION, DEFAULT_MAX_NODES
+
+class MCTSAgent(BaseAgent):
+    # Playouts per move when no time limit is given
+    DEFAULT_PLAYOUTS = 3000
+
+    def __init__(self, color, time_limit=None, playouts=None, exploration=EXPLORATION, max_nodes=DEFAULT_MAX_NODES,
+                 policy='heuristic', reuse=True, seed=None):
+        super().__init__(color)
+        # One tree for the whole game: the next move starts from the subtree of the position reached
+        self.ai = MCTS(exploration=exploration, max_nodes=max_nodes, policy=policy, seed=seed)
+        self.reuse = reuse
+
+        # Searches until the time runs out and/or the playouts are done
+        self.time_limit = time_limit
+        if playouts is None and time_limit is None:
+            playouts = self.DEFAULT_PLAYOUTS
+        self.playouts = playouts
+
+    def set_stop_event(self, event):
+        self.ai.stop_event = event
+
+    def ponder(self, board, player):
+        # Searching the opponent's replies one by one would move the tree onto each of them
+        # in turn; growing it at the current position keeps every reply under the root
+        if not self.reuse:
+            return False
+        self.ai.on_progress = None
+        self.ai.search(board, player)
+        return True
+
+    def get_move(self, board):
+        if not self.reuse:
+            self.ai.reset()
+        self.ai.on_progress = self.on_progress
+        move, self.stats = self.ai.search(board, self.color, time_limit=self.time_limit, playouts=self.playouts)
+        reused = f", {self.stats.reused} reused" if self.stats.reused else ""
+        self.status = f"{self.stats.nodes} playouts{reused}"
+        return move
@@ -1,74 +1,741 @@
-from core.board import Board
-from core.constants import BLACK, WHITE
-from core.game_state import GameState
-from .board_evaluation import BoardEvaluation
-import math
-
-class Minimax: 
-    def __init__ (self):
-        self.evaluate = BoardEvaluation()
-
-    def get_move_using_minimax(self,game, player, depth = 4):
-        if player == 1:
-            max_move = None
-            max_eval = -math.inf
-            moves_evals = []
-            for valid_move in game.get_valid_moves(player):
-                current_game = game.make_move(valid_move[0], valid_move[1], player)
-                current_eval = self.minimax(current_game, depth, -player, alpha = -math.inf, beta = math.inf)
-                moves_evals.append((valid_move, current_eval))
-                
-                if current_eval > max_eval:
-                    max_eval = current_eval
-                    max_move = valid_move
-            #print("Maximize")
-            #print(moves_evals)
-            return max_move
-        else:
-            min_move = None
-            min_eval = math.inf
-            moves_evals = []
-            for valid_move in game.get_valid_moves(player):
-                current_game = game.make_move(valid_move[0], valid_move[1], player)
-                current_eval = self.minimax(current_game, depth, -player, alpha = -math.inf, beta = math.inf)
-                moves_evals.append((valid_move, current_eval))
-                
-                if current_eval < min_eval:
-                    min_eval = current_eval
-                    min_move = valid_move
-            #print("Minimize")
-            #print(moves_evals)
-            return min_move
-    
-    def minimax (self,state, depth, player, alpha, beta):
-        if depth == 0:
-            return self.evaluate.evaluate_board(state, -player)
-        
-        if player == 1:
-            if len(state.get_valid_moves(player)) == 0:
-                return self.evaluate.evaluate_board(state, player)
-            maxEval = -math.inf
-            for move in state.get_valid_moves(player):
-                new_state = state.make_move(move[0],move[1], player)
-                evaluation = self.minimax(new_state, depth-1, -player, alpha, beta)
-                maxEval = max(maxEval, evaluation)
-                alpha = max(alpha, evaluation)
-                if beta <= alpha:
-                    break
-            return maxEval
-        
-        else:
-            if len(state.get_valid_moves(player)) == 0:
-                return self.evaluate.evaluate_board(state, player)
-            minEval = math.inf
-            for move in state.get_valid_moves(player):
-                new_state = state.make_move(move[0],move[1], player)
-                evaluation = self.minimax(new_state, depth-1, -player, alpha, beta)
-                minEval = min(minEval, evaluation)
-                beta = min(beta, evaluation)
-                if beta <= alpha:
-                    break
-            return minEval
-        
-
-    
+from core.board import Board, BoardGeometry
+from core.constants import BLACK, WHITE, MAX_SQUARES
+from core.zobrist import ZOBRIST_SIDE
+from .board_evaluation import BoardEvaluation
+from .pattern_evaluation import PatternEvaluation, load_weights
+from .move_generator import MoveGenerator, ordering
+from .transposition import EXACT, LOWER, UPPER, NO_MOVE, TranspositionTable
+from .search_stats import SearchStats
+from .selective import (LMR_MIN_DEPTH, LMR_MOVES, LMR_REDUCTION, PROBCUT_CONFIDENCE, PROBCUT_MIN_DEPTH,
+                        PROBCUT_PHASE_EMPTIES, PROBCUT_PHASES, fitted_probcut, load_probcut, probcut_checks)
+import concurrent.futures
+import math
+import multiprocessing
+import time
+
+# Deepest search that can matter: a game never has more than 60 moves
+MAX_DEPTH = 60
+# Room for passes on top of MAX_DEPTH when indexing per-ply tables
+MAX_PLY = 2 * MAX_DEPTH + 4
+# How many nodes to search between two wall-clock checks
+CHECK_INTERVAL = 256
+# Larger than any evaluation
+INF = 10 ** 9
+# Half-width of the root search window around the previous iteration's score, in discs
+ASPIRATION_WINDOW = 4
+# Shallower root iterations are cheaper to search serially than to ship to workers
+PARALLEL_MIN_DEPTH = 3
+# Seconds between budget checks while waiting for parallel workers
+WORKER_POLL_INTERVAL = 0.02
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the per-move time or node budget runs out."""
+
+
+class Minimax:
+    """
+    Iterative-deepening principal variation search (negamax with alpha-beta).
+
+    Scores are from the point of view of the side to move. Moves are ordered by the
+    previous iteration's principal variation / transposition table move, two killer
+    moves per ply, a history table and a static square ranking (corners first,
+    X/C-squares last).
+
+    With workers > 1 the root moves of deeper iterations are split across a process
+    pool (see _search_root_parallel); the chosen move is the same as with workers=1,
+    unless the search is selective (the pruning depends on each process's table).
+
+    pattern_eval=True scores leaves with PatternEvaluation instead of the disc count;
+    its pattern indices follow the search board move by move. weights names a weight
+    file for it (default: the exported weights, see ai.training). The patterns are
+    8x8 ones, so boards of other sizes are always scored by disc count.
+
+    probcut=True and lmr=True turn on the selective search of ai.selective: ProbCut
+    prunes null-window nodes from shallow searches (table from probcut_table, default
+    the fitted one; 8x8 only) and late-move reductions search late moves shallower
+    first. Both are off by default, since they may change the move found.
+    """
+    def __init__ (self, transposition_table=None, workers=1, worker_tt_size_mb=16, pattern_eval=False, weights=None,
+                  probcut=False, probcut_confidence=PROBCUT_CONFIDENCE, probcut_table=None,
+                  lmr=False, lmr_moves=LMR_MOVES, lmr_depth=LMR_MIN_DEPTH, lmr_reduction=LMR_REDUCTION):
+        # Everything a worker process needs to build the same search (see _init_worker)
+        self.options = dict(pattern_eval=pattern_eval, weights=weights, probcut=probcut,
+                            probcut_confidence=probcut_confidence, probcut_table=probcut_table,
+                            lmr=lmr, lmr_moves=lmr_moves, lmr_depth=lmr_depth, lmr_reduction=lmr_reduction)
+        self.pattern_eval = pattern_eval
+        self.weights = weights
+        self._disc_eval = BoardEvaluation()
+        self._pattern_eval = PatternEvaluation(load_weights(weights) if weights else None) if pattern_eval else None
+        self.probcut_confidence = probcut_confidence
+        self._probcut_table = None
+        if probcut:
+            self._probcut_table = load_probcut(probcut_table) if probcut_table else fitted_probcut()
+        self.lmr = lmr
+        self.lmr_moves = lmr_moves
+        self.lmr_depth = lmr_depth
+        self.lmr_reduction = lmr_reduction
+        # Evaluation, move ordering and board size of the board being searched (see _prepare)
+        self._prepare_size(8)
+        # Optional TranspositionTable; agents pass one in and keep it for the whole game
+        self.tt = transposition_table
+
+        # Parallel search: the pool is started on first use and reused for the whole game
+        self.workers = workers
+        self.worker_tt_size_mb = worker_tt_size_mb
+        self._pool = None
+        self._shared_alpha = None
+        self._abort = None
+        # Counts searches; workers start from empty tables whenever it changes (see _search_root_move)
+        self._search_id = 0
+        # Set from another thread or process to make the running search raise SearchTimeout
+        self.stop_event = None
+
+        # Move-ordering state
+        self.killers = [[NO_MOVE, NO_MOVE] for _ in range(MAX_PLY)]
+        self.history = {BLACK: [0] * MAX_SQUARES, WHITE: [0] * MAX_SQUARES}
+        self.pv = []
+        self._pv_tail = []
+        self._root_moves = 0
+
+        # Budget and bookkeeping of the running search (see get_move_using_minimax)
+        self.deadline = None
+        self.node_limit = None
+        self.nodes = 0
+        self.completed_depth = None
+        self.last_score = None
+        self.nodes_per_depth = []
+        # Seconds from the start of the search until each depth completed
+        self.time_to_depth = []
+        # Work counters of the running search (see SearchStats)
+        self.leaves = 0
+        self.cutoffs = 0
+        self.first_cutoffs = 0
+        self.probcut_tries = 0
+        self.probcut_cuts = 0
+        self.lmr_reductions = 0
+        self.lmr_researches = 0
+        self._tt_probes_before = 0
+        self._tt_hits_before = 0
+
+        # SearchStats of the last search; on_progress(stats), if set, also gets one per completed depth
+        self.stats = None
+        self.on_progress = None
+
+    def get_move_using_minimax(self,game, player, depth = 4, time_limit=None, node_limit=None):
+        """
+        Searches `depth` plies below the root move, deepening iteratively. With a
+        time_limit (seconds) and/or node_limit it stops when the budget runs out and
+        returns the best move of the last depth that finished.
+        """
+        return self.search(game, player, depth, time_limit, node_limit)[0]
+
+    def search(self, game, player, depth=4, time_limit=None, node_limit=None):
+        """Same as get_move_using_minimax, returning (move, SearchStats)."""
+        # The search walks one private board with apply/undo instead of copying per node
+        board = game.copy()
+        self._new_search()
+        self._prepare(board)
+        start = time.perf_counter()
+
+        # Search undo clears the board's move cache, so keep the root moves for every iteration
+        self._root_moves = board.valid_moves_mask(player)
+        if self._root_moves & (self._root_moves - 1) == 0:
+            move = divmod(self._root_moves.bit_length() - 1, self.size) if self._root_moves else None
+            self.stats = self._make_stats(player, move, start, finished=True)
+            return move, self.stats
+
+        best_move = None
+        score = None
+        # Line of the last completed iteration: an aborted one may have left part of its own in self.pv
+        completed_pv = []
+        for current_depth in range(min(depth, MAX_DEPTH) + 1):
+            # The first iteration always completes so there is a move to fall back on
+            if best_move is not None:
+                self.deadline = start + time_limit if time_limit is not None else None
+                self.node_limit = node_limit
+            nodes_before = self.nodes
+            try:
+                best_move, score = self._aspiration_search(board, player, current_depth, score)
+            except SearchTimeout:
+                # The aborted iteration leaves the private board mid-line; it is not used again
+                self.pv = completed_pv
+                break
+            completed_pv = list(self.pv)
+            self.completed_depth = current_depth
+            self.last_score = score
+            self.nodes_per_depth.append(self.nodes - nodes_before)
+            self.time_to_depth.append(time.perf_counter() - start)
+            if self.on_progress is not None:
+                self.on_progress(self._make_stats(player, divmod(best_move, self.size), start))
+
+            # A deeper iteration costs several times the last one; don't start what can't finish
+            if time_limit is not None and time.perf_counter() - start > time_limit / 2:
+                break
+            if board.empty_count <= current_depth + 1:
+                break # already searched to the end of the game
+
+        self.deadline = None
+        self.node_limit = None
+        # No move only if stop_event interrupted the very first iteration
+        move = divmod(best_move, self.size) if best_move is not None else None
+        self.stats = self._make_stats(player, move, start, finished=True)
+        return move, self.stats
+
+    def score_moves(self, game, player, depth=4, time_limit=None, node_limit=None, on_depth=None):
+        """
+        Exact score of every legal move rather than just the best one: each root move
+        gets a full-window search, deepening iteratively like search(). Returns
+        ([(move, score, line)] best first, SearchStats); line is the expected
+        continuation starting with the move. Results are those of the deepest
+        iteration that finished; the first one always does. on_depth(results, stats),
+        if given, gets the same pair after every iteration, so callers can show the
+        analysis while it deepens (stop it with stop_event).
+        """
+        board = game.copy()
+        self._new_search()
+        self._prepare(board)
+        start = time.perf_counter()
+        self._root_moves = board.valid_moves_mask(player)
+
+        results = []
+        order = MoveGenerator.static_order(self._root_moves, self._order_groups)
+        tracker = self._tracker
+        for current_depth in range(min(depth, MAX_DEPTH) + 1):
+            if results:
+                self.deadline = start + time_limit if time_limit is not None else None
+                self.node_limit = node_limit
+            scored = []
+            try:
+                for sq in order:
+                    record = board.apply_square(sq, player)
+                    if tracker is not None:
+                        tracker.on_apply(record)
+                    score = -self.negamax(board, current_depth, -player, -INF, INF, 1)
+                    line = [sq] + self._pv_tail
+                    board.undo(record)
+                    if tracker is not None:
+                        tracker.on_undo(record)
+                    scored.append((score, sq, line))
+            except SearchTimeout:
+                break
+            scored.sort(key=lambda item: item[0], reverse=True)
+            results = scored
+            order = [sq for _, sq, _ in scored]
+            self.completed_depth = current_depth
+            self.last_score = scored[0][0] if scored else None
+            self.pv = scored[0][2] if scored else []
+            self.time_to_depth.append(time.perf_counter() - start)
+            if on_depth is not None and scored:
+                on_depth(self._scored_moves(results), self._make_stats(player, divmod(scored[0][1], self.size), start))
+
+            if time_limit is not None and time.perf_counter() - start > time_limit / 2:
+                break
+            if board.empty_count <= current_depth + 1:
+                break
+
+        self.deadline = None
+        self.node_limit = None
+        move = divmod(results[0][1], self.size) if results else None
+        self.stats = self._make_stats(player, move, start, finished=True)
+        return self._scored_moves(results), self.stats
+
+    def _scored_moves(self, results):
+        return [(divmod(sq, self.size), score, SearchStats.pv_from_squares(line, self.size))
+                for score, sq, line in results]
+
+    def _make_stats(self, player, move, start, finished=False):
+        stats = SearchStats(player)
+        stats.move = move
+        stats.score = self.last_score
+        stats.depth = self.completed_depth
+        stats.nodes = self.nodes
+        stats.leaves = self.leaves
+        stats.cutoffs = self.cutoffs
+        stats.first_cutoffs = self.first_cutoffs
+        stats.probcut_tries = self.probcut_tries
+        stats.probcut_cuts = self.probcut_cuts
+        stats.lmr_reductions = self.lmr_reductions
+        stats.lmr_researches = self.lmr_researches
+        stats.elapsed = time.perf_counter() - start
+        if self.tt is not None:
+            stats.tt_probes = self.tt.probes - self._tt_probes_before
+            stats.tt_hits = self.tt.hits - self._tt_hits_before
+        stats.pv = SearchStats.pv_from_squares(self.pv, self.size)
+        stats.nodes_per_depth = list(self.nodes_per_depth)
+        stats.time_to_depth = list(self.time_to_depth)
+        stats.finished = finished
+        return stats
+
+    def _new_search(self):
+        self._search_id += 1
+        if self.tt is not None:
+            self.tt.new_search()
+            self._tt_probes_before = self.tt.probes
+            self._tt_hits_before = self.tt.hits
+        self.nodes = 0
+        self.leaves = 0
+        self.cutoffs = 0
+        self.first_cutoffs = 0
+        self.probcut_tries = 0
+        self.probcut_cuts = 0
+        self.lmr_reductions = 0
+        self.lmr_researches = 0
+        self.completed_depth = None
+        self.last_score = None
+        self.nodes_per_depth = []
+        self.time_to_depth = []
+        self.deadline = None
+        self.node_limit = None
+        self.pv = []
+        for killers in self.killers:
+            killers[0] = killers[1] = NO_MOVE
+        # Age the history so the previous position's cutoffs count for less
+        for table in self.history.values():
+            for sq in range(len(table)):
+                table[sq] >>= 1
+
+    def _prepare(self, board):
+        """Sets the search up for board's size and syncs the pattern tracker with it."""
+        if board.size != self.size:
+            self._prepare_size(board.size)
+        if self._tracker is not None:
+            self._tracker.sync(board)
+
+    def _prepare_size(self, size):
+        self.size = size
+        if self._pattern_eval is not None and size == 8:
+            self.evaluate = self._pattern_eval
+            # Told about every apply/undo on the search board
+            self._tracker = self._pattern_eval
+        else:
+            self.evaluate = self._disc_eval
+            self._tracker = None
+        self.aspiration_window = ASPIRATION_WINDOW * self.evaluate.scale
+        self._order_groups, self._order_bonus = ordering(size)
+        # legal_moves_bb on 8x8 boards
+        self._legal_moves = BoardGeometry.of(size).legal_moves
+        # ProbCut checks per depth and phase; the table is fitted on 8x8 games
+        self._probcut = None
+        if self._probcut_table is not None and size == 8:
+            evaluation = 'pattern' if self.evaluate is self._pattern_eval else 'disc'
+            self._probcut = probcut_checks(self._probcut_table, evaluation, self.evaluate.scale,
+                                           self.probcut_confidence, MAX_PLY)
+
+    def _aspiration_search(self, board, player, depth, previous_score):
+        """Searches a narrow window around the previous score, widening on failure."""
+        if self.workers > 1 and depth >= PARALLEL_MIN_DEPTH:
+            search_root = self._search_root_parallel
+        else:
+            search_root = self._search_root
+        if previous_score is None:
+            return search_root(board, player, depth, -INF, INF)
+        alpha = previous_score - self.aspiration_window
+        beta = previous_score + self.aspiration_window
+        while True:
+            best_move, score = search_root(board, player, depth, alpha, beta)
+            if score <= alpha:
+                alpha = -INF
+            elif score >= beta:
+                beta = INF
+            else:
+                return best_move, score
+
+    def _search_root(self, board, player, depth, alpha, beta):
+        """
+        Returns (best square, score) for a search of `depth` plies below each root move.
+        The window is shared across root moves: later moves only need to beat the best so far.
+        """
+        moves = self._order_root_moves(board, player)
+        alpha_orig = alpha
+        best_score = -INF
+        best_move = moves[0]
+        tracker = self._tracker
+        for i, sq in enumerate(moves):
+            record = board.apply_square(sq, player)
+            if tracker is not None:
+                tracker.on_apply(record)
+            if i == 0:
+                score = -self.negamax(board, depth, -player, -beta, -alpha, 1)
+            else:
+                # Null-window probe: only re-search moves that might beat the current best
+                score = -self.negamax(board, depth, -player, -alpha - 1, -alpha, 1)
+                if alpha < score < beta:
+                    score = -self.negamax(board, depth, -player, -beta, -alpha, 1)
+            board.undo(record)
+            if tracker is not None:
+                tracker.on_undo(record)
+
+            if score > best_score:
+                best_score = score
+                best_move = sq
+                if score > alpha:
+                    alpha = score
+                    self.pv = [sq] + self._pv_tail
+                    if alpha >= beta:
+                        break
+
+        self._store(board, player, depth + 1, self._bound(best_score, alpha_orig, beta), best_score, best_move)
+        return best_move, best_score
+
+    def _search_root_parallel(self, board, player, depth, alpha, beta):
+        """
+        Same contract as _search_root, with the root moves split across the worker pool.
+
+        The first (principal variation) move is searched here to get a bound; the other
+        moves then run in the workers, which share the best score so far through
+        self._shared_alpha, so a move that starts late gets a narrower window. Workers
+        search (shared alpha - 1, beta), so every move that ties the best one comes back
+        with an exact score and the earliest of them in root order wins, as in the
+        serial search.
+        """
+        moves = self._order_root_moves(board, player)
+        alpha_orig = alpha
+
+        record = board.apply_square(moves[0], player)
+        if self._tracker is not None:
+            self._tracker.on_apply(record)
+        best_score = -self.negamax(board, depth, -player, -beta, -alpha, 1)
+        board.undo(record)
+        if self._tracker is not None:
+            self._tracker.on_undo(record)
+        best_index = 0
+        if best_score > alpha:
+            alpha = best_score
+            self.pv = [moves[0]] + self._pv_tail
+
+        if alpha < beta and len(moves) > 1:
+            pool = self._get_pool()
+            self._abort.clear()
+            self._shared_alpha.value = alpha
+            remaining_time = None
+            if self.deadline is not None:
+                remaining_time = max(0.0, self.deadline - time.perf_counter())
+            remaining_nodes = None
+            if self.node_limit is not None:
+                remaining_nodes = max(1, self.node_limit - self.nodes)
+
+            futures = [pool.submit(_search_root_move, self._search_id, board.black, board.white, board.size, player,
+                                   moves[i], depth, beta, remaining_time, remaining_nodes)
+                       for i in range(1, len(moves))]
+            try:
+                for i, future in enumerate(futures, start=1):
+                    while True:
+                        try:
+                            score, alpha_used, counts, line = future.result(timeout=WORKER_POLL_INTERVAL)
+                            break
+                        except concurrent.futures.TimeoutError:
+                            # Still notice stop_event (and the deadline) while the workers run
+                            self._check_budget()
+                    self._add_counts(counts)
+                    if score is None:
+                        raise SearchTimeout()
+                    # Below the window the worker started with: strictly worse than the best
+                    if score < alpha_used:
+                        continue
+                    if score > best_score:
+                        best_score = score
+                        best_index = i
+                        if score > alpha:
+                            alpha = score
+                            self.pv = [moves[i]] + line
+            finally:
+                # Stop whatever is still running before the next search reuses the pool
+                self._abort.set()
+                for future in futures:
+                    future.cancel()
+                concurrent.futures.wait(futures)
+
+        best_move = moves[best_index]
+        self._store(board, player, depth + 1, self._bound(best_score, alpha_orig, beta), best_score, best_move)
+        return best_move, best_score
+
+    def _get_pool(self):
+        if self._pool is None:
+            # spawn keeps workers independent of whatever threads (e.g. Tk) the parent runs
+            ctx = multiprocessing.get_context('spawn')
+            self._shared_alpha = ctx.Value('q', -INF)
+            self._abort = ctx.Event()
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=ctx, initializer=_init_worker,
+                initargs=(self._shared_alpha, self._abort, self.worker_tt_size_mb, self.options))
+        return self._pool
+
+    def reset_tables(self):
+        """Forgets the transposition table, killer moves and history, as in a new Minimax."""
+        if self.tt is not None:
+            self.tt.clear()
+        for killers in self.killers:
+            killers[0] = killers[1] = NO_MOVE
+        for table in self.history.values():
+            for sq in range(len(table)):
+                table[sq] = 0
+
+    def close(self):
+        """Shuts the worker pool down, if one was started."""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def negamax(self, state, depth, player, alpha, beta, ply):
+        """
+        Searches `state` in place; every move applied here is undone before returning.
+        Returns the score for `player`, the side to move.
+        """
+        self.nodes += 1
+        if self.nodes % CHECK_INTERVAL == 0:
+            self._check_budget()
+        self._pv_tail = []
+
+        if depth == 0:
+            self.leaves += 1
+            return self.evaluate.evaluate_board(state, player)
+
+        if player == BLACK:
+            own, opp = state.black, state.white
+        else:
+            own, opp = state.white, state.black
+        legal_moves = self._legal_moves
+        moves = legal_moves(own, opp)
+        if not moves:
+            if not legal_moves(opp, own):
+                self.leaves += 1
+                return self.evaluate.evaluate_board(state, player) # game over
+            # Pass: the opponent moves again from the same position
+            score = -self.negamax(state, depth, -player, -beta, -alpha, ply + 1)
+            self._pv_tail = [NO_MOVE] + self._pv_tail
+            return score
+
+        # Transposition table: reuse an earlier result for this position if it is deep enough
+        alpha_orig = alpha
+        tt_move = NO_MOVE
+        if self.tt is not None:
+            entry = self.tt.probe(state.hash ^ ZOBRIST_SIDE if player == WHITE else state.hash)
+            if entry is not None:
+                tt_depth, bound, value, tt_move = entry
+                if tt_depth >= depth:
+                    if bound == EXACT:
+                        return value
+                    if bound == LOWER:
+                        alpha = max(alpha, value)
+                    else:
+                        beta = min(beta, value)
+                    if alpha >= beta:
+                        return value
+
+        # ProbCut: a shallow search predicts that this null-window node fails high or low
+        if self._probcut is not None and depth >= PROBCUT_MIN_DEPTH and beta - alpha == 1:
+            phase = min(state.empty_count // PROBCUT_PHASE_EMPTIES, PROBCUT_PHASES - 1)
+            for shallow, a, b, margin in self._probcut[depth][phase]:
+                self.probcut_tries += 1
+                # Predicted deep value a * v + b at least beta + margin ...
+                bound = math.ceil((beta + margin - b) / a)
+                if self.negamax(state, shallow, player, bound - 1, bound, ply) >= bound:
+                    self.probcut_cuts += 1
+                    self._pv_tail = []
+                    return beta
+                # ... or at most alpha - margin
+                bound = math.floor((alpha - margin - b) / a)
+                if self.negamax(state, shallow, player, bound, bound + 1, ply) <= bound:
+                    self.probcut_cuts += 1
+                    self._pv_tail = []
+                    return alpha
+
+        if depth == 1:
+            # Children are leaves: static ordering is all that pays for itself here
+            ordered = MoveGenerator.static_order(moves, self._order_groups)
+            if tt_move != NO_MOVE and moves & (1 << tt_move):
+                ordered.remove(tt_move)
+                ordered.insert(0, tt_move)
+        else:
+            ordered = self._order_moves(moves, player, ply, self._pv_move(ply, tt_move))
+
+        best_score = -INF
+        best_move = NO_MOVE
+        best_line = []
+        tracker = self._tracker
+        for i, sq in enumerate(ordered):
+            record = state.apply_square(sq, player)
+            if tracker is not None:
+                tracker.on_apply(record)
+            if i == 0 or depth == 1:
+                score = -self.negamax(state, depth - 1, -player, -beta, -alpha, ply + 1)
+            else:
+                # Late-move reduction: a shallower null-window search first, the full one only if it beats alpha
+                reduced = self.lmr and i >= self.lmr_moves and depth >= self.lmr_depth
+                if reduced:
+                    self.lmr_reductions += 1
+                    score = -self.negamax(state, max(0, depth - 1 - self.lmr_reduction), -player,
+                                          -alpha - 1, -alpha, ply + 1)
+                if not reduced or score > alpha:
+                    if reduced:
+                        self.lmr_researches += 1
+                    score = -self.negamax(state, depth - 1, -player, -alpha - 1, -alpha, ply + 1)
+                    if alpha < score < beta:
+                        score = -self.negamax(state, depth - 1, -player, -beta, -alpha, ply + 1)
+            state.undo(record)
+            if tracker is not None:
+                tracker.on_undo(record)
+
+            if score > best_score:
+                best_score = score
+                best_move = sq
+                if score > alpha:
+                    alpha = score
+                    best_line = [sq] + self._pv_tail
+                    if alpha >= beta:
+                        self.cutoffs += 1
+                        if i == 0:
+                            self.first_cutoffs += 1
+                        self._record_cutoff(sq, player, depth, ply)
+                        break
+
+        self._pv_tail = best_line
+        self._store(state, player, depth, self._bound(best_score, alpha_orig, beta), best_score, best_move)
+        return best_score
+
+    # --- MOVE ORDERING ---
+    def _order_moves(self, moves, player, ply, first_move):
+        """Squares of the `moves` bitboard, most promising first."""
+        history = self.history[player]
+        killer_1, killer_2 = self.killers[ply]
+        bonus = self._order_bonus
+        scored = []
+        for sq in MoveGenerator.static_order(moves, self._order_groups):
+            if sq == first_move:
+                key = 3 * INF
+            elif sq == killer_1:
+                key = 2 * INF
+            elif sq == killer_2:
+                key = 2 * INF - 1
+            else:
+                key = history[sq] + bonus[sq]
+            scored.append((key, sq))
+        scored.sort(reverse=True)
+        return [sq for _, sq in scored]
+
+    def _pv_move(self, ply, tt_move):
+        """The table's best move, else the previous iteration's principal-variation move at this ply."""
+        if tt_move == NO_MOVE and ply < len(self.pv):
+            return self.pv[ply]
+        return tt_move
+
+    def _order_root_moves(self, board, player):
+        """
+        Previous iteration's best move (else the table's), then the static ranking.
+        History is left out on purpose so serial and parallel searches see the same order.
+        """
+        first_move = NO_MOVE
+        if self.pv:
+            first_move = self.pv[0]
+        elif self.tt is not None:
+            entry = self.tt.probe(self._key(board, player))
+            if entry is not None:
+                first_move = entry[3]
+        moves = MoveGenerator.static_order(self._root_moves, self._order_groups)
+        if first_move in moves:
+            moves.remove(first_move)
+            moves.insert(0, first_move)
+        return moves
+
+    def _record_cutoff(self, sq, player, depth, ply):
+        killers = self.killers[ply]
+        if killers[0] != sq:
+            killers[1] = killers[0]
+            killers[0] = sq
+        self.history[player][sq] += depth * depth
+
+    # --- TRANSPOSITION TABLE HELPERS ---
+    @staticmethod
+    def _bound(score, alpha, beta):
+        if score <= alpha:
+            return UPPER
+        if score >= beta:
+            return LOWER
+        return EXACT
+
+    def _key(self, board, player):
+        return board.hash ^ ZOBRIST_SIDE if player == WHITE else board.hash
+
+    def _store(self, board, player, depth, bound, value, move):
+        if self.tt is None or move == NO_MOVE:
+            return
+        self.tt.store(self._key(board, player), depth, bound, value, move)
+
+    def _add_counts(self, counts):
+        """Adds a worker's counters (see _counts) to this search's."""
+        (nodes, leaves, cutoffs, first_cutoffs, probcut_tries, probcut_cuts,
+         lmr_reductions, lmr_researches) = counts
+        self.nodes += nodes
+        self.leaves += leaves
+        self.cutoffs += cutoffs
+        self.first_cutoffs += first_cutoffs
+        self.probcut_tries += probcut_tries
+        self.probcut_cuts += probcut_cuts
+        self.lmr_reductions += lmr_reductions
+        self.lmr_researches += lmr_researches
+
+    def _check_budget(self):
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            raise SearchTimeout()
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise SearchTimeout()
+
+
+# --- PARALLEL SEARCH WORKERS ---
+# Each worker process keeps one Minimax (and its transposition table) for its lifetime.
+# Its tables carry over between the root moves of one search, but not to the next
+# search: entries left by an earlier search can change which of two equal moves wins,
+# and the parallel search must pick the same move as the serial one.
+_worker_search = None
+_worker_shared_alpha = None
+_worker_search_id = None
+
+
+def _init_worker(shared_alpha, abort, tt_size_mb, options):
+    global _worker_search, _worker_shared_alpha
+    _worker_search = Minimax(TranspositionTable(size_mb=tt_size_mb), **options)
+    _worker_search.stop_event = abort
+    _worker_shared_alpha = shared_alpha
+
+
+def _search_root_move(search_id, black, white, size, player, sq, depth, beta, time_limit, node_limit):
+    """
+    Searches one root move in a worker with the window (shared alpha - 1, beta), so ties
+    with the best move are still resolved exactly. Returns (score, alpha used,
+    counters (see _counts), principal variation after sq);
+    score is None if the budget ran out.
+    """
+    global _worker_search_id
+    search = _worker_search
+    if search_id != _worker_search_id:
+        _worker_search_id = search_id
+        search.reset_tables()
+    search.nodes = search.leaves = search.cutoffs = search.first_cutoffs = 0
+    search.probcut_tries = search.probcut_cuts = search.lmr_reductions = search.lmr_researches = 0
+    search.pv = []
+    search.deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    search.node_limit = node_limit
+    if search.tt is not None:
+        search.tt.new_search()
+
+    board = Board.from_bitboards(black, white, size)
+    board.apply_square(sq, player)
+    search._prepare(board)
+    alpha = _worker_shared_alpha.value
+    try:
+        score = -search.negamax(board, depth, -player, -beta, -alpha + 1, 1)
+    except SearchTimeout:
+        return None, alpha, _counts(search), []
+
+    with _worker_shared_alpha.get_lock():
+        if score > _worker_shared_alpha.value:
+            _worker_shared_alpha.value = min(score, beta)
+    return score, alpha, _counts(search), search._pv_tail
+
+
+def _counts(search):
+    return (search.nodes, search.leaves, search.cutoffs, search.first_cutoffs,
+            search.probcut_tries, search.probcut_cuts, search.lmr_reductions, search.lmr_researches)
@@ -4,8 +4,29 @@ import math
 class BaseAgent:
     def __init__(self, color):
         self.color = color
+        # Short description of the last search (e.g. "solved (+4)"), shown in the status pill
+        self.status = None
+        # SearchStats of the last move, and an optional callback fed partial stats while searching
+        self.stats = None
+        self.on_progress = None
 
     def get_move(self, game_state):
         raise NotImplementedError("Subclasses must implement get_move()")
 
+    def set_stop_event(self, event):
+        """Makes a running get_move give up once event is set (None to clear). Agents that search override this."""
+        pass
+
+    def ponder(self, board, player):
+        """
+        Searches `board` (player, the opponent, to move) until the stop event is set, for
+        agents whose next get_move carries that search over. Returns False if the agent
+        has no such search; the controller then answers the opponent's moves one by one.
+        """
+        return False
+
+    def close(self):
+        """Releases background resources (e.g. search worker processes)."""
+        pass
+
 
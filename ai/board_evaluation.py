@@ -1,6 +1,9 @@
 from core.constants import BLACK
 
 class BoardEvaluation:
+    # Evaluation units per disc (see PatternEvaluation.scale)
+    scale = 1
+
     def evaluate_board (self,state, player):
         score = 0
         b, w = state.get_score()
@@ -0,0 +1,199 @@
+from core.board import FULL_MASK, legal_moves_bb, flips_bb, iter_bits
+from core.constants import BLACK
+from .algorithm import SearchTimeout, CHECK_INTERVAL
+import time
+
+# Enough empties for the solver to be worth calling by default (pure Python speed)
+DEFAULT_ENDGAME_EMPTIES = 12
+# Above this many empties moves are ordered fastest-first; below it parity alone is cheaper
+FASTEST_FIRST_EMPTIES = 7
+
+# Board quadrants, used for parity ordering: playing into a region with an odd
+# number of empties tends to leave the opponent the last move elsewhere.
+QUADRANTS = (0x000000000F0F0F0F, 0x00000000F0F0F0F0, 0x0F0F0F0F00000000, 0xF0F0F0F000000000)
+QUADRANT_OF = [0] * 64
+for _q, _mask in enumerate(QUADRANTS):
+    for _sq in iter_bits(_mask):
+        QUADRANT_OF[_sq] = _q
+
+# Corners first when everything else is equal
+_CORNERS = 0x8100000000000081
+
+
+def final_score(own, opp):
+    """Final disc margin for `own`, with the empty squares going to the winner."""
+    own_count = own.bit_count()
+    opp_count = opp.bit_count()
+    empties = 64 - own_count - opp_count
+    if own_count > opp_count:
+        return own_count - opp_count + empties
+    if own_count < opp_count:
+        return own_count - opp_count - empties
+    return 0
+
+
+class EndgameSolver:
+    """
+    Exact endgame search on raw bitboards: negamax with alpha-beta on the final disc margin.
+
+    Moves are ordered fastest-first (fewest replies for the opponent) with a parity
+    bonus for odd regions; the last four empties are played out without move
+    generation. wld=True solves win/loss/draw only with the narrow window (-1, 1).
+    """
+    def __init__(self):
+        self.nodes = 0
+        self.deadline = None
+        self.node_limit = None
+        # Set from another thread to make the running solve stop (see Minimax.stop_event)
+        self.stop_event = None
+
+    def solve(self, board, player, wld=False, time_limit=None, node_limit=None):
+        """
+        Returns (move (r, c), score) for player, or None if time_limit or node_limit ran out first.
+        score is the exact final disc margin, or -1/0/1 when wld is set.
+        """
+        if player == BLACK:
+            own, opp = board.black, board.white
+        else:
+            own, opp = board.white, board.black
+        moves = legal_moves_bb(own, opp)
+        if not moves:
+            return None
+
+        self.nodes = 0
+        self.deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        self.node_limit = node_limit
+        alpha, beta = (-1, 1) if wld else (-65, 65)
+        empties = FULL_MASK & ~(own | opp)
+        n_empties = empties.bit_count()
+
+        best_move = None
+        best_score = -65
+        try:
+            for sq in self._order(own, opp, moves, empties, n_empties):
+                move = 1 << sq
+                flips = flips_bb(own, opp, move)
+                score = -self._search(opp ^ flips, own | move | flips, -beta, -alpha, n_empties - 1, False)
+                if score > best_score:
+                    best_score = score
+                    best_move = sq
+                    if score > alpha:
+                        alpha = score
+                        if alpha >= beta:
+                            break
+        except SearchTimeout:
+            return None
+        finally:
+            self.deadline = None
+            self.node_limit = None
+
+        if wld:
+            best_score = (best_score > 0) - (best_score < 0)
+        return divmod(best_move, 8), best_score
+
+    def _search(self, own, opp, alpha, beta, n_empties, passed):
+        self.nodes += 1
+        if self.nodes % CHECK_INTERVAL == 0:
+            self._check_budget()
+
+        empties = FULL_MASK & ~(own | opp)
+        if n_empties <= 4:
+            return self._search_small(own, opp, alpha, beta, empties, n_empties, passed)
+
+        moves = legal_moves_bb(own, opp)
+        if not moves:
+            if passed:
+                return -final_score(opp, own)
+            return -self._search(opp, own, -beta, -alpha, n_empties, True)
+
+        best_score = -65
+        first = True
+        for sq in self._order(own, opp, moves, empties, n_empties):
+            move = 1 << sq
+            flips = flips_bb(own, opp, move)
+            new_own = opp ^ flips
+            new_opp = own | move | flips
+            if first:
+                score = -self._search(new_own, new_opp, -beta, -alpha, n_empties - 1, False)
+                first = False
+            else:
+                score = -self._search(new_own, new_opp, -alpha - 1, -alpha, n_empties - 1, False)
+                if alpha < score < beta:
+                    score = -self._search(new_own, new_opp, -beta, -alpha, n_empties - 1, False)
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best_score
+
+    def _search_small(self, own, opp, alpha, beta, empties, n_empties, passed):
+        """The last four or fewer empties: try each empty square directly, odd regions first."""
+        if n_empties == 0:
+            return final_score(own, opp)
+        if n_empties == 1:
+            return self._search_last(own, opp, empties)
+
+        squares = list(iter_bits(empties))
+        if n_empties > 2:
+            squares.sort(key=lambda sq: not (empties & QUADRANTS[QUADRANT_OF[sq]]).bit_count() & 1)
+
+        best_score = -65
+        moved = False
+        for sq in squares:
+            move = 1 << sq
+            flips = flips_bb(own, opp, move)
+            if not flips:
+                continue
+            moved = True
+            self.nodes += 1
+            score = -self._search_small(opp ^ flips, own | move | flips, -beta, -alpha,
+                                        empties ^ move, n_empties - 1, False)
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        return best_score
+        if moved:
+            return best_score
+        if passed:
+            return -final_score(opp, own)
+        return -self._search_small(opp, own, -beta, -alpha, empties, n_empties, True)
+
+    @staticmethod
+    def _search_last(own, opp, empties):
+        """One empty square left: whoever can play there does, then the game ends."""
+        flips = flips_bb(own, opp, empties)
+        if flips:
+            return final_score(own | empties | flips, opp ^ flips)
+        flips = flips_bb(opp, own, empties)
+        if flips:
+            return final_score(own ^ flips, opp | empties | flips)
+        return final_score(own, opp)
+
+    def _order(self, own, opp, moves, empties, n_empties):
+        """Squares of `moves`: fastest-first (fewest opponent replies), odd regions and corners first on ties."""
+        scored = []
+        for sq in iter_bits(moves):
+            move = 1 << sq
+            key = 0
+            if (empties & QUADRANTS[QUADRANT_OF[sq]]).bit_count() & 1:
+                key -= 1
+            if move & _CORNERS:
+                key -= 1
+            if n_empties > FASTEST_FIRST_EMPTIES:
+                flips = flips_bb(own, opp, move)
+                key += 4 * legal_moves_bb(opp ^ flips, own | move | flips).bit_count()
+            scored.append((key, sq))
+        scored.sort()
+        return [sq for _, sq in scored]
+
+    def _check_budget(self):
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            raise SearchTimeout()
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise SearchTimeout()
@@ -0,0 +1,370 @@
+"""
+Monte Carlo tree search (UCT) with the tree kept in flat arrays.
+
+Each iteration walks down the tree picking the child with the best upper confidence
+bound, expands the leaf it reaches (all its moves at once), plays the game out with
+fast moves on bitboards and backs the result up the path. The move played is the most
+visited child of the root.
+
+Nodes are not Python objects: node i is row i of a few typed arrays (the move that
+led to it, its first child and number of children, its visit count and result sum),
+and the children of a node are one contiguous block of rows. Positions are not
+stored either; the walk down applies each node's move to a pair of bitboards. The
+tree never grows past max_nodes rows, so memory stays bounded however long the game.
+
+Between moves the tree is kept: the next search looks for the new position among
+the descendants of the old root and carries that subtree over, compacted into fresh
+arrays, with its visits, instead of starting from nothing.
+"""
+from array import array
+import math
+import random
+import time
+
+from core.board import BoardGeometry, iter_bits, ray_flips
+from core.constants import BLACK
+from .move_generator import ordering
+from .search_stats import SearchStats
+from .transposition import NO_MOVE
+
+# Move of a node reached by passing (NO_MOVE, as in principal variations)
+PASS = NO_MOVE
+# first[] of a node whose children were not created yet, and of a finished game
+UNEXPANDED = -1
+TERMINAL = -2
+# Weight of the exploration term of UCB1, for results between 0 (loss) and 1 (win)
+EXPLORATION = 0.8
+# Rows the tree may use: about 20 bytes each
+DEFAULT_MAX_NODES = 400_000
+# Playouts between two checks of the clock and the stop event
+CHECK_INTERVAL = 32
+# Seconds between two on_progress reports
+PROGRESS_INTERVAL = 0.25
+# Moves searched for the new position when reusing the tree: ours, the reply and passes
+REUSE_PLIES = 4
+# Playout move choice: 'heuristic' takes corners and avoids X/C-squares, 'random' is uniform
+PLAYOUT_POLICIES = ('heuristic', 'random')
+
+
+class MCTSTree:
+    """The rows of the tree; node 0 is the root."""
+    def __init__(self):
+        self.move = array('b')      # square played to reach the node, PASS for a pass
+        self.first = array('i')     # row of the first child, UNEXPANDED or TERMINAL
+        self.count = array('H')     # number of children
+        self.visits = array('I')
+        self.value = array('d')     # sum of results for the player who made `move`
+        self.add(PASS, 1)
+
+    def __len__(self):
+        return len(self.move)
+
+    def add(self, move, count=1):
+        """Appends `count` fresh rows (children of one node share their block); returns the first one."""
+        start = len(self.move)
+        self.move.extend([move] * count)
+        self.first.extend([UNEXPANDED] * count)
+        self.count.extend([0] * count)
+        self.visits.extend([0] * count)
+        self.value.extend([0.0] * count)
+        return start
+
+    def subtree(self, node):
+        """A new tree holding the subtree under `node`, blocks renumbered in breadth-first order."""
+        tree = MCTSTree()
+        tree.visits[0] = self.visits[node]
+        tree.value[0] = self.value[node]
+        queue = [(node, 0)]
+        for old, new in queue:
+            first = self.first[old]
+            if first < 0:
+                tree.first[new] = first
+                continue
+            count = self.count[old]
+            start = len(tree.move)
+            tree.first[new] = start
+            tree.count[new] = count
+            tree.move.extend(self.move[first:first + count])
+            tree.first.extend([UNEXPANDED] * count)
+            tree.count.extend([0] * count)
+            tree.visits.extend(self.visits[first:first + count])
+            tree.value.extend(self.value[first:first + count])
+            queue.extend((first + i, start + i) for i in range(count))
+        return tree
+
+
+class MCTS:
+    """
+    UCT search over one tree that follows the game (see the module docstring).
+
+    search() runs until the time limit or the playout budget is used up (at least
+    one playout). Results count 1 for a win, 0.5 for a draw and 0 for a loss.
+    """
+    def __init__(self, exploration=EXPLORATION, max_nodes=DEFAULT_MAX_NODES, policy='heuristic', seed=None):
+        if policy not in PLAYOUT_POLICIES:
+            raise ValueError(f"unknown playout policy {policy!r} (expected one of {', '.join(PLAYOUT_POLICIES)})")
+        self.exploration = exploration
+        self.max_nodes = max_nodes
+        self.policy = policy
+        self.rng = random.Random(seed)
+        self.tree = MCTSTree()
+        # Position at the root of self.tree: (black, white, side to move, size), None before the first search
+        self.root = None
+        # Set from another thread to make the running search return early
+        self.stop_event = None
+        self.on_progress = None
+        self.stats = None
+        # Work of the last search
+        self.playouts = 0
+        self.reused = 0
+        self.max_depth = 0
+
+    def reset(self):
+        self.tree = MCTSTree()
+        self.root = None
+
+    def search(self, board, player, time_limit=None, playouts=None):
+        """Returns ((r, c) of the most visited move, SearchStats); None if player has no move."""
+        start = time.perf_counter()
+        self._prepare(board.size)
+        self._advance(board.black, board.white, player, board.size)
+        self.reused = self.tree.visits[0]
+        self.playouts = 0
+        self.max_depth = 0
+
+        moves = self._legal_moves(*self._sides(board.black, board.white, player))
+        if moves & (moves - 1) == 0:
+            # Nothing to choose: no move, or only one
+            move = divmod(moves.bit_length() - 1, board.size) if moves else None
+            self.stats = self._make_stats(player, move, start, finished=True)
+            return move, self.stats
+
+        deadline = start + time_limit if time_limit is not None else None
+        next_progress = start + PROGRESS_INTERVAL
+        while True:
+            for _ in range(CHECK_INTERVAL):
+                self._iterate(board.black, board.white, player)
+                self.playouts += 1
+                if playouts is not None and self.playouts >= playouts:
+                    break
+            if playouts is not None and self.playouts >= playouts:
+                break
+            now = time.perf_counter()
+            if deadline is not None and now >= deadline:
+                break
+            if self.stop_event is not None and self.stop_event.is_set():
+                break
+            if self.on_progress is not None and now >= next_progress:
+                next_progress = now + PROGRESS_INTERVAL
+                self.on_progress(self._make_stats(player, self._best_move(), start))
+
+        move = self._best_move()
+        self.stats = self._make_stats(player, move, start, finished=True)
+        return move, self.stats
+
+    # --- TREE REUSE ---
+    def _advance(self, black, white, player, size):
+        """Makes the node of this position the root: reused if the old tree reaches it, else a new tree."""
+        if self.root is not None and self.root[3] == size:
+            node = self._find(0, *self.root[:3], black, white, player, REUSE_PLIES)
+            if node is not None:
+                if node != 0:
+                    self.tree = self.tree.subtree(node)
+                self.root = (black, white, player, size)
+                return
+        self.tree = MCTSTree()
+        self.root = (black, white, player, size)
+
+    def _find(self, node, black, white, player, target_black, target_white, target_player, plies):
+        """The descendant of node (at black, white, player) within `plies` moves that has the target position."""
+        if black == target_black and white == target_white and player == target_player:
+            return node
+        tree = self.tree
+        first = tree.first[node]
+        if plies == 0 or first < 0:
+            return None
+        occupied = target_black | target_white
+        for child in range(first, first + tree.count[node]):
+            sq = tree.move[child]
+            # Discs are never removed: only moves onto squares the target occupies can lead there
+            if sq != PASS and not occupied >> sq & 1:
+                continue
+            child_black, child_white = self._play(black, white, player, sq)
+            found = self._find(child, child_black, child_white, -player, target_black, target_white, target_player,
+                               plies - 1)
+            if found is not None:
+                return found
+        return None
+
+    # --- ONE ITERATION ---
+    def _iterate(self, black, white, player):
+        tree = self.tree
+        visits, value, first, count = tree.visits, tree.value, tree.first, tree.count
+        exploration = self.exploration
+        own, opp = self._sides(black, white, player)
+        legal_moves, rays = self._legal_moves, self._rays
+
+        # Selection: own/opp always hold the side to move first
+        node = 0
+        path = [0]
+        while first[node] >= 0:
+            start = first[node]
+            best = start
+            parent_visits = visits[node]
+            if parent_visits:
+                log_n = math.log(parent_visits)
+                best_score = -1.0
+                for child in range(start, start + count[node]):
+                    n = visits[child]
+                    if n == 0:
+                        # Unvisited children first, in the static order they were created in
+                        best = child
+                        break
+                    score = value[child] / n + exploration * math.sqrt(log_n / n)
+                    if score > best_score:
+                        best_score = score
+                        best = child
+            node = best
+            path.append(node)
+            sq = tree.move[node]
+            if sq != PASS:
+                bit = 1 << sq
+                flips = ray_flips(own, opp, rays[sq])
+                own |= bit | flips
+                opp ^= flips
+            own, opp = opp, own
+
+        # Expansion: every move of a leaf at once, on its second visit (the first one is a
+        # playout from the leaf itself), unless its children would not fit in max_nodes
+        if first[node] == UNEXPANDED and (visits[node] or node == 0):
+            moves = legal_moves(own, opp)
+            squares = [sq for group in self._groups for sq in iter_bits(moves & group)]
+            if not squares and legal_moves(opp, own):
+                squares = [PASS]
+            if not squares:
+                first[node] = TERMINAL
+            elif len(tree) + len(squares) <= self.max_nodes:
+                start = len(tree)
+                for sq in squares:
+                    tree.add(sq)
+                first[node] = start
+                count[node] = len(squares)
+                # First visit of the first child (corners first)
+                node = start
+                path.append(node)
+                sq = squares[0]
+                if sq != PASS:
+                    flips = ray_flips(own, opp, rays[sq])
+                    own |= (1 << sq) | flips
+                    opp ^= flips
+                own, opp = opp, own
+
+        # Simulation: margin for the side to move at the leaf
+        margin = self._playout(own, opp)
+        self.max_depth = max(self.max_depth, len(path) - 1)
+
+        # Backpropagation: the leaf's own result belongs to the player who moved into it,
+        # i.e. the opponent of the side to move there, and flips at every level up
+        result = 1.0 if margin < 0 else 0.0 if margin > 0 else 0.5
+        for node in reversed(path):
+            visits[node] += 1
+            value[node] += result
+            result = 1.0 - result
+
+    def _playout(self, own, opp):
+        """Plays the game out from (own to move, opp); returns own's final disc margin."""
+        legal_moves, rays = self._legal_moves, self._rays
+        rng = self.rng
+        heuristic = self.policy == 'heuristic'
+        corners, risky = self._corners, self._risky
+        swapped = False
+        passed = False
+        while True:
+            moves = legal_moves(own, opp)
+            if moves:
+                passed = False
+                if heuristic:
+                    if moves & corners:
+                        moves &= corners
+                    elif moves & ~risky:
+                        moves &= ~risky
+                # A random set bit: skip a random number of lower ones
+                for _ in range(rng.randrange(moves.bit_count())):
+                    moves &= moves - 1
+                sq = (moves & -moves).bit_length() - 1
+                flips = ray_flips(own, opp, rays[sq])
+                own |= (1 << sq) | flips
+                opp ^= flips
+            elif passed:
+                break
+            else:
+                passed = True
+            own, opp = opp, own
+            swapped = not swapped
+        margin = own.bit_count() - opp.bit_count()
+        return -margin if swapped else margin
+
+    # --- HELPERS ---
+    def _prepare(self, size):
+        geometry = BoardGeometry.of(size)
+        self.size = size
+        self._legal_moves = geometry.legal_moves
+        self._rays = geometry.rays
+        self._groups = ordering(size)[0]
+        corners, _, _, c_squares, x_squares = self._groups
+        self._corners = corners
+        self._risky = c_squares | x_squares
+
+    @staticmethod
+    def _sides(black, white, player):
+        return (black, white) if player == BLACK else (white, black)
+
+    def _play(self, black, white, player, sq):
+        """(black, white) after player plays square sq (or passes)."""
+        if sq == PASS:
+            return black, white
+        own, opp = self._sides(black, white, player)
+        flips = ray_flips(own, opp, self._rays[sq])
+        own |= (1 << sq) | flips
+        opp ^= flips
+        return (own, opp) if player == BLACK else (opp, own)
+
+    def _best_child(self, node):
+        tree = self.tree
+        first = tree.first[node]
+        if first < 0:
+            return None
+        return max(range(first, first + tree.count[node]), key=tree.visits.__getitem__)
+
+    def _best_move(self):
+        child = self._best_child(0)
+        if child is None:
+            return None
+        sq = self.tree.move[child]
+        return None if sq == PASS else divmod(sq, self.size)
+
+    def _principal_line(self):
+        """Squares of the most visited path from the root."""
+        line = []
+        node = self._best_child(0)
+        while node is not None and self.tree.visits[node] > 0:
+            sq = self.tree.move[node]
+            line.append(sq)
+            node = self._best_child(node)
+        return line
+
+    def _make_stats(self, player, move, start, finished=False):
+        stats = SearchStats(player)
+        stats.source = "mcts"
+        stats.move = move
+        stats.nodes = self.playouts
+        stats.depth = self.max_depth
+        stats.elapsed = time.perf_counter() - start
+        stats.finished = finished
+        child = self._best_child(0)
+        if child is not None and self.tree.visits[child]:
+            # Expected result of the chosen move for player, in percent
+            stats.score = round(100 * self.tree.value[child] / self.tree.visits[child])
+        stats.pv = SearchStats.pv_from_squares(self._principal_line(), self.size)
+        stats.reused = self.reused
+        return stats
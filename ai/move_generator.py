@@ -1,4 +1,64 @@
+from core.board import iter_bits
+
+
+def _mask(squares, size=8):
+    bb = 0
+    for r, c in squares:
+        bb |= 1 << (r * size + c)
+    return bb
+
+
+def _order_groups(size):
+    """Square groups for static move ordering on a size x size board, best first."""
+    last = size - 1
+    corners = _mask([(0, 0), (0, last), (last, 0), (last, last)], size)
+    # Diagonal neighbours of the corners: playing there usually hands the corner over
+    x_squares = _mask([(1, 1), (1, last - 1), (last - 1, 1), (last - 1, last - 1)], size)
+    # Edge neighbours of the corners
+    c_squares = _mask([(0, 1), (1, 0), (0, last - 1), (1, last), (last - 1, 0), (last, 1), (last - 1, last),
+                       (last, last - 1)], size)
+    edges = _mask([(r, c) for r in range(size) for c in range(size) if r in (0, last) or c in (0, last)],
+                  size) & ~(corners | c_squares)
+    inner = ((1 << size * size) - 1) & ~(corners | x_squares | c_squares | edges)
+    return corners, edges, inner, c_squares, x_squares
+
+
+def _order_bonus(groups, size):
+    bonus = [0] * (size * size)
+    for value, group in zip((400, 200, 0, -200, -400), groups):
+        for sq in iter_bits(group):
+            bonus[sq] = value
+    return bonus
+
+
+CORNERS, EDGES, INNER, C_SQUARES, X_SQUARES = _order_groups(8)
+
+# Cheap static move ordering: corners first, X- and C-squares last
+ORDER_GROUPS = (CORNERS, EDGES, INNER, C_SQUARES, X_SQUARES)
+
+# Per-square ordering bonus matching ORDER_GROUPS, for mixing with history scores
+STATIC_ORDER_BONUS = _order_bonus(ORDER_GROUPS, 8)
+
+_ORDERING = {8: (ORDER_GROUPS, STATIC_ORDER_BONUS)}
+
+
+def ordering(size):
+    """(ORDER_GROUPS, STATIC_ORDER_BONUS) for a size x size board."""
+    tables = _ORDERING.get(size)
+    if tables is None:
+        groups = _order_groups(size)
+        tables = _ORDERING[size] = (groups, _order_bonus(groups, size))
+    return tables
+
+
 class MoveGenerator:
     
     def get_moves(board, player):
         return board.get_valid_moves(player)
+
+    def static_order(moves, groups=ORDER_GROUPS):
+        """Squares of the `moves` bitboard, corners first and X-squares last (groups: see ordering())."""
+        ordered = []
+        for group in groups:
+            ordered.extend(iter_bits(moves & group))
+        return ordered
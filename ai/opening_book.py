@@ -0,0 +1,216 @@
+"""
+Opening book: best moves for early positions, precomputed offline with the search and
+pattern evaluation of the Advanced agent, a little deeper than it gets in play.
+
+On-disk format (little endian):
+    header  8s magic b"OTHBOOK1", I record count, H plies, H search depth
+    records sorted by key, each Q key, B move square, B depth, h score
+
+Keys are symmetry-canonical: the position (side to move first) is put through all
+8 rotations/reflections of the board, the smallest is kept and hashed, so every
+symmetric variant of a position shares one record. Moves are stored in that
+canonical orientation and mapped back on lookup. The file is read through mmap
+with a binary search, so opening it costs nothing and only touched pages load.
+
+Build with:  python -m ai.opening_book --plies 7 --depth 7
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+
+from core.board import Board, iter_bits
+from core.constants import BLACK
+from core.zobrist import compute_hash
+
+MAGIC = b"OTHBOOK1"
+HEADER = struct.Struct("<8sIHH")
+RECORD = struct.Struct("<QBBh")
+
+DEFAULT_BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "opening_book.bin")
+
+
+def _symmetry_tables():
+    transforms = [
+        lambda r, c: (r, c),
+        lambda r, c: (c, 7 - r),
+        lambda r, c: (7 - r, 7 - c),
+        lambda r, c: (7 - c, r),
+        lambda r, c: (r, 7 - c),
+        lambda r, c: (7 - r, c),
+        lambda r, c: (c, r),
+        lambda r, c: (7 - c, 7 - r),
+    ]
+    forward = []
+    inverse = []
+    for transform in transforms:
+        table = [0] * 64
+        back = [0] * 64
+        for sq in range(64):
+            r, c = transform(*divmod(sq, 8))
+            table[sq] = r * 8 + c
+            back[r * 8 + c] = sq
+        forward.append(table)
+        inverse.append(back)
+    return forward, inverse
+
+
+# SYMMETRIES[i][sq] is where sq lands under symmetry i; INVERSE_SYMMETRIES undoes it
+SYMMETRIES, INVERSE_SYMMETRIES = _symmetry_tables()
+
+
+def transform_bitboard(bb, table):
+    out = 0
+    for sq in iter_bits(bb):
+        out |= 1 << table[sq]
+    return out
+
+
+def canonical(own, opp):
+    """Returns (key, symmetry index) for the side-to-move-relative position (own, opp)."""
+    best = None
+    best_index = 0
+    for i, table in enumerate(SYMMETRIES):
+        variant = (transform_bitboard(own, table), transform_bitboard(opp, table))
+        if best is None or variant < best:
+            best = variant
+            best_index = i
+    return compute_hash(*best), best_index
+
+
+def _side_to_move(board, player):
+    if player == BLACK:
+        return board.black, board.white
+    return board.white, board.black
+
+
+class OpeningBook:
+    def __init__(self, path=DEFAULT_BOOK_PATH):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # mmap refuses empty files
+            self._file.close()
+            raise ValueError(f"{path} is not an opening book")
+        magic, self.count, self.plies, self.depth = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or len(self._map) != HEADER.size + self.count * RECORD.size:
+            self.close()
+            raise ValueError(f"{path} is not an opening book")
+        self.hits = 0
+        self.misses = 0
+
+    _default = None
+
+    @classmethod
+    def default(cls):
+        """The shared book at DEFAULT_BOOK_PATH, or None if it has not been built."""
+        if cls._default is None:
+            try:
+                cls._default = cls(DEFAULT_BOOK_PATH)
+            except (OSError, ValueError):
+                cls._default = False
+        return cls._default or None
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __len__(self):
+        return self.count
+
+    def _find(self, key):
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            mid_key = struct.unpack_from("<Q", self._map, HEADER.size + mid * RECORD.size)[0]
+            if mid_key < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count:
+            record = RECORD.unpack_from(self._map, HEADER.size + lo * RECORD.size)
+            if record[0] == key:
+                return record
+        return None
+
+    def lookup(self, board, player):
+        """Returns (move (r, c), score) for player in this position, or None if it is not in the book."""
+        if board.size != 8:
+            return None
+        own, opp = _side_to_move(board, player)
+        key, symmetry = canonical(own, opp)
+        record = self._find(key)
+        if record is not None:
+            move = divmod(INVERSE_SYMMETRIES[symmetry][record[1]], 8)
+            if board.is_valid_move(move[0], move[1], player):
+                self.hits += 1
+                return move, record[3]
+        self.misses += 1
+        return None
+
+    def get_move(self, board, player):
+        entry = self.lookup(board, player)
+        return entry[0] if entry else None
+
+
+def build_book(path=DEFAULT_BOOK_PATH, plies=7, depth=7, verbose=True):
+    """
+    Expands every position up to `plies` moves from the start (one per symmetry class),
+    scores each with a fixed-depth pattern-evaluation search and writes the book to `path`.
+    The Advanced agent plays book moves without searching, so the book must not be
+    weaker than its own search (about 7 plies in the opening at its PvA time limit).
+    """
+    from ai.algorithm import Minimax
+    from ai.transposition import TranspositionTable
+
+    search = Minimax(TranspositionTable(size_mb=64), pattern_eval=True)
+    records = {}
+    frontier = [(Board(), BLACK)]
+    start = time.perf_counter()
+    for ply in range(plies):
+        next_frontier = []
+        seen = set()
+        for board, player in frontier:
+            moves = board.get_valid_moves(player)
+            if not moves:
+                continue
+            own, opp = _side_to_move(board, player)
+            key, symmetry = canonical(own, opp)
+            if key in records:
+                continue
+
+            move = search.get_move_using_minimax(board, player, depth=depth)
+            score = search.last_score if search.last_score is not None else 0
+            sq = SYMMETRIES[symmetry][move[0] * 8 + move[1]]
+            records[key] = (sq, depth, max(-32768, min(32767, score)))
+
+            for r, c in moves:
+                child = board.make_move(r, c, player)
+                child_key = canonical(*_side_to_move(child, -player))[0]
+                if child_key not in seen:
+                    seen.add(child_key)
+                    next_frontier.append((child, -player))
+        frontier = next_frontier
+        if verbose:
+            print(f"ply {ply}: {len(records)} positions, {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(records), plies, depth))
+        for key in sorted(records):
+            f.write(RECORD.pack(key, *records[key]))
+    return len(records)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the opening book.")
+    parser.add_argument("--plies", type=int, default=7, help="expand positions up to this many moves in")
+    parser.add_argument("--depth", type=int, default=7, help="search depth used to score each position")
+    parser.add_argument("--out", default=DEFAULT_BOOK_PATH)
+    args = parser.parse_args()
+    count = build_book(args.out, args.plies, args.depth)
+    print(f"wrote {count} positions to {args.out}")
@@ -0,0 +1,404 @@
+import array
+import os
+import struct
+import sys
+
+from core.board import FULL_MASK, NOT_A_FILE, NOT_H_FILE, legal_moves_bb, iter_bits
+from core.constants import BLACK
+from .opening_book import SYMMETRIES
+
+# Only evaluate_batch (and the batch_* helpers) need NumPy; it is imported on first use (see _numpy) so that
+# importing the evaluation, and everything built on it, stays fast
+np = None
+
+# Number of game phases, by disc count; every weight exists once per phase
+N_PHASES = 4
+PHASE_OF = [min(N_PHASES - 1, max(0, discs - 4) * N_PHASES // 60) for discs in range(65)]
+
+# Base patterns in their top-left orientation; every distinct rotation/reflection
+# of a pattern reads the same weight table.
+BASE_PATTERNS = {
+    'edge': [(0, c) for c in range(8)],
+    'corner3x3': [(r, c) for r in range(3) for c in range(3)],
+    'corner2x5': [(r, c) for r in range(2) for c in range(5)],
+    'diag8': [(i, i) for i in range(8)],
+    'diag7': [(i, i + 1) for i in range(7)],
+    'diag6': [(i, i + 2) for i in range(6)],
+    'diag5': [(i, i + 3) for i in range(5)],
+}
+PATTERN_NAMES = list(BASE_PATTERNS)
+
+# Classic positional weights; the default pattern tables add up to exactly this table
+SQUARE_WEIGHTS = [
+    100, -20, 10,  5,  5, 10, -20, 100,
+    -20, -50, -2, -2, -2, -2, -50, -20,
+     10,  -2, -1, -1, -1, -1,  -2,  10,
+      5,  -2, -1, -1, -1, -1,  -2,   5,
+      5,  -2, -1, -1, -1, -1,  -2,   5,
+     10,  -2, -1, -1, -1, -1,  -2,  10,
+    -20, -50, -2, -2, -2, -2, -50, -20,
+    100, -20, 10,  5,  5, 10, -20, 100,
+]
+
+# Default weights of the scalar features, per phase (opening ... endgame)
+DEFAULT_MOBILITY = [10, 8, 6, 2]
+DEFAULT_FRONTIER = [-4, -4, -3, -1]
+DEFAULT_STABLE = [20, 20, 25, 30]
+
+# Terminal positions are scored by disc margin times this, far above any heuristic score
+FINAL_DISC_WEIGHT = 1000
+
+# Trained weights (see ai.training), loaded at startup when present. File format
+# (little endian): header 8s magic, I version, H phases, H patterns; then per pattern
+# of PATTERN_NAMES, phases * 3 ** squares h weights (phase by phase); then phases
+# h weights each of mobility, frontier and stable.
+WEIGHTS_MAGIC = b"OTHWGT01"
+WEIGHTS_HEADER = struct.Struct("<8sIHH")
+DEFAULT_WEIGHTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "pattern_weights.bin")
+SCALAR_FEATURES = ('mobility', 'frontier', 'stable')
+
+
+def _instances():
+    """Every distinct placement of each base pattern: list of (pattern name, squares)."""
+    instances = []
+    for name, cells in BASE_PATTERNS.items():
+        seen = set()
+        for table in SYMMETRIES:
+            squares = [table[r * 8 + c] for r, c in cells]
+            if frozenset(squares) not in seen:
+                seen.add(frozenset(squares))
+                instances.append((name, squares))
+    return instances
+
+
+INSTANCES = _instances()
+INSTANCE_PATTERN = [PATTERN_NAMES.index(name) for name, _ in INSTANCES]
+
+# SQUARE_TERMS[sq]: (instance, 3 ** position) for every pattern instance covering sq.
+# A black disc adds 1 * power to that instance's index, a white disc 2 * power.
+SQUARE_TERMS = [[] for _ in range(64)]
+for _i, (_name, _squares) in enumerate(INSTANCES):
+    for _pos, _sq in enumerate(_squares):
+        SQUARE_TERMS[_sq].append((_i, 3 ** _pos))
+
+CORNERS = 0x8100000000000081
+EDGE_MASK = 0xFF818181818181FF
+
+
+def _table_from_square_weights(squares, coverage):
+    """Index table that scores each black disc +w and each white disc -w on the pattern's squares."""
+    table = [0]
+    for sq in squares:
+        w = SQUARE_WEIGHTS[sq] / coverage[sq]
+        table = [v + d for d in (0, w, -w) for v in table]
+    return [round(v) for v in table]
+
+
+def default_weights():
+    """Untrained weights: patterns that reproduce SQUARE_WEIGHTS plus hand-set feature weights."""
+    coverage = [len(terms) for terms in SQUARE_TERMS]
+    first = {}
+    for name, squares in INSTANCES:
+        first.setdefault(name, squares)
+    tables = {name: _table_from_square_weights(first[name], coverage) for name in PATTERN_NAMES}
+    return {
+        'version': 0,
+        'patterns': {name: [list(tables[name]) for _ in range(N_PHASES)] for name in PATTERN_NAMES},
+        'mobility': list(DEFAULT_MOBILITY),
+        'frontier': list(DEFAULT_FRONTIER),
+        'stable': list(DEFAULT_STABLE),
+    }
+
+
+def save_weights(path, weights):
+    """Writes a weights dict (as made by default_weights) to a weight file."""
+    data = [WEIGHTS_HEADER.pack(WEIGHTS_MAGIC, weights['version'], N_PHASES, len(PATTERN_NAMES))]
+    for name in PATTERN_NAMES:
+        for table in weights['patterns'][name]:
+            data.append(_int16s(table))
+    for feature in SCALAR_FEATURES:
+        data.append(_int16s(weights[feature]))
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"".join(data))
+
+
+def _int16s(values):
+    packed = array.array("h", (max(-32768, min(32767, round(v))) for v in values))
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def load_weights(path=DEFAULT_WEIGHTS_PATH):
+    """Reads a weight file written by save_weights; raises ValueError if it does not fit this evaluation."""
+    with open(path, "rb") as f:
+        data = f.read()
+    sizes = [3 ** len(BASE_PATTERNS[name]) for name in PATTERN_NAMES]
+    expected = WEIGHTS_HEADER.size + 2 * N_PHASES * (sum(sizes) + len(SCALAR_FEATURES))
+    if len(data) < WEIGHTS_HEADER.size:
+        raise ValueError(f"{path} is not a weight file")
+    magic, version, phases, patterns = WEIGHTS_HEADER.unpack_from(data)
+    if magic != WEIGHTS_MAGIC or phases != N_PHASES or patterns != len(PATTERN_NAMES) or len(data) != expected:
+        raise ValueError(f"{path} is not a weight file for this evaluation")
+    values = array.array("h")
+    values.frombytes(data[WEIGHTS_HEADER.size:])
+    if sys.byteorder == "big":
+        values.byteswap()
+    values = values.tolist()
+
+    weights = {'version': version, 'patterns': {}}
+    pos = 0
+    for name, size in zip(PATTERN_NAMES, sizes):
+        weights['patterns'][name] = [values[pos + phase * size:pos + (phase + 1) * size] for phase in range(N_PHASES)]
+        pos += N_PHASES * size
+    for feature in SCALAR_FEATURES:
+        weights[feature] = values[pos:pos + N_PHASES]
+        pos += N_PHASES
+    return weights
+
+
+_trained = None
+
+
+def trained_weights():
+    """The weights at DEFAULT_WEIGHTS_PATH, read once; default_weights() if there is no usable file."""
+    global _trained
+    if _trained is None:
+        try:
+            _trained = load_weights(DEFAULT_WEIGHTS_PATH)
+        except (OSError, ValueError):
+            _trained = default_weights()
+    return _trained
+
+
+# --- BIT FEATURES ---
+# These only use shifts and masks, so they work on Python ints and on NumPy uint64 arrays alike.
+def neighbours(bb):
+    """Every square next to a set bit of bb (8-connected)."""
+    horizontal = ((bb << 1) & NOT_A_FILE) | ((bb >> 1) & NOT_H_FILE) | bb
+    return (horizontal | (horizontal << 8) | (horizontal >> 8)) & FULL_MASK
+
+
+def frontier(own, empty):
+    """Discs of own next to an empty square."""
+    return own & neighbours(empty)
+
+
+def edge_stable(own):
+    """Discs of own connected to an own corner along an edge: they can never be flipped back."""
+    stable = own & CORNERS
+    edge = own & EDGE_MASK
+    for _ in range(7):
+        grown = stable | (edge & (((stable << 1) & NOT_A_FILE) | ((stable >> 1) & NOT_H_FILE)
+                                  | ((stable << 8) & FULL_MASK) | (stable >> 8)))
+        if np is not None and isinstance(grown, np.ndarray):
+            stable = grown
+        elif grown == stable:
+            break
+        else:
+            stable = grown
+    return stable
+
+
+def pattern_indices(black, white):
+    """Index of every pattern instance for the position, computed from scratch."""
+    indices = [0] * len(INSTANCES)
+    for sq in iter_bits(black):
+        for i, power in SQUARE_TERMS[sq]:
+            indices[i] += power
+    for sq in iter_bits(white):
+        for i, power in SQUARE_TERMS[sq]:
+            indices[i] += 2 * power
+    return indices
+
+
+class PatternEvaluation:
+    """
+    Pattern-table evaluation: edge, corner 3x3, corner 2x5 and diagonal patterns,
+    plus mobility, frontier and edge-stable disc terms, with one weight set per game phase.
+
+    Pattern indices can be kept up to date incrementally: call sync(board) once and then
+    on_apply/on_undo with every undo record of Board.apply_square/undo on that board.
+    """
+    # Evaluation units per disc, roughly; Minimax scales its aspiration window with it
+    scale = 8
+
+    def __init__(self, weights=None):
+        # Trained weights if they have been exported (see ai.training), else the hand-set ones
+        self.weights = weights or trained_weights()
+        self.mobility = self.weights['mobility']
+        self.frontier = self.weights['frontier']
+        self.stable = self.weights['stable']
+        # Per phase, the table each instance reads from
+        self.instance_tables = [
+            [self.weights['patterns'][PATTERN_NAMES[p]][phase] for p in INSTANCE_PATTERN]
+            for phase in range(N_PHASES)
+        ]
+        self._arrays = None
+
+        # Incrementally tracked position
+        self.indices = None
+        self._tracked = None
+
+    # --- INCREMENTAL INDICES ---
+    def sync(self, board):
+        self.indices = pattern_indices(board.black, board.white)
+        self._tracked = board
+
+    def on_apply(self, record):
+        player, sq, flips, _ = record
+        indices = self.indices
+        # Placed disc: empty (0) -> 1 (black) or 2 (white); flipped discs: 2 -> 1 or 1 -> 2
+        if player == BLACK:
+            for i, power in SQUARE_TERMS[sq]:
+                indices[i] += power
+            while flips:
+                low = flips & -flips
+                for i, power in SQUARE_TERMS[low.bit_length() - 1]:
+                    indices[i] -= power
+                flips ^= low
+        else:
+            for i, power in SQUARE_TERMS[sq]:
+                indices[i] += 2 * power
+            while flips:
+                low = flips & -flips
+                for i, power in SQUARE_TERMS[low.bit_length() - 1]:
+                    indices[i] += power
+                flips ^= low
+
+    def on_undo(self, record):
+        player, sq, flips, _ = record
+        indices = self.indices
+        if player == BLACK:
+            for i, power in SQUARE_TERMS[sq]:
+                indices[i] -= power
+            while flips:
+                low = flips & -flips
+                for i, power in SQUARE_TERMS[low.bit_length() - 1]:
+                    indices[i] += power
+                flips ^= low
+        else:
+            for i, power in SQUARE_TERMS[sq]:
+                indices[i] -= 2 * power
+            while flips:
+                low = flips & -flips
+                for i, power in SQUARE_TERMS[low.bit_length() - 1]:
+                    indices[i] -= power
+                flips ^= low
+
+    # --- SCORING ---
+    def evaluate_board(self, state, player):
+        black, white = state.black, state.white
+        black_moves = legal_moves_bb(black, white)
+        white_moves = legal_moves_bb(white, black)
+        if not black_moves and not white_moves:
+            score = (black.bit_count() - white.bit_count()) * FINAL_DISC_WEIGHT
+            return score if player == BLACK else -score
+
+        if state is self._tracked:
+            indices = self.indices
+        else:
+            indices = pattern_indices(black, white)
+
+        phase = PHASE_OF[(black | white).bit_count()]
+        score = 0
+        for table, index in zip(self.instance_tables[phase], indices):
+            score += table[index]
+
+        empty = FULL_MASK & ~(black | white)
+        near_empty = neighbours(empty)
+        score += self.mobility[phase] * (black_moves.bit_count() - white_moves.bit_count())
+        score += self.frontier[phase] * ((black & near_empty).bit_count() - (white & near_empty).bit_count())
+        score += self.stable[phase] * (edge_stable(black).bit_count() - edge_stable(white).bit_count())
+        return score if player == BLACK else -score
+
+    def evaluate_batch(self, blacks, whites, players):
+        """
+        Scores many positions in one NumPy pass. blacks and whites are uint64 bitboard
+        arrays, players holds BLACK/WHITE per position; returns an int64 array of
+        evaluate_board results.
+        """
+        _numpy()
+        blacks = np.asarray(blacks, dtype=np.uint64)
+        whites = np.asarray(whites, dtype=np.uint64)
+        players = np.asarray(players, dtype=np.int64)
+        tables, mobility, frontier_w, stable_w = self._numpy_weights()
+
+        phase = batch_phases(blacks, whites)
+        score = np.zeros(len(blacks), dtype=np.int64)
+        for index, pattern in zip(batch_pattern_indices(blacks, whites), INSTANCE_PATTERN):
+            score += tables[pattern][phase, index]
+
+        mobility_diff, frontier_diff, stable_diff = batch_features(blacks, whites)
+        score += mobility[phase] * mobility_diff
+        score += frontier_w[phase] * frontier_diff
+        score += stable_w[phase] * stable_diff
+
+        final = (legal_moves_bb(blacks, whites) == 0) & (legal_moves_bb(whites, blacks) == 0)
+        score = np.where(final, (_popcount(blacks) - _popcount(whites)) * FINAL_DISC_WEIGHT, score)
+        return np.where(players == BLACK, score, -score)
+
+    def _numpy_weights(self):
+        if self._arrays is None:
+            self._arrays = (
+                [np.asarray(self.weights['patterns'][name], dtype=np.int64) for name in PATTERN_NAMES],
+                np.asarray(self.mobility, dtype=np.int64),
+                np.asarray(self.frontier, dtype=np.int64),
+                np.asarray(self.stable, dtype=np.int64),
+            )
+        return self._arrays
+
+
+# --- BATCH FEATURES ---
+# The NumPy forms of the evaluation's inputs, shared by evaluate_batch and the weight fitting.
+def batch_phases(blacks, whites):
+    """Game phase of every position."""
+    _numpy()
+    return np.asarray(PHASE_OF, dtype=np.intp)[_popcount(blacks | whites)]
+
+
+def batch_pattern_indices(blacks, whites):
+    """(instances, positions) array: the index of every pattern instance in every position."""
+    _numpy()
+    indices = np.zeros((len(INSTANCES), len(blacks)), dtype=np.intp)
+    one = np.uint64(1)
+    for i, (_, squares) in enumerate(INSTANCES):
+        power = 1
+        for sq in squares:
+            shift = np.uint64(sq)
+            indices[i] += (((blacks >> shift) & one) + 2 * ((whites >> shift) & one)).astype(np.intp) * power
+            power *= 3
+    return indices
+
+
+def batch_features(blacks, whites):
+    """Black-minus-white mobility, frontier and edge-stable counts, one int64 array each."""
+    _numpy()
+    black_moves = legal_moves_bb(blacks, whites)
+    white_moves = legal_moves_bb(whites, blacks)
+    near_empty = neighbours(~(blacks | whites))
+    return (_popcount(black_moves) - _popcount(white_moves),
+            _popcount(blacks & near_empty) - _popcount(whites & near_empty),
+            _popcount(edge_stable(blacks)) - _popcount(edge_stable(whites)))
+
+
+def _numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("evaluate_batch needs NumPy (pip install numpy)") from None
+        np = numpy
+    return np
+
+
+def _popcount(arr):
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(arr).astype(np.int64)
+    # SWAR popcount for NumPy < 2.0
+    arr = arr - ((arr >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    arr = (arr & np.uint64(0x3333333333333333)) + ((arr >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    arr = (arr + (arr >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return ((arr * np.uint64(0x0101010101010101)) >> np.uint64(56)).astype(np.int64)
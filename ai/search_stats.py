@@ -0,0 +1,122 @@
+import json
+import threading
+import time
+
+from .transposition import NO_MOVE
+
+
+class SearchStats:
+    """
+    What one search did: work counters, depth reached, timing, table usage and the
+    principal variation. Minimax fills one in per search (and per completed depth
+    when streaming progress); agents keep the last one in agent.stats.
+    """
+    def __init__(self, player=None):
+        self.player = player
+        self.move = None           # (r, c) chosen, None until a depth completes
+        self.score = None          # from the point of view of player
+        self.depth = None          # deepest completed iteration (plies below the root move)
+        self.nodes = 0             # positions visited
+        self.leaves = 0            # static evaluations
+        self.cutoffs = 0           # beta cutoffs below the root
+        self.first_cutoffs = 0     # ... caused by the first move searched
+        self.probcut_tries = 0     # ProbCut shallow checks (see ai.selective)
+        self.probcut_cuts = 0      # ... that pruned their node
+        self.lmr_reductions = 0    # late moves searched shallower first
+        self.lmr_researches = 0    # ... that had to be searched again to full depth
+        self.reused = 0            # MCTS: playouts carried over from the previous move's tree
+        self.elapsed = 0.0         # seconds
+        self.cpu_time = None       # CPU seconds of the searching thread, when the caller measured it
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.pv = []               # principal variation, (r, c) per move, None for a pass
+        self.nodes_per_depth = []
+        self.time_to_depth = []
+        self.source = "search"     # "mcts" for tree search (nodes are playouts, score a win percentage),
+                                   # "book" / "solver" when the agent did not search
+        self.finished = False      # False while streaming partial results
+
+    @classmethod
+    def without_search(cls, source, player, move, **fields):
+        """Stats for a move that came from somewhere else than the search (book, solver)."""
+        stats = cls(player)
+        stats.source = source
+        stats.move = move
+        stats.finished = True
+        for name, value in fields.items():
+            setattr(stats, name, value)
+        return stats
+
+    @property
+    def nps(self):
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def first_cutoff_rate(self):
+        """Share of cutoffs found on the first move tried: a measure of move-ordering quality."""
+        return self.first_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    @property
+    def tt_hit_rate(self):
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    @staticmethod
+    def pv_from_squares(squares, size=8):
+        return [None if sq == NO_MOVE else divmod(sq, size) for sq in squares]
+
+    def summary(self):
+        """Short text for the status pill, e.g. 'depth 7 · 41k nps'."""
+        if self.source == "mcts":
+            score = "-" if self.score is None else f"{self.score}%"
+            return f"{self.nodes} playouts · {score}"
+        if self.source != "search":
+            return self.source
+        nps = self.nps
+        nps_text = f"{nps / 1000:.0f}k" if nps >= 1000 else f"{nps:.0f}"
+        return f"depth {self.depth if self.depth is not None else '-'} · {nps_text} nps"
+
+    def as_dict(self):
+        return {
+            'player': self.player,
+            'move': self.move,
+            'score': self.score,
+            'depth': self.depth,
+            'nodes': self.nodes,
+            'leaves': self.leaves,
+            'cutoffs': self.cutoffs,
+            'first_cutoffs': self.first_cutoffs,
+            'first_cutoff_rate': self.first_cutoff_rate,
+            'probcut_tries': self.probcut_tries,
+            'probcut_cuts': self.probcut_cuts,
+            'lmr_reductions': self.lmr_reductions,
+            'lmr_researches': self.lmr_researches,
+            'reused': self.reused,
+            'elapsed': self.elapsed,
+            'cpu_time': self.cpu_time,
+            'nps': self.nps,
+            'tt_probes': self.tt_probes,
+            'tt_hits': self.tt_hits,
+            'tt_hit_rate': self.tt_hit_rate,
+            'pv': self.pv,
+            'nodes_per_depth': self.nodes_per_depth,
+            'time_to_depth': self.time_to_depth,
+            'source': self.source,
+            'finished': self.finished,
+        }
+
+    def __repr__(self):
+        return f"SearchStats({self.summary()}, move={self.move}, score={self.score}, nodes={self.nodes})"
+
+
+class SearchLog:
+    """Appends one JSON object per line for every search written to it, for offline analysis."""
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, stats, **context):
+        record = {'time': time.time(), **context, **stats.as_dict()}
+        line = json.dumps(record)
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
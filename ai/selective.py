@@ -0,0 +1,335 @@
+"""
+Selective search for Minimax: Multi-ProbCut and late-move reductions.
+
+ProbCut prunes a node of depth d from a cheap search of depth d' < d: the deep value
+is predicted as  v_d = a * v_d' + b  with residual error sigma, fitted on real
+positions, and the node is cut when a null-window search at depth d' says that the
+prediction is outside (alpha, beta) by more than `confidence` sigmas. Multi-ProbCut
+tries up to two shallow depths per depth (cheapest first, see shallow_depths) and
+keeps separate regressions per game phase, since a midgame search is noisier than
+an endgame one. Only null-window nodes are pruned, so the principal variation is
+always searched in full.
+
+Late-move reductions search the late moves of a node (by move order) lmr_reduction
+plies shallower with a null window, and only search them to full depth again when
+that reduced search beats alpha.
+
+Both are off by default: Minimax(probcut=True, lmr=True), or for agents e.g.
+    python -m modes.tournament advanced:time_limit=0.2,probcut=True,lmr=True advanced:time_limit=0.2 --games 100
+
+The regression table is fitted per evaluation (pattern and disc count) from the
+positions of recorded games, and shipped as ai/data/probcut.json:
+    python -m ai.selective fit selfplay.othr --positions 400
+Depth reached, pruning counters and strength at a fixed time per move:
+    python -m ai.selective measure --time 0.2 --games 40
+
+The shipped table comes from 300 positions of the self-play games of ai.training
+(about 25 minutes). With it, the Advanced agent at 0.2s per search completes on
+average 5.4 plies without selectivity, 6.4 with ProbCut, 6.1 with LMR and 6.6 with
+both (6.0 / 7.4 / 7.3 / 8.3 at 0.5s), and over 40 games against the plain search
+at 0.2s per move scores +137 ± 116 Elo with ProbCut, +127 ± 115 with LMR and
++98 ± 112 with both.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+
+from core.game_record import Replay, read_records
+
+DEFAULT_PROBCUT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "probcut.json")
+PROBCUT_VERSION = 1
+# Shallowest node ProbCut tries to cut, and deepest one the table is fitted for; deeper
+# nodes use the deepest fitted pair of the same parity (see probcut_checks)
+PROBCUT_MIN_DEPTH = 3
+PROBCUT_MAX_DEPTH = 8
+# A cut needs the predicted value this many sigmas outside the window
+PROBCUT_CONFIDENCE = 1.5
+# Phases by empty squares: 0-19, 20-39, 40 and more
+PROBCUT_PHASE_EMPTIES = 20
+PROBCUT_PHASES = 3
+# Cells of the table with fewer samples are left out (no cut at that depth and phase)
+PROBCUT_MIN_SAMPLES = 20
+# Values beyond any disc margin are proven results (a search that saw the end), not estimates
+MAX_MARGIN = 64
+
+# Late-move reductions: from the lmr_moves-th move on (counting from 0), at nodes of at
+# least lmr_depth plies, the null-window search goes lmr_reduction plies shallower first
+LMR_MOVES = 3
+LMR_MIN_DEPTH = 3
+LMR_REDUCTION = 1
+
+# Configurations compared by `measure`: name -> Minimax/AdvancedAgent options
+MEASURE_CONFIGS = {
+    'off': {},
+    'probcut': {'probcut': True},
+    'lmr': {'lmr': True},
+    'both': {'probcut': True, 'lmr': True},
+}
+
+
+def shallow_depths(depth):
+    """Depths of the ProbCut checks at a node of `depth` plies: about half as deep, with the same parity."""
+    low = max(1, depth // 2 - 1)
+    return tuple(d for d in range(low, depth // 2 + 2) if (depth - d) % 2 == 0 and d < depth)
+
+
+def phase_of(empties):
+    return min(empties // PROBCUT_PHASE_EMPTIES, PROBCUT_PHASES - 1)
+
+
+# --- TABLE ---
+def save_probcut(path, table):
+    """
+    Writes a table: {'version', 'positions', 'evaluations': {name: {(depth, shallow, phase): (a, b, sigma)}}},
+    with b and sigma in discs.
+    """
+    # JSON with one [depth, shallow, phase, a, b, sigma] row per line
+    evaluations = ",\n".join(
+        f'  "{name}": [\n' + ",\n".join(f"   {json.dumps([*key, *fit])}" for key, fit in sorted(cells.items())) + "\n  ]"
+        for name, cells in table['evaluations'].items())
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(f'{{\n "version": {table["version"]},\n "positions": {table["positions"]},\n'
+                f' "evaluations": {{\n{evaluations}\n }}\n}}\n')
+
+
+def load_probcut(path=DEFAULT_PROBCUT_PATH):
+    """Reads a table written by save_probcut; raises ValueError if it is not one."""
+    with open(path) as f:
+        try:
+            data = json.load(f)
+            evaluations = {name: {(int(d), int(s), int(p)): (float(a), float(b), float(sigma))
+                                  for d, s, p, a, b, sigma in rows}
+                           for name, rows in data['evaluations'].items()}
+            return {'version': data['version'], 'positions': data['positions'], 'evaluations': evaluations}
+        except (ValueError, KeyError, TypeError) as e:
+            raise ValueError(f"{path} is not a ProbCut table: {e}")
+
+
+_fitted = None
+
+
+def fitted_probcut():
+    """The table at DEFAULT_PROBCUT_PATH, read once; an empty table (ProbCut never cuts) if there is no usable file."""
+    global _fitted
+    if _fitted is None:
+        try:
+            _fitted = load_probcut(DEFAULT_PROBCUT_PATH)
+        except (OSError, ValueError):
+            _fitted = {'version': 0, 'positions': 0, 'evaluations': {}}
+    return _fitted
+
+
+def probcut_checks(table, evaluation, scale, confidence=PROBCUT_CONFIDENCE, max_depth=60):
+    """
+    checks[depth][phase] -> ((shallow depth, a, b, margin), ...) for Minimax, cheapest
+    first, with b and margin (confidence sigmas) in evaluation units.
+    """
+    cells = table['evaluations'].get(evaluation, {})
+    fitted = {depth for depth, _, _ in cells}
+    checks = []
+    for depth in range(max_depth + 1):
+        # Past the table, the deepest fitted depth of the same parity, with the same gap
+        base = depth
+        if depth > PROBCUT_MAX_DEPTH:
+            base = max((d for d in fitted if (depth - d) % 2 == 0), default=depth)
+        row = []
+        for phase in range(PROBCUT_PHASES):
+            phase_checks = []
+            if depth >= PROBCUT_MIN_DEPTH:
+                for shallow in shallow_depths(base):
+                    fit = cells.get((base, shallow, phase))
+                    if fit is not None and fit[0] > 0:
+                        a, b, sigma = fit
+                        phase_checks.append((shallow + depth - base, a, b * scale, confidence * sigma * scale))
+            row.append(tuple(phase_checks))
+        checks.append(row)
+    return checks
+
+
+# --- FITTING ---
+def sample_positions(paths, count, seed=0, min_empties=10, max_empties=56):
+    """`count` (board, side to move) pairs picked at random from the complete games in the record files."""
+    records = [record for path in paths for record in read_records(path) if record.complete]
+    if not records:
+        raise ValueError("no complete games in the record files")
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        replay = Replay(rng.choice(records))
+        board, player = replay.position(rng.randrange(len(replay) + 1))
+        if _searchable(board, player, min_empties, max_empties):
+            positions.append((board, player))
+    return positions
+
+
+def _searchable(board, player, min_empties, max_empties):
+    # With one legal move the search returns at once, without a value
+    return min_empties <= board.empty_count <= max_empties and len(board.get_valid_moves(player)) > 1
+
+
+def search_values(search, board, player, max_depth=PROBCUT_MAX_DEPTH):
+    """[v_0, v_1, ...]: the negamax value of the position at 0..max_depth plies, in discs (fewer near the end)."""
+    scale = search.evaluate.scale
+    search._prepare(board)
+    values = [search.evaluate.evaluate_board(board, player) / scale]
+    on_progress = search.on_progress
+    # A root search of depth k scores the position at k + 1 plies
+    search.on_progress = lambda stats: values.append(stats.score / scale)
+    try:
+        search.search(board, player, depth=max_depth - 1)
+    finally:
+        search.on_progress = on_progress
+    return values
+
+
+def fit_cells(samples):
+    """
+    Least-squares fit of v_depth = a * v_shallow + b for every ProbCut check, per phase.
+    samples: (empties, values) pairs as made by search_values. Returns {(depth, shallow, phase): (a, b, sigma)}.
+    """
+    cells = {}
+    for depth in range(PROBCUT_MIN_DEPTH, PROBCUT_MAX_DEPTH + 1):
+        for shallow in shallow_depths(depth):
+            for phase in range(PROBCUT_PHASES):
+                pairs = [(values[shallow], values[depth]) for empties, values in samples
+                         if phase_of(empties) == phase and len(values) > depth
+                         and abs(values[shallow]) <= MAX_MARGIN and abs(values[depth]) <= MAX_MARGIN]
+                if len(pairs) < PROBCUT_MIN_SAMPLES:
+                    continue
+                n = len(pairs)
+                mean_x = sum(x for x, _ in pairs) / n
+                mean_y = sum(y for _, y in pairs) / n
+                sxx = sum((x - mean_x) ** 2 for x, _ in pairs)
+                sxy = sum((x - mean_x) * (y - mean_y) for x, y in pairs)
+                a = sxy / sxx if sxx else 1.0
+                b = mean_y - a * mean_x
+                sigma = math.sqrt(sum((y - a * x - b) ** 2 for x, y in pairs) / max(1, n - 2))
+                cells[(depth, shallow, phase)] = (round(a, 4), round(b, 3), round(sigma, 3))
+    return cells
+
+
+def fit_probcut(positions, progress=None):
+    """
+    Fits the table for both evaluations on `positions` ((board, side to move) pairs)
+    with plain searches (no selectivity) of up to PROBCUT_MAX_DEPTH plies.
+    """
+    from ai.algorithm import Minimax
+    from ai.transposition import TranspositionTable
+
+    evaluations = {}
+    for name, pattern_eval in (('pattern', True), ('disc', False)):
+        search = Minimax(TranspositionTable(size_mb=64), pattern_eval=pattern_eval)
+        samples = []
+        for i, (board, player) in enumerate(positions):
+            samples.append((board.empty_count, search_values(search, board, player)))
+            if progress:
+                progress(name, i + 1, len(positions))
+        evaluations[name] = fit_cells(samples)
+    return {'version': PROBCUT_VERSION, 'positions': len(positions), 'evaluations': evaluations}
+
+
+# --- MEASUREMENT ---
+def measure_depth(positions, time_limit, configs=MEASURE_CONFIGS):
+    """
+    Time-limited searches of every position per configuration (pattern evaluation,
+    fresh table each). Returns {name: {'depth', 'nodes', ... averages and counters}}.
+    """
+    from ai.algorithm import Minimax
+    from ai.transposition import TranspositionTable
+
+    results = {}
+    for name, options in configs.items():
+        search = Minimax(TranspositionTable(size_mb=32), pattern_eval=True, **options)
+        totals = dict.fromkeys(('depth', 'nodes', 'seconds', 'probcut_tries', 'probcut_cuts',
+                                'lmr_reductions', 'lmr_researches'), 0)
+        for board, player in positions:
+            _, stats = search.search(board, player, depth=60, time_limit=time_limit)
+            totals['depth'] += stats.depth + 1
+            totals['nodes'] += stats.nodes
+            totals['seconds'] += stats.elapsed
+            for counter in ('probcut_tries', 'probcut_cuts', 'lmr_reductions', 'lmr_researches'):
+                totals[counter] += getattr(stats, counter)
+        results[name] = {
+            'depth': totals['depth'] / len(positions),
+            'nodes': totals['nodes'] / len(positions),
+            'nodes_per_sec': totals['nodes'] / totals['seconds'] if totals['seconds'] else 0.0,
+            'probcut_cut_rate': totals['probcut_cuts'] / totals['probcut_tries'] if totals['probcut_tries'] else 0.0,
+            'lmr_research_rate': totals['lmr_researches'] / totals['lmr_reductions'] if totals['lmr_reductions'] else 0.0,
+            **{counter: totals[counter] for counter in ('probcut_tries', 'probcut_cuts',
+                                                        'lmr_reductions', 'lmr_researches')},
+        }
+    return results
+
+
+def agent_spec(time_limit, options):
+    """Tournament spec of the Advanced agent with `options` at a fixed time per move."""
+    items = [f"time_limit={time_limit}"] + [f"{key}={value}" for key, value in options.items()]
+    return "advanced:" + ",".join(items)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit and measure the selective search (ProbCut, LMR).")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    fit = commands.add_parser("fit", help="fit the ProbCut regressions on positions of recorded games")
+    fit.add_argument("records", nargs="+", help="game-record files")
+    fit.add_argument("--positions", type=int, default=400, help="positions to sample")
+    fit.add_argument("--out", default=DEFAULT_PROBCUT_PATH)
+    fit.add_argument("--seed", type=int, default=0)
+
+    measure = commands.add_parser("measure", help="depth reached and strength at a fixed time per move")
+    measure.add_argument("--records", nargs="*", default=[], help="sample positions from these games "
+                         "(default: positions of random games)")
+    measure.add_argument("--positions", type=int, default=30)
+    measure.add_argument("--time", type=float, default=0.2, help="seconds per search / per move")
+    measure.add_argument("--configs", nargs="+", default=list(MEASURE_CONFIGS), choices=list(MEASURE_CONFIGS))
+    measure.add_argument("--games", type=int, default=0, help="games of each config against 'off' (0: skip)")
+    measure.add_argument("--workers", type=int, default=None)
+    measure.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.command == "fit":
+        def report(name, done, total):
+            if done % 20 == 0 or done == total:
+                print(f"{name}: {done}/{total} positions", file=sys.stderr)
+
+        start = time.perf_counter()
+        table = fit_probcut(sample_positions(args.records, args.positions, args.seed), report)
+        save_probcut(args.out, table)
+        print(f"fitted {table['positions']} positions in {time.perf_counter() - start:.0f}s, wrote {args.out}")
+        for name, cells in table['evaluations'].items():
+            for (depth, shallow, phase), (a, b, sigma) in sorted(cells.items()):
+                print(f"  {name:<8} d{depth} <- d{shallow} phase {phase}: a {a:.3f}  b {b:+.2f}  sigma {sigma:.2f}")
+        return
+
+    configs = {name: MEASURE_CONFIGS[name] for name in args.configs}
+    if args.records:
+        positions = sample_positions(args.records, args.positions, args.seed)
+    else:
+        from benchmarks.run import random_positions
+        positions = [(board, player) for board, player in random_positions(8, 4 * args.positions, args.seed)
+                     if _searchable(board, player, 20, 56)][:args.positions]
+    print(f"{len(positions)} positions, {args.time}s per search:")
+    for name, item in measure_depth(positions, args.time, configs).items():
+        print(f"  {name:<8} depth {item['depth']:.2f}  nodes {item['nodes']:>9,.0f}  "
+              f"probcut {item['probcut_cuts']}/{item['probcut_tries']} cut  "
+              f"lmr {item['lmr_researches']}/{item['lmr_reductions']} re-searched")
+
+    if args.games:
+        from modes.tournament import format_report, run_tournament
+        baseline = agent_spec(args.time, MEASURE_CONFIGS['off'])
+        for name, options in configs.items():
+            if not options:
+                continue
+            summary = run_tournament([agent_spec(args.time, options), baseline], args.games, args.workers, args.seed)
+            print(f"\n{name} against off:")
+            print(format_report(summary))
+
+
+if __name__ == "__main__":
+    main()
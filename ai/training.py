@@ -0,0 +1,306 @@
+"""
+Evaluation training: fits PatternEvaluation's weights to the outcomes of self-play games.
+
+Three stages, one command each:
+    1. play games between any agents and record them (core.game_record)
+         python -m modes.tournament advanced:depth=1,endgame_empties=8 advanced:depth=2,endgame_empties=8 --games 3000 --opening-plies 10 --record selfplay.othr
+    2. turn the games into labelled positions, stored as NumPy columns (.npz)
+         python -m ai.training positions selfplay.othr --out positions.npz --exact-empties 10
+    3. fit the weights and export them; PatternEvaluation loads ai/data/pattern_weights.bin at startup
+         python -m ai.training fit positions.npz --out ai/data/pattern_weights.bin
+
+A position's label is the final disc margin from black's side (empties to the
+winner). Positions with at most exact_empties empty squares are solved exactly, and
+the earlier positions of a game take the exact score of its first solved position,
+so endgame mistakes of the players do not leak into the labels.
+
+The fit is a regularized linear least squares over every pattern table entry and
+scalar feature weight of every phase, solved with preconditioned conjugate
+gradients on NumPy arrays. Weights are pulled towards the starting ones (the
+current weights), so table entries that occur in few positions keep their old value.
+Compare the result with a tournament, e.g.
+    python -m ai.training defaults --out untrained.bin
+    python -m modes.tournament advanced:depth=3 advanced:depth=5,weights=untrained.bin --games 200
+
+The shipped weights (version 1) come from exactly these steps: 180k positions of
+3000 games, fitted in 20 seconds.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from core.board import Board, legal_moves_bb
+from core.constants import BLACK
+from core.game_record import Replay, read_records
+from .endgame import EndgameSolver, final_score
+from .pattern_evaluation import (BASE_PATTERNS, INSTANCE_PATTERN, N_PHASES, PATTERN_NAMES,
+                                 SCALAR_FEATURES, DEFAULT_WEIGHTS_PATH, PatternEvaluation, batch_features,
+                                 batch_pattern_indices, batch_phases, default_weights, load_weights,
+                                 save_weights, trained_weights)
+
+# Positions with this many empties or fewer get exact labels from the endgame solver
+DEFAULT_EXACT_EMPTIES = 10
+# Pull of the starting weights, in positions: an entry seen this often moves halfway to its fit.
+# Weaker pulls fit the labels more closely but let rare entries overfit, and the search finds them.
+DEFAULT_REGULARIZATION = 200.0
+DEFAULT_ITERATIONS = 100
+# Share of the positions held out to measure the fit
+DEFAULT_VALIDATION = 0.1
+
+
+# --- POSITIONS ---
+def label_game(record, solver, exact_empties=DEFAULT_EXACT_EMPTIES):
+    """
+    Labelled positions of one recorded game: a list of (black, white, side to move,
+    black's final margin, exact). Finished positions are left out: the evaluation
+    never scores them with its weights.
+    """
+    replay = Replay(record)
+    positions = []
+    for ply in range(len(replay) + 1):
+        board, player = replay.position(ply)
+        if not legal_moves_bb(board.black, board.white) and not legal_moves_bb(board.white, board.black):
+            break
+        positions.append((board.black, board.white, player))
+
+    labelled = []
+    exact_score = None
+    for black, white, player in positions:
+        empties = 64 - (black | white).bit_count()
+        if empties <= exact_empties:
+            _, score = solver.solve(Board.from_bitboards(black, white), player)
+            exact_score = score if player == BLACK else -score
+            labelled.append((black, white, player, exact_score, True))
+        else:
+            labelled.append((black, white, player, None, False))
+
+    if exact_score is None:
+        # Never reached exact_empties: every position takes the game's actual result
+        board, _ = replay.position(len(replay))
+        first_exact = final_score(board.black, board.white)
+    else:
+        first_exact = next(label for *_, label, exact in labelled if exact)
+    return [(b, w, p, first_exact if label is None else label, exact) for b, w, p, label, exact in labelled]
+
+
+def positions_from_records(paths, exact_empties=DEFAULT_EXACT_EMPTIES, progress=None):
+    """Labelled positions of every complete game in the record files, as NumPy columns."""
+    solver = EndgameSolver()
+    rows = []
+    games = 0
+    for path in paths:
+        for record in read_records(path):
+            if not record.complete:
+                continue  # forfeited or abandoned: the result says nothing about the position
+            rows.extend(label_game(record, solver, exact_empties))
+            games += 1
+            if progress:
+                progress(games, len(rows))
+    black, white, player, score, exact = zip(*rows) if rows else ((),) * 5
+    return {
+        'black': np.array(black, dtype=np.uint64),
+        'white': np.array(white, dtype=np.uint64),
+        'player': np.array(player, dtype=np.int8),
+        'score': np.array(score, dtype=np.int8),
+        'exact': np.array(exact, dtype=bool),
+    }
+
+
+def save_positions(path, positions):
+    np.savez_compressed(path, **positions)
+
+
+def load_positions(paths):
+    """Reads and concatenates position files written by save_positions."""
+    parts = []
+    for path in paths:
+        with np.load(path) as data:
+            parts.append({name: data[name] for name in ('black', 'white', 'player', 'score', 'exact')})
+    return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+
+# --- FITTING ---
+class _Design:
+    """
+    The linear model behind PatternEvaluation as a sparse design matrix: one row per
+    position, one column per weight (all pattern tables of all phases, then the
+    scalar features per phase). Pattern columns hold 1, scalar columns the feature.
+    """
+    def __init__(self, blacks, whites):
+        sizes = [3 ** len(BASE_PATTERNS[name]) for name in PATTERN_NAMES]
+        self.pattern_offsets = np.cumsum([0] + [N_PHASES * size for size in sizes])
+        self.scalar_offset = int(self.pattern_offsets[-1])
+        self.n_weights = self.scalar_offset + len(SCALAR_FEATURES) * N_PHASES
+
+        phase = batch_phases(blacks, whites)
+        indices = batch_pattern_indices(blacks, whites)
+        self.pattern_cols = np.empty(indices.shape, dtype=np.int64)
+        for i, pattern in enumerate(INSTANCE_PATTERN):
+            self.pattern_cols[i] = self.pattern_offsets[pattern] + phase * sizes[pattern] + indices[i]
+        self.scalar_cols = np.array([self.scalar_offset + f * N_PHASES + phase for f in range(len(SCALAR_FEATURES))])
+        self.scalar_values = np.array(batch_features(blacks, whites), dtype=np.float64)
+        self.sizes = sizes
+
+    def predict(self, theta):
+        return theta[self.pattern_cols].sum(axis=0) + (theta[self.scalar_cols] * self.scalar_values).sum(axis=0)
+
+    def transpose_times(self, residual):
+        """X^T r."""
+        out = np.bincount(self.pattern_cols.ravel(), weights=np.tile(residual, len(self.pattern_cols)),
+                          minlength=self.n_weights)
+        out += np.bincount(self.scalar_cols.ravel(), weights=(self.scalar_values * residual).ravel(),
+                           minlength=self.n_weights)
+        return out
+
+    def diagonal(self):
+        """Diagonal of X^T X: how often each table entry is read, sums of squares for the scalars."""
+        out = np.bincount(self.pattern_cols.ravel(), minlength=self.n_weights).astype(np.float64)
+        out += np.bincount(self.scalar_cols.ravel(), weights=(self.scalar_values ** 2).ravel(),
+                           minlength=self.n_weights)
+        return out
+
+    def to_vector(self, weights):
+        theta = np.empty(self.n_weights)
+        for p, name in enumerate(PATTERN_NAMES):
+            theta[self.pattern_offsets[p]:self.pattern_offsets[p + 1]] = np.ravel(weights['patterns'][name])
+        for f, feature in enumerate(SCALAR_FEATURES):
+            start = self.scalar_offset + f * N_PHASES
+            theta[start:start + N_PHASES] = weights[feature]
+        return theta
+
+    def to_weights(self, theta, version):
+        theta = np.clip(np.rint(theta), -32768, 32767).astype(np.int64)
+        weights = {'version': version, 'patterns': {}}
+        for p, (name, size) in enumerate(zip(PATTERN_NAMES, self.sizes)):
+            tables = theta[self.pattern_offsets[p]:self.pattern_offsets[p + 1]].reshape(N_PHASES, size)
+            weights['patterns'][name] = tables.tolist()
+        for f, feature in enumerate(SCALAR_FEATURES):
+            start = self.scalar_offset + f * N_PHASES
+            weights[feature] = theta[start:start + N_PHASES].tolist()
+        return weights
+
+
+def fit_weights(positions, weights=None, regularization=DEFAULT_REGULARIZATION, iterations=DEFAULT_ITERATIONS,
+                validation=DEFAULT_VALIDATION, seed=0, progress=None):
+    """
+    Fits the evaluation to the positions' labels (margin * PatternEvaluation.scale),
+    starting from and regularized towards `weights` (default: the current ones).
+    Every position is also used with the colours swapped. Returns (weights with the
+    next version number, report) where the report holds RMSEs in discs.
+    """
+    start_weights = weights or trained_weights()
+    rng = np.random.default_rng(seed)
+    held_out = rng.random(len(positions['score'])) < validation
+
+    def design(mask):
+        blacks, whites = positions['black'][mask], positions['white'][mask]
+        scores = positions['score'][mask].astype(np.float64) * PatternEvaluation.scale
+        # Colour-swapped copies: the same position seen from the other side
+        return (_Design(np.concatenate([blacks, whites]), np.concatenate([whites, blacks])),
+                np.concatenate([scores, -scores]))
+
+    start = time.perf_counter()
+    train, targets = design(~held_out)
+    theta0 = train.to_vector(start_weights)
+    lam = float(regularization)
+
+    def normal_times(v):
+        return train.transpose_times(train.predict(v)) + lam * v
+
+    # Preconditioned conjugate gradients on (X^T X + lam I) theta = X^T y + lam theta0
+    preconditioner = train.diagonal() + lam
+    theta = theta0.copy()
+    residual = train.transpose_times(targets) + lam * theta0 - normal_times(theta)
+    z = residual / preconditioner
+    direction = z.copy()
+    rz = residual @ z
+    for iteration in range(iterations):
+        product = normal_times(direction)
+        step = rz / (direction @ product)
+        theta += step * direction
+        residual -= step * product
+        z = residual / preconditioner
+        rz, rz_old = residual @ z, rz
+        direction = z + (rz / rz_old) * direction
+        if progress:
+            progress(iteration + 1, _rmse(train.predict(theta), targets))
+
+    fitted = train.to_weights(theta, start_weights['version'] + 1)
+    report = {
+        'positions': int((~held_out).sum()),
+        'held_out': int(held_out.sum()),
+        'iterations': iterations,
+        'seconds': time.perf_counter() - start,
+        'train_rmse_before': _rmse(train.predict(theta0), targets),
+        'train_rmse': _rmse(train.predict(train.to_vector(fitted)), targets),
+    }
+    if held_out.any():
+        check, check_targets = design(held_out)
+        report['validation_rmse_before'] = _rmse(check.predict(theta0), check_targets)
+        report['validation_rmse'] = _rmse(check.predict(check.to_vector(fitted)), check_targets)
+    return fitted, report
+
+
+def _rmse(predicted, targets):
+    """Root mean square error, in discs."""
+    return float(np.sqrt(np.mean((predicted - targets) ** 2))) / PatternEvaluation.scale
+
+
+# --- COMMAND LINE ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the pattern evaluation on self-play games.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    positions = commands.add_parser("positions", help="label the positions of recorded games")
+    positions.add_argument("records", nargs="+", help="game-record files")
+    positions.add_argument("--out", required=True, help="position file to write (.npz)")
+    positions.add_argument("--exact-empties", type=int, default=DEFAULT_EXACT_EMPTIES,
+                           help="solve positions with this many empties or fewer exactly")
+
+    fit = commands.add_parser("fit", help="fit and export the evaluation weights")
+    fit.add_argument("positions", nargs="+", help="position files")
+    fit.add_argument("--out", default=DEFAULT_WEIGHTS_PATH, help="weight file to write")
+    fit.add_argument("--start", help="weight file to start from (default: the current weights)")
+    fit.add_argument("--regularization", type=float, default=DEFAULT_REGULARIZATION)
+    fit.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    fit.add_argument("--validation", type=float, default=DEFAULT_VALIDATION, help="share of positions held out")
+    fit.add_argument("--seed", type=int, default=0)
+
+    defaults = commands.add_parser("defaults", help="export the untrained weights, e.g. to compare against")
+    defaults.add_argument("--out", required=True)
+    args = parser.parse_args(argv)
+
+    if args.command == "positions":
+        def report_games(games, count):
+            if games % 100 == 0:
+                print(f"{games} games, {count} positions", file=sys.stderr)
+
+        data = positions_from_records(args.records, args.exact_empties, report_games)
+        save_positions(args.out, data)
+        print(f"wrote {len(data['score'])} positions ({int(data['exact'].sum())} exact) to {args.out}")
+
+    elif args.command == "fit":
+        def report_iteration(iteration, rmse):
+            if iteration % 10 == 0:
+                print(f"iteration {iteration}: train rmse {rmse:.2f} discs", file=sys.stderr)
+
+        start = load_weights(args.start) if args.start else None
+        weights, report = fit_weights(load_positions(args.positions), start, args.regularization, args.iterations,
+                                      args.validation, args.seed, report_iteration)
+        save_weights(args.out, weights)
+        print(f"fitted {report['positions']} positions in {report['seconds']:.1f}s: "
+              f"train rmse {report['train_rmse_before']:.2f} -> {report['train_rmse']:.2f} discs")
+        if 'validation_rmse' in report:
+            print(f"held-out rmse {report['validation_rmse_before']:.2f} -> {report['validation_rmse']:.2f} discs "
+                  f"({report['held_out']} positions)")
+        print(f"wrote weights version {weights['version']} to {args.out}")
+
+    else:
+        save_weights(args.out, default_weights())
+        print(f"wrote the untrained weights to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+from array import array
+
+# Bound types stored with each entry
+EXACT = 0
+LOWER = 1  # the stored value is a lower bound (the search failed high)
+UPPER = 2  # the stored value is an upper bound (the search failed low)
+
+NO_MOVE = -1
+
+
+class TranspositionTable:
+    """
+    Fixed-size hash table of search results keyed by Zobrist hash.
+
+    Entries live in parallel typed arrays, so the memory used is fixed when the
+    table is created: size_mb is a hard cap, rounded down to a power-of-two entry count.
+    Replacement is depth-preferred: a slot is only overwritten by a deeper (or
+    equally deep) result, unless its entry is left over from an older search.
+    """
+    # key (8) + value (4) + depth (1) + bound (1) + move (1) + generation (2)
+    ENTRY_BYTES = 17
+
+    def __init__(self, size_mb=16):
+        max_entries = max(1, int(size_mb * 1024 * 1024) // self.ENTRY_BYTES)
+        self.size = 1 << (max_entries.bit_length() - 1)
+        self.mask = self.size - 1
+
+        self.keys = array('Q', bytes(8 * self.size))
+        # Search scores are integers
+        self.values = array('i', bytes(4 * self.size))
+        self.depths = array('b', [-1]) * self.size
+        self.bounds = array('b', bytes(self.size))
+        self.moves = array('b', [NO_MOVE]) * self.size
+        self.generations = array('H', bytes(2 * self.size))
+        self.generation = 0
+
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.overwrites = 0
+        self.rejected = 0
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    @property
+    def memory_bytes(self):
+        return self.size * self.ENTRY_BYTES
+
+    def new_search(self):
+        """Ages every stored entry so it can be replaced regardless of depth."""
+        self.generation = (self.generation + 1) & 0xFFFF
+
+    def clear(self):
+        self.depths = array('b', [-1]) * self.size
+        self.moves = array('b', [NO_MOVE]) * self.size
+        self.reset_stats()
+
+    def probe(self, key):
+        """Returns (depth, bound, value, move) for key, or None if it is not stored."""
+        self.probes += 1
+        i = key & self.mask
+        if self.depths[i] < 0 or self.keys[i] != key:
+            return None
+        self.hits += 1
+        return self.depths[i], self.bounds[i], self.values[i], self.moves[i]
+
+    def store(self, key, depth, bound, value, move=NO_MOVE):
+        i = key & self.mask
+        stored_depth = self.depths[i]
+        if stored_depth >= 0:
+            if self.generations[i] == self.generation and depth < stored_depth:
+                self.rejected += 1
+                return
+            if self.keys[i] != key:
+                self.overwrites += 1
+            elif move == NO_MOVE:
+                # Keep the best move we already know for this position
+                move = self.moves[i]
+
+        self.keys[i] = key
+        self.depths[i] = depth
+        self.bounds[i] = bound
+        self.values[i] = value
+        self.moves[i] = move
+        self.generations[i] = self.generation
+        self.stores += 1
+
+    def stats(self):
+        return {
+            'entries': self.size,
+            'memory_bytes': self.memory_bytes,
+            'probes': self.probes,
+            'hits': self.hits,
+            'hit_rate': self.hit_rate,
+            'stores': self.stores,
+            'overwrites': self.overwrites,
+            'rejected': self.rejected,
+        }
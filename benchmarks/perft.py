@@ -0,0 +1,73 @@
+"""
+Perft: counts the leaves of the full game tree to a fixed depth, to check move generation.
+
+A pass counts as a move (one ply), and a finished game before the requested depth
+counts as a single leaf. Reference counts for the start position are the published
+Othello perft numbers; the other positions were counted with an independent
+grid-based move generator.
+"""
+from core.board import Board, iter_bits
+from core.constants import BLACK
+
+# depth -> leaf count from the initial position, black to move
+START_PERFT = {1: 4, 2: 12, 3: 56, 4: 244, 5: 1396, 6: 8200, 7: 55092, 8: 390216, 9: 3005288}
+
+# (name, black bitboard, white bitboard, side to move, {depth: leaf count})
+PERFT_POSITIONS = [
+    ("midgame-20", 0x081c0808a8180000, 0x5440705050404000, BLACK,
+     {1: 9, 2: 74, 3: 809, 4: 6738, 5: 80704}),
+    ("midgame-30", 0xc070349001022404, 0x2000406f3e7c8000, BLACK,
+     {1: 11, 2: 159, 3: 1816, 4: 24396, 5: 281602}),
+    ("midgame-40", 0x5c78c02207ff3f00, 0x02043e1cf8000000, BLACK,
+     {1: 7, 2: 101, 3: 646, 4: 8526, 5: 55022}),
+    ("midgame-50", 0x987101a715293500, 0x4406fe582a564a7f, BLACK,
+     {1: 10, 2: 46, 3: 348, 4: 1381, 5: 7373, 6: 22779}),
+    # Six empties with many passes and early game ends
+    ("endgame-passes", 0x3a14035f677d2e0e, 0xc0e0fca09882c1f1, BLACK,
+     {1: 2, 2: 9, 3: 13, 4: 40, 5: 46, 6: 65, 7: 65, 8: 67, 9: 67, 10: 67, 11: 67}),
+]
+
+
+def perft(board, player, depth, passed=False):
+    """Leaf count of the game tree below `board` (searched in place with apply/undo)."""
+    if depth == 0:
+        return 1
+    moves = board.valid_moves_mask(player)
+    if not moves:
+        if passed:
+            return 1  # neither side can move: the game is over
+        return perft(board, -player, depth - 1, True)
+    if depth == 1:
+        return moves.bit_count()
+    count = 0
+    for sq in iter_bits(moves):
+        record = board.apply_square(sq, player)
+        count += perft(board, -player, depth - 1)
+        board.undo(record)
+    return count
+
+
+def perft_cases(max_depth=None):
+    """(name, board, player, depth, expected count) for every reference count up to max_depth."""
+    cases = [("start", Board(), BLACK, depth, count) for depth, count in START_PERFT.items()]
+    for name, black, white, player, counts in PERFT_POSITIONS:
+        for depth, count in counts.items():
+            cases.append((name, Board.from_bitboards(black, white), player, depth, count))
+    if max_depth is not None:
+        cases = [case for case in cases if case[3] <= max_depth]
+    return cases
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    max_depth = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    failures = 0
+    for name, board, player, depth, expected in perft_cases(max_depth):
+        start = time.perf_counter()
+        count = perft(board, player, depth)
+        elapsed = time.perf_counter() - start
+        status = "ok" if count == expected else f"FAIL (expected {expected})"
+        failures += count != expected
+        print(f"{name:<16} {'black' if player == BLACK else 'white'} depth {depth:>2}: {count:>10} {elapsed:8.3f}s  {status}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,313 @@
+"""
+Benchmark suite: perft correctness, move-generation/evaluation micro-benchmarks,
+move generation per board size and fixed-depth searches per agent. Results are written as JSON; --compare checks them
+against an earlier run and flags every metric that got worse by more than --threshold.
+
+    python -m benchmarks.run --out before.json
+    ... change something ...
+    python -m benchmarks.run --out after.json --compare before.json
+    python -m benchmarks.run --results after.json --compare before.json   # compare files only
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+from core.board import Board, legal_moves_bb
+from core.constants import BLACK, BOARD_SIZES
+from ai.board_evaluation import BoardEvaluation
+from ai.pattern_evaluation import PatternEvaluation
+from modes.pva import PvAMode
+from .perft import perft, perft_cases, PERFT_POSITIONS
+
+# Positions for the micro and search benchmarks: the perft midgame positions
+BENCH_POSITIONS = [(name, black, white, player) for name, black, white, player, _ in PERFT_POSITIONS
+                   if name.startswith("midgame")]
+# Random positions per board size for the scaling benchmark
+SCALING_POSITIONS = 64
+# Agents whose search is benchmarked (names understood by PvAMode.create_agent)
+SEARCH_AGENTS = ("intermediate", "advanced")
+
+
+def _rate(func, items, min_time):
+    """Calls func on every item, repeating the pass until min_time has passed; returns calls/sec."""
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        for item in items:
+            func(item)
+        calls += len(items)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return calls / elapsed
+
+
+def run_perft(max_depth):
+    results = []
+    for name, board, player, depth, expected in perft_cases(max_depth):
+        start = time.perf_counter()
+        count = perft(board, player, depth)
+        elapsed = time.perf_counter() - start
+        results.append({'position': name, 'depth': depth, 'count': count, 'expected': expected,
+                        'ok': count == expected, 'seconds': elapsed})
+    return results
+
+
+def run_micro(min_time):
+    positions = [(Board.from_bitboards(black, white), player) for _, black, white, player in BENCH_POSITIONS]
+    bitboards = [(b.black, b.white) for b, _ in positions]
+    moves = [(board, player, board.get_valid_moves(player)[0]) for board, player in positions]
+    disc_eval = BoardEvaluation()
+    pattern_eval = PatternEvaluation()
+    results = {}
+
+    results['legal_moves_bb'] = _rate(lambda bw: legal_moves_bb(*bw), bitboards, min_time)
+
+    def get_valid_moves(position):
+        # A fresh board each call, so the per-board move cache does not hide the work
+        black, white, player = position
+        Board.from_bitboards(black, white).get_valid_moves(player)
+    fresh = [(b.black, b.white, p) for b, p in positions]
+    results['get_valid_moves'] = _rate(get_valid_moves, fresh, min_time)
+    results['from_bitboards'] = _rate(lambda bw: Board.from_bitboards(*bw), bitboards, min_time)
+
+    results['make_move'] = _rate(lambda m: m[0].make_move(m[2][0], m[2][1], m[1]), moves, min_time)
+
+    def apply_undo(m):
+        board, player, (r, c) = m
+        board.undo(board.apply(r, c, player))
+    results['apply_undo'] = _rate(apply_undo, moves, min_time)
+
+    results['evaluate_board.disc'] = _rate(lambda bp: disc_eval.evaluate_board(*bp), positions, min_time)
+    results['evaluate_board.pattern'] = _rate(lambda bp: pattern_eval.evaluate_board(*bp), positions, min_time)
+    try:
+        import numpy as np
+    except ImportError:
+        pass
+    else:
+        batch = 4096
+        blacks = np.array([b.black for b, _ in positions] * (batch // len(positions)), dtype=np.uint64)
+        whites = np.array([b.white for b, _ in positions] * (batch // len(positions)), dtype=np.uint64)
+        players = np.array([p for _, p in positions] * (batch // len(positions)))
+        rate = _rate(lambda _: pattern_eval.evaluate_batch(blacks, whites, players), [None], min_time)
+        results['evaluate_batch.pattern'] = rate * len(blacks)
+    return {name: {'ops_per_sec': rate} for name, rate in results.items()}
+
+
+def random_positions(size, count, seed=0):
+    """`count` (board, side to move) pairs from random games on a size x size board, spread over the game."""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board = Board(size)
+        player = BLACK
+        game = []
+        while True:
+            moves = board.get_valid_moves(player)
+            if not moves:
+                player = -player
+                moves = board.get_valid_moves(player)
+                if not moves:
+                    break
+            game.append((board, player))
+            board = board.make_move(*rng.choice(moves), player)
+            player = -player
+        positions.extend(rng.sample(game, min(len(game), 8)))
+    return positions[:count]
+
+
+def run_scaling(min_time, sizes=BOARD_SIZES):
+    """
+    Move-generation cost per board size, on random positions: legal moves on a fresh
+    board, every legal move applied and undone, and perft(3) nodes per second.
+    """
+    results = {}
+    for size in sizes:
+        positions = random_positions(size, SCALING_POSITIONS)
+        fresh = [(board.black, board.white, player) for board, player in positions]
+
+        def valid_moves(position):
+            black, white, player = position
+            Board.from_bitboards(black, white, size).valid_moves_mask(player)
+
+        def apply_undo_all(position):
+            board, player = position
+            for r, c in board.get_valid_moves(player):
+                board.undo(board.apply(r, c, player))
+
+        moves = sum(len(board.get_valid_moves(player)) for board, player in positions)
+        start = time.perf_counter()
+        nodes = 0
+        while time.perf_counter() - start < min_time:
+            nodes += sum(perft(board.copy(), player, 3) for board, player in positions)
+        results[str(size)] = {
+            'valid_moves_per_sec': _rate(valid_moves, fresh, min_time),
+            'apply_undo_per_sec': _rate(apply_undo_all, positions, min_time) * moves / len(positions),
+            'perft_nodes_per_sec': nodes / (time.perf_counter() - start),
+            'moves_per_position': moves / len(positions),
+        }
+    return results
+
+
+def run_search(depth, agents=SEARCH_AGENTS):
+    """
+    Fixed-depth search from every benchmark position with each agent's Minimax
+    (book and endgame solver bypassed), with a fresh agent each time.
+    """
+    results = {}
+    for agent_name in agents:
+        nodes = 0
+        seconds = 0.0
+        time_to_depth = {}
+        for _, black, white, player in BENCH_POSITIONS:
+            agent = PvAMode.create_agent(agent_name, player, time_limit=None)
+            search = getattr(agent, 'ai', None)
+            if search is None:
+                break
+            board = Board.from_bitboards(black, white)
+            start = time.perf_counter()
+            search.get_move_using_minimax(board, player, depth=depth)
+            seconds += time.perf_counter() - start
+            nodes += search.nodes
+            for d, t in enumerate(search.time_to_depth):
+                time_to_depth[d] = time_to_depth.get(d, 0.0) + t
+            search.close()
+        else:
+            results[agent_name] = {
+                'depth': depth,
+                'nodes': nodes,
+                'seconds': seconds,
+                'nodes_per_sec': nodes / seconds if seconds else 0.0,
+                # Summed over the benchmark positions
+                'time_to_depth': {str(d): t for d, t in sorted(time_to_depth.items())},
+            }
+    return results
+
+
+def run_all(perft_depth=7, min_time=0.5, search_depth=4):
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'time': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        'perft': run_perft(perft_depth),
+        'micro': run_micro(min_time),
+        'scaling': run_scaling(min_time),
+        'search': run_search(search_depth),
+    }
+
+
+# --- COMPARISON ---
+def metrics(results):
+    """Flattens results into {name: (value, higher is better)}."""
+    out = {}
+    for item in results.get('perft', []):
+        out[f"perft.{item['position']}.d{item['depth']}.seconds"] = (item['seconds'], False)
+    for name, item in results.get('micro', {}).items():
+        out[f"micro.{name}.ops_per_sec"] = (item['ops_per_sec'], True)
+    for size, item in results.get('scaling', {}).items():
+        for name in ('valid_moves_per_sec', 'apply_undo_per_sec', 'perft_nodes_per_sec'):
+            out[f"scaling.{size}x{size}.{name}"] = (item[name], True)
+    for agent, item in results.get('search', {}).items():
+        out[f"search.{agent}.nodes_per_sec"] = (item['nodes_per_sec'], True)
+        out[f"search.{agent}.seconds"] = (item['seconds'], False)
+        out[f"search.{agent}.nodes"] = (item['nodes'], False)
+    return out
+
+
+def compare(baseline, current, threshold=0.10, min_seconds=0.01):
+    """
+    Returns (rows, regressions): rows are (metric, baseline, current, relative change)
+    where a positive change is an improvement. Timings under min_seconds are too noisy
+    to judge and are never flagged.
+    """
+    base = metrics(baseline)
+    rows = []
+    regressions = []
+    for name, (value, higher_is_better) in metrics(current).items():
+        if name not in base or not base[name][0]:
+            continue
+        old = base[name][0]
+        change = (value - old) / old if higher_is_better else (old - value) / old
+        rows.append((name, old, value, change))
+        noisy = name.endswith('.seconds') and max(old, value) < min_seconds
+        if change < -threshold and not noisy:
+            regressions.append(name)
+    return rows, regressions
+
+
+def format_results(results):
+    lines = []
+    failed = [p for p in results['perft'] if not p['ok']]
+    lines.append(f"perft: {len(results['perft']) - len(failed)}/{len(results['perft'])} ok")
+    for p in failed:
+        lines.append(f"  FAIL {p['position']} depth {p['depth']}: {p['count']} (expected {p['expected']})")
+    lines.append("micro-benchmarks:")
+    for name, item in results['micro'].items():
+        lines.append(f"  {name:<26} {item['ops_per_sec']:>14,.0f} /s")
+    scaling = results.get('scaling', {})
+    if scaling:
+        base = scaling.get('8')
+        lines.append("move generation by board size (cost relative to 8x8):")
+        for size, item in scaling.items():
+            relative = ""
+            if base:
+                relative = (f"  cost x{base['valid_moves_per_sec'] / item['valid_moves_per_sec']:.2f} / "
+                            f"x{base['apply_undo_per_sec'] / item['apply_undo_per_sec']:.2f}")
+            lines.append(f"  {size + 'x' + size:<6} valid moves {item['valid_moves_per_sec']:>10,.0f} /s, "
+                         f"apply+undo {item['apply_undo_per_sec']:>10,.0f} /s{relative}, "
+                         f"perft {item['perft_nodes_per_sec']:>10,.0f} nodes/s")
+    lines.append("search:")
+    for agent, item in results['search'].items():
+        steps = "  ".join(f"d{d} {t:.2f}s" for d, t in item['time_to_depth'].items())
+        lines.append(f"  {agent:<13} depth {item['depth']}: {item['nodes']} nodes in {item['seconds']:.2f}s "
+                     f"({item['nodes_per_sec']:,.0f} nodes/s)  time to depth: {steps}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the engine benchmarks.")
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument("--results", help="load results from this JSON file instead of running")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative slowdown to flag (default 0.10)")
+    parser.add_argument("--perft-depth", type=int, default=7)
+    parser.add_argument("--search-depth", type=int, default=4)
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds per micro-benchmark")
+    parser.add_argument("--quick", action="store_true", help="shallow perft/search and short timings")
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.perft_depth, args.search_depth, args.min_time = 5, 3, 0.1
+
+    if args.results:
+        with open(args.results) as f:
+            results = json.load(f)
+    else:
+        results = run_all(args.perft_depth, args.min_time, args.search_depth)
+        print(format_results(results))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+    status = 0
+    if any(not p['ok'] for p in results['perft']):
+        status = 1
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows, regressions = compare(baseline, results, args.threshold)
+        print(f"compared with {args.compare} (threshold {args.threshold:.0%}):")
+        for name, old, new, change in rows:
+            flag = "  REGRESSION" if name in regressions else ""
+            print(f"  {name:<48} {old:>14.4g} -> {new:<14.4g} {change:+7.1%}{flag}")
+        if regressions:
+            print(f"{len(regressions)} regression(s)")
+            status = 1
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,77 +1,418 @@
-import copy
-from .constants import BLACK, WHITE, EMPTY
-
-class Board:
-    def __init__(self):
-        self.size = 8
-        self.grid = [[EMPTY for _ in range(8)] for _ in range(8)]
-        self._setup_board()
-
-    def _setup_board(self):
-        self.grid[3][3] = WHITE
-        self.grid[3][4] = BLACK
-        self.grid[4][3] = BLACK
-        self.grid[4][4] = WHITE
-
-    def is_on_board(self, r, c):
-        return 0 <= r < 8 and 0 <= c < 8
-
-    def get_valid_moves(self, player):
-        moves = []
-        
-        for r in range(8):
-            for c in range(8):
-                if self.is_valid_move(r, c, player):
-                    moves.append((r, c))
-        return moves
-
-    def is_valid_move(self, r, c, player):
-        if self.grid[r][c] != EMPTY:
-            return False
-
-        opponent = -player
-        directions = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
-
-        for dr, dc in directions:
-            rr, cc = r + dr, c + dc
-            found_opponent = False
-
-            while self.is_on_board(rr, cc) and self.grid[rr][cc] == opponent:
-                rr += dr
-                cc += dc
-                found_opponent = True
-
-            if found_opponent and self.is_on_board(rr, cc) and self.grid[rr][cc] == player:
-                return True
-        return False
-
-    def make_move(self, r, c, player):
-        """Returns a new Board instance with the move applied."""
-        if not self.is_valid_move(r, c, player):
-            return None
-
-        new_board = copy.deepcopy(self)
-        new_board.grid[r][c] = player
-        opponent = -player
-        directions = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
-
-        for dr, dc in directions:
-            rr, cc = r + dr, c + dc
-            flips = []
-
-            while new_board.is_on_board(rr, cc) and new_board.grid[rr][cc] == opponent:
-                flips.append((rr, cc))
-                rr += dr
-                cc += dc
-
-            if new_board.is_on_board(rr, cc) and new_board.grid[rr][cc] == player:
-                for fr, fc in flips:
-                    new_board.grid[fr][fc] = player
-        
-        return new_board
-
-    def get_score(self):
-        b = sum(row.count(BLACK) for row in self.grid)
-        w = sum(row.count(WHITE) for row in self.grid)
-        return b, w
-
+from .constants import BLACK, WHITE, EMPTY, BOARD_SIZE, BOARD_SIZES, DIRECTIONS
+from .zobrist import ZOBRIST_BLACK, ZOBRIST_WHITE, ZOBRIST_FLIP, compute_hash
+
+# Bitboard layout: square (r, c) is bit r * size + c, so bit 0 is the top-left
+# corner and the highest bit the bottom-right one. The constants and functions
+# ending in _bb below are for the standard 8x8 board, which the search and the
+# evaluations use directly; BoardGeometry holds the same tables for every size.
+FULL_MASK = 0xFFFFFFFFFFFFFFFF
+NOT_A_FILE = 0xFEFEFEFEFEFEFEFE  # every column except c == 0
+NOT_H_FILE = 0x7F7F7F7F7F7F7F7F  # every column except c == 7
+
+
+# (shift, mask) per direction. The mask clears bits that wrapped around a row
+# edge, so it is applied to every shifted board.
+_LEFT_SHIFTS = (
+    (1, NOT_A_FILE),   # (0, 1)
+    (8, FULL_MASK),    # (1, 0)
+    (9, NOT_A_FILE),   # (1, 1)
+    (7, NOT_H_FILE),   # (1, -1)
+)
+_RIGHT_SHIFTS = (
+    (1, NOT_H_FILE),   # (0, -1)
+    (8, FULL_MASK),    # (-1, 0)
+    (9, NOT_H_FILE),   # (-1, -1)
+    (7, NOT_A_FILE),   # (-1, 1)
+)
+
+
+def legal_moves_bb(own, opp):
+    """Returns a bitboard of every square where the owner of `own` may play."""
+    empty = ~(own | opp) & FULL_MASK
+    moves = 0
+    for s, mask in _LEFT_SHIFTS:
+        o = opp & mask
+        x = (own << s) & o
+        x |= (x << s) & o
+        x |= (x << s) & o
+        x |= (x << s) & o
+        x |= (x << s) & o
+        x |= (x << s) & o
+        moves |= (x << s) & mask
+    for s, mask in _RIGHT_SHIFTS:
+        o = opp & mask
+        x = (own >> s) & o
+        x |= (x >> s) & o
+        x |= (x >> s) & o
+        x |= (x >> s) & o
+        x |= (x >> s) & o
+        x |= (x >> s) & o
+        moves |= (x >> s) & mask
+    return moves & empty
+
+
+def _ray_table(size):
+    """
+    Per square, one tuple of single-bit masks per direction, walking away from the
+    square up to the board edge. Rays shorter than two squares can never flip
+    anything and are left out.
+    """
+    rays = []
+    for sq in range(size * size):
+        r, c = divmod(sq, size)
+        square_rays = []
+        for dr, dc in DIRECTIONS:
+            ray = []
+            rr, cc = r + dr, c + dc
+            while 0 <= rr < size and 0 <= cc < size:
+                ray.append(1 << (rr * size + cc))
+                rr, cc = rr + dr, cc + dc
+            if len(ray) >= 2:
+                square_rays.append(tuple(ray))
+        rays.append(tuple(square_rays))
+    return tuple(rays)
+
+
+def ray_flips(own, opp, rays):
+    """
+    Discs flipped by a move, walking the move square's `rays` (see _ray_table):
+    each ray flips the opponent discs it starts with if an own disc closes them in.
+    """
+    flips = 0
+    for ray in rays:
+        line = 0
+        for bit in ray:
+            if opp & bit:
+                line |= bit
+            else:
+                if own & bit:
+                    flips |= line
+                break
+    return flips
+
+
+RAYS = _ray_table(8)
+
+
+def flips_bb(own, opp, move):
+    """Returns the discs flipped when the owner of `own` plays the single-bit `move`."""
+    return ray_flips(own, opp, RAYS[move.bit_length() - 1])
+
+
+class BoardGeometry:
+    """
+    Precomputed tables for one board size: masks, the per-direction shifts of
+    move generation, the square-to-ray table for flipping and the start position.
+    Shared by every board of that size; get it with BoardGeometry.of(size).
+    """
+    _cache = {}
+
+    def __init__(self, size):
+        self.size = size
+        self.squares = size * size
+        self.full = (1 << self.squares) - 1
+        first_col = sum(1 << (r * size) for r in range(size))
+        not_first = self.full & ~first_col
+        not_last = self.full & ~(first_col << (size - 1))
+        # Same layout as _LEFT_SHIFTS/_RIGHT_SHIFTS, for this row length
+        self.left_shifts = ((1, not_first), (size, self.full), (size + 1, not_first), (size - 1, not_last))
+        self.right_shifts = ((1, not_last), (size, self.full), (size + 1, not_last), (size - 1, not_first))
+        self.rays = RAYS if size == 8 else _ray_table(size)
+        self.legal_moves = legal_moves_bb if size == 8 else self._legal_moves
+        mid = size // 2
+        self.start_white = (1 << ((mid - 1) * size + mid - 1)) | (1 << (mid * size + mid))
+        self.start_black = (1 << ((mid - 1) * size + mid)) | (1 << (mid * size + mid - 1))
+
+    @classmethod
+    def of(cls, size):
+        geometry = cls._cache.get(size)
+        if geometry is None:
+            if size not in BOARD_SIZES:
+                raise ValueError(f"unsupported board size {size} (supported: {', '.join(map(str, BOARD_SIZES))})")
+            geometry = cls._cache[size] = cls(size)
+        return geometry
+
+    def _legal_moves(self, own, opp):
+        """legal_moves_bb for this size: a run of opponent discs can be up to size - 2 long."""
+        empty = ~(own | opp) & self.full
+        steps = range(self.size - 3)
+        moves = 0
+        for s, mask in self.left_shifts:
+            o = opp & mask
+            x = (own << s) & o
+            for _ in steps:
+                x |= (x << s) & o
+            moves |= (x << s) & mask
+        for s, mask in self.right_shifts:
+            o = opp & mask
+            x = (own >> s) & o
+            for _ in steps:
+                x |= (x >> s) & o
+            moves |= (x >> s) & mask
+        return moves & empty
+
+
+def iter_bits(bb):
+    """Yields the square index of every set bit, lowest first."""
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+def _move_hash(player, sq, flips):
+    """Zobrist delta for placing a disc on sq and flipping `flips`; XOR it in to play or undo."""
+    h = ZOBRIST_BLACK[sq] if player == BLACK else ZOBRIST_WHITE[sq]
+    while flips:
+        low = flips & -flips
+        h ^= ZOBRIST_FLIP[low.bit_length() - 1]
+        flips ^= low
+    return h
+
+
+class Snapshot:
+    """
+    An immutable position: both bitboards and the side to move. Hashable and
+    compared by value, so it can key dicts and sets; GameState keeps one per ply.
+    It also carries the board's Zobrist hash and, when the board had it cached,
+    the side to move's legal-move mask, so to_board() restores without recomputing.
+    """
+    __slots__ = ('black', 'white', 'player', 'size', 'hash', 'moves')
+
+    def __init__(self, black, white, player, size=BOARD_SIZE, hash=None, moves=None):
+        object.__setattr__(self, 'black', black)
+        object.__setattr__(self, 'white', white)
+        object.__setattr__(self, 'player', player)
+        object.__setattr__(self, 'size', size)
+        object.__setattr__(self, 'hash', compute_hash(black, white) if hash is None else hash)
+        object.__setattr__(self, 'moves', moves)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Snapshot is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Snapshot is immutable")
+
+    def __eq__(self, other):
+        if not isinstance(other, Snapshot):
+            return NotImplemented
+        return (self.black == other.black and self.white == other.white
+                and self.player == other.player and self.size == other.size)
+
+    def __hash__(self):
+        return self.hash ^ self.player ^ self.size
+
+    def __repr__(self):
+        return f"Snapshot(0x{self.black:x}, 0x{self.white:x}, {self.player}, {self.size})"
+
+    def to_board(self):
+        board = Board.from_bitboards(self.black, self.white, self.size, self.hash)
+        if self.player == BLACK:
+            board._black_moves = self.moves
+        else:
+            board._white_moves = self.moves
+        return board
+
+
+class Board:
+    def __init__(self, size=BOARD_SIZE):
+        self.size = size
+        self._geometry = BoardGeometry.of(size)
+        self.black = 0
+        self.white = 0
+        self.hash = 0
+        self.black_count = 0
+        self.white_count = 0
+        self._grid = None
+        # Legal-move bitboards per side, computed on first use; None until then
+        self._black_moves = None
+        self._white_moves = None
+        self._setup_board()
+
+    def _setup_board(self):
+        # The centre four squares: white on the main diagonal, black on the other
+        self.white = self._geometry.start_white
+        self.black = self._geometry.start_black
+        self.hash = compute_hash(self.black, self.white)
+        self.black_count = self.white_count = 2
+
+    @classmethod
+    def from_bitboards(cls, black, white, size=BOARD_SIZE, hash=None):
+        """Builds a board from one bitboard per color; `hash`, if known, saves recomputing it."""
+        board = cls.__new__(cls)
+        board.size = size
+        board._geometry = BoardGeometry.of(size)
+        board.black = black
+        board.white = white
+        board.hash = compute_hash(black, white) if hash is None else hash
+        board.black_count = black.bit_count()
+        board.white_count = white.bit_count()
+        board._grid = None
+        board._black_moves = None
+        board._white_moves = None
+        return board
+
+    def copy(self):
+        new_board = Board.__new__(Board)
+        new_board.size = self.size
+        new_board._geometry = self._geometry
+        new_board.black = self.black
+        new_board.white = self.white
+        new_board.hash = self.hash
+        new_board.black_count = self.black_count
+        new_board.white_count = self.white_count
+        # Same position, so the move caches stay valid
+        new_board._grid = None
+        new_board._black_moves = self._black_moves
+        new_board._white_moves = self._white_moves
+        return new_board
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def snapshot(self, player):
+        """This position with `player` to move, as an immutable Snapshot."""
+        moves = self._black_moves if player == BLACK else self._white_moves
+        return Snapshot(self.black, self.white, player, self.size, self.hash, moves)
+
+    def _discs(self, player):
+        """Returns (own, opponent) bitboards for player."""
+        if player == BLACK:
+            return self.black, self.white
+        return self.white, self.black
+
+    @property
+    def grid(self):
+        """Read-only list-of-lists view of the board, as used by the GUI."""
+        if self._grid is None:
+            black, white, size = self.black, self.white, self.size
+            grid = []
+            for r in range(size):
+                row = []
+                for c in range(size):
+                    bit = 1 << (r * size + c)
+                    if black & bit:
+                        row.append(BLACK)
+                    elif white & bit:
+                        row.append(WHITE)
+                    else:
+                        row.append(EMPTY)
+                grid.append(row)
+            self._grid = grid
+        return self._grid
+
+    @property
+    def empty_count(self):
+        return self._geometry.squares - self.black_count - self.white_count
+
+    def is_on_board(self, r, c):
+        return 0 <= r < self.size and 0 <= c < self.size
+
+    def get_valid_moves(self, player):
+        size = self.size
+        return [divmod(sq, size) for sq in iter_bits(self.valid_moves_mask(player))]
+
+    def has_moves(self, player):
+        return self.valid_moves_mask(player) != 0
+
+    def is_valid_move(self, r, c, player):
+        if not self.is_on_board(r, c):
+            return False
+        return bool(self.valid_moves_mask(player) & (1 << (r * self.size + c)))
+
+    def make_move(self, r, c, player):
+        """Returns a new Board instance with the move applied."""
+        if not self.is_on_board(r, c):
+            return None
+        sq = r * self.size + c
+        move = 1 << sq
+        own, opp = self._discs(player)
+        if (own | opp) & move:
+            return None
+        flips = ray_flips(own, opp, self._geometry.rays[sq])
+        if not flips:
+            return None
+
+        new_board = self.copy()
+        new_board._black_moves = new_board._white_moves = None
+        n_flips = flips.bit_count()
+        if player == BLACK:
+            new_board.black = own | move | flips
+            new_board.white = opp ^ flips
+            new_board.black_count += n_flips + 1
+            new_board.white_count -= n_flips
+        else:
+            new_board.white = own | move | flips
+            new_board.black = opp ^ flips
+            new_board.white_count += n_flips + 1
+            new_board.black_count -= n_flips
+        new_board.hash = self.hash ^ _move_hash(player, sq, flips)
+        return new_board
+
+    def valid_moves_mask(self, player):
+        """Bitboard of player's legal moves (bit r * size + c set for each), cached until the board changes."""
+        if player == BLACK:
+            moves = self._black_moves
+            if moves is None:
+                moves = self._black_moves = self._geometry.legal_moves(self.black, self.white)
+        else:
+            moves = self._white_moves
+            if moves is None:
+                moves = self._white_moves = self._geometry.legal_moves(self.white, self.black)
+        return moves
+
+    def apply(self, r, c, player):
+        """
+        Plays the move in place and returns an undo record, or None if the move is illegal.
+        The record is (player, square, flipped discs bitboard, hash before the move).
+        """
+        if not self.is_on_board(r, c):
+            return None
+        return self.apply_square(r * self.size + c, player)
+
+    def apply_square(self, sq, player):
+        """Same as apply() for square index sq = r * size + c."""
+        move = 1 << sq
+        own, opp = self._discs(player)
+        if (own | opp) & move:
+            return None
+        flips = ray_flips(own, opp, self._geometry.rays[sq])
+        if not flips:
+            return None
+
+        n_flips = flips.bit_count()
+        if player == BLACK:
+            self.black = own | move | flips
+            self.white = opp ^ flips
+            self.black_count += n_flips + 1
+            self.white_count -= n_flips
+        else:
+            self.white = own | move | flips
+            self.black = opp ^ flips
+            self.white_count += n_flips + 1
+            self.black_count -= n_flips
+        old_hash = self.hash
+        self.hash = old_hash ^ _move_hash(player, sq, flips)
+        self._grid = self._black_moves = self._white_moves = None
+        return (player, sq, flips, old_hash)
+
+    def undo(self, record):
+        """Reverts a move previously returned by apply()."""
+        player, sq, flips, old_hash = record
+        restored = (1 << sq) | flips
+        n_flips = flips.bit_count()
+        if player == BLACK:
+            self.black ^= restored
+            self.white |= flips
+            self.black_count -= n_flips + 1
+            self.white_count += n_flips
+        else:
+            self.white ^= restored
+            self.black |= flips
+            self.white_count -= n_flips + 1
+            self.black_count += n_flips
+        self.hash = old_hash
+        self._grid = self._black_moves = self._white_moves = None
+
+    def get_score(self):
+        return self.black_count, self.white_count
@@ -3,6 +3,9 @@ WHITE = -1
 EMPTY = 0
 
 BOARD_SIZE = 8
+# Board sizes Board supports (even, so the start position sits in the centre)
+BOARD_SIZES = (6, 8, 10)
+MAX_SQUARES = max(BOARD_SIZES) ** 2
 DIRECTIONS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
 # UI Colors mapped to logic
 COLOR_MAP = {
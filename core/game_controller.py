@@ -1,25 +1,144 @@
+import concurrent.futures
 import threading
 import copy
+import os
+import time
 from core.game_state import GameState
 from core.constants import BLACK, WHITE
+from core.game_record import GameRecord, HUMAN
+from ai.algorithm import Minimax
+from ai.search_stats import SearchLog
+from ai.transposition import TranspositionTable
+
+# Set to a file path to log every AI search as one JSON line
+SEARCH_LOG_ENV = "OTHELLO_SEARCH_LOG"
+# Background analysis of the human's moves deepens up to this many plies, then rests
+ANALYSIS_MAX_DEPTH = 12
+
 class GameController:
-    def __init__(self, agent_black, agent_white, callbacks):
+    def __init__(self, agent_black, agent_white, callbacks, search_log=None, ponder=False):
 
         self.agent_black = agent_black
         self.agent_white = agent_white
         self.callbacks = callbacks
+
+        # Structured log of every AI search (a path or a SearchLog), for offline analysis
+        search_log = search_log or os.environ.get(SEARCH_LOG_ENV)
+        if isinstance(search_log, str):
+            search_log = SearchLog(search_log)
+        self.search_log = search_log
+
+        # Pondering: while the human thinks, the AI searches its replies to the human's
+        # likely moves. Results are kept per position; the shared tables warm up either way.
+        # Agents that keep a search tree (MCTS) ponder the current position instead.
+        self.ponder = ponder
+        self._ponder_future = None
+        self._ponder_stop = None
+        self._pondered = {}  # Snapshot after a human move -> (move, status, stats)
+
+        # Every AI search and ponder runs on this one thread, one job at a time. The running
+        # AI search can be cancelled through its token (an Event the agent's search polls),
+        # and results carry the generation they started in: restart() and close() bump it,
+        # so a result that arrives for an older game is dropped.
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="othello-ai")
+        self._cancel = threading.Event()
+        self.generation = 0
+        self.closed = False
+        # (player, wall seconds, CPU seconds of the AI thread) for every AI move of this game
+        self.move_times = []
+
+        # Analysis: on a human's turn every legal move is scored in the background, deeper and
+        # deeper, and reported through callbacks['on_analysis'](results, stats, generation).
+        # It has its own search and thread, so it never waits for the AI, and every board
+        # update cancels it (see _notify_update). Off until set_analysis(True).
+        self.analysis = False
+        self.analysis_generation = 0
+        self._analysis_search = None
+        self._analysis_executor = None
+        self._analysis_stop = threading.Event()
         
         self.game_state = GameState()
         self.is_ai_thinking = False
+        self.started = time.time()
         
         # Initial check
         self.check_ai_turn()
 
+    def _abandon_game(self):
+        """Cancels the AI work of the current game and makes its pending results stale."""
+        self._cancel.set()
+        self.cancel_analysis()
+        self.stop_pondering()
+        self._pondered.clear()
+        self.generation += 1
+
     def restart(self):
+        self._abandon_game()
         self.game_state = GameState()
         self.is_ai_thinking = False
-        self.callbacks['on_update']()
+        self.started = time.time()
+        self.move_times = []
+        self._notify_update()
+        self.check_ai_turn()
+
+    def close(self):
+        """Cancels and waits for background work, then frees the agents; call when the game screen goes away."""
+        if self.closed:
+            return
+        self.closed = True
+        self._abandon_game()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        if self._analysis_executor:
+            self._analysis_executor.shutdown(wait=True, cancel_futures=True)
+        for agent in (self.agent_black, self.agent_white):
+            if agent:
+                agent.close()
+
+    # --- UNDO / REDO ---
+    def _is_human(self, player):
+        return not (self.agent_black if player == BLACK else self.agent_white)
+
+    def can_undo(self):
+        # Undo steps back to a human's turn, so there must be one before the current ply
+        state = self.game_state
+        return any(self._is_human(snapshot.player) for snapshot in state.history[:state.ply])
+
+    def can_redo(self):
+        return self.game_state.can_redo()
+
+    def undo(self):
+        """Takes back moves up to the human's previous turn; a running AI search is cancelled and its result dropped."""
+        if not self.can_undo():
+            return False
+        state = self.game_state
+        ply = state.ply - 1
+        while not self._is_human(state.history[ply].player):
+            ply -= 1
+        return self._jump(ply)
+
+    def redo(self):
+        """Plays taken-back moves again, up to the human's next turn or the end of the line."""
+        if not self.can_redo():
+            return False
+        state = self.game_state
+        ply = state.ply + 1
+        while ply < len(state.moves) and not self._is_human(state.history[ply].player):
+            ply += 1
+        return self._jump(ply)
+
+    def _jump(self, ply):
+        self._abandon_game()
+        self.is_ai_thinking = False
+        self.game_state.jump_to(ply)
+        self._notify_update()
         self.check_ai_turn()
+        return True
+
+    def _notify_update(self):
+        """Tells the UI the board changed; analysis of the old position is dropped and restarted."""
+        self.cancel_analysis()
+        self.callbacks['on_update']()
+        self.start_analysis()
 
     def handle_click(self, r, c):
         if self.is_ai_thinking or self.game_state.game_over:
@@ -31,48 +150,214 @@ class GameController:
             return
 
         if self.game_state.apply_move(r, c):
-            self.callbacks['on_update']()
+            self._notify_update()
             self.check_ai_turn()
 
     def check_ai_turn(self):
-        if self.game_state.game_over:
+        if self.game_state.game_over or self.closed:
             return
 
         curr = self.game_state.current_player
         agent = self.agent_black if curr == BLACK else self.agent_white
 
-        if agent:
-            self.is_ai_thinking = True
-            name = 'Black' if curr == BLACK else 'White'
-            self.callbacks['on_status'](f"AI ({name}) Thinking...", True)
-            
-            # Run AI in a separate thread to prevent UI freezing
-            board_copy = copy.deepcopy(self.game_state.board)
-            threading.Thread(target=self._ai_worker, args=(agent, board_copy), daemon=True).start()
-
-    def _ai_worker(self, agent, board):
-        """Runs in background thread."""
+        if not agent:
+            self.start_pondering()
+            return
+
+        self.stop_pondering()
+        self.is_ai_thinking = True
+        name = 'Black' if curr == BLACK else 'White'
+
+        board = self.game_state.board
+        pondered = self._pondered.get(board.snapshot(curr))
+        self._pondered.clear()
+        if pondered:
+            move, status, stats = pondered
+            agent.status = f"pondered, {status}" if status else "pondered"
+            agent.stats = stats
+            if self.search_log and stats is not None:
+                self.search_log.write(stats, agent=type(agent).__name__, move_number=len(self.game_state.log) + 1,
+                                      black=board.black, white=board.white, pondered=True)
+            self.callbacks['on_ai_result'](move)
+            return
+
+        self.callbacks['on_status'](f"AI ({name}) Thinking...", True)
+
+        # Live depth / speed while the search runs (called from the AI thread)
+        generation = self.generation
+        def on_progress(stats):
+            if generation == self.generation:
+                self.callbacks['on_status'](f"AI ({name}) {stats.summary()}", True)
+        agent.on_progress = on_progress
+        
+        # Run AI on the controller's thread to prevent UI freezing
+        self._cancel = threading.Event()
+        board_copy = copy.deepcopy(self.game_state.board)
+        move_number = len(self.game_state.log) + 1
+        self._executor.submit(self._ai_worker, agent, board_copy, move_number, generation, self._cancel)
+
+    def _ai_worker(self, agent, board, move_number, generation, cancel):
+        """Runs on the AI thread."""
+        if cancel.is_set():
+            return
+        agent.set_stop_event(cancel)
+        start_wall = time.perf_counter()
+        start_cpu = time.thread_time()
         try:
             move = agent.get_move(board)
         except Exception as e:
             print(f"AI Error: {e}")
             move = None
+        finally:
+            agent.set_stop_event(None)
+        wall = time.perf_counter() - start_wall
+        cpu = time.thread_time() - start_cpu
+
+        if cancel.is_set() or generation != self.generation:
+            return  # restarted or closed meanwhile: nobody wants this move
+
+        self.move_times.append((agent.color, wall, cpu))
+        if agent.stats is not None:
+            agent.stats.cpu_time = cpu
+            if self.search_log:
+                self.search_log.write(agent.stats, agent=type(agent).__name__, move_number=move_number,
+                                      black=board.black, white=board.white)
         
         # Trigger UI callback (UI must handle thread-safety via .after)
         self.callbacks['on_ai_result'](move)
 
-    def finish_ai_move(self, move):
-        """Called by UI on Main Thread after AI finishes."""
+    def finish_ai_move(self, move, generation=None):
+        """
+        Called by UI on Main Thread after AI finishes. Pass the generation read when the
+        result arrived, so a result delayed past a restart is ignored.
+        """
+        if generation is not None and generation != self.generation:
+            return
+        if not self.is_ai_thinking:
+            return
+        mover = self.game_state.current_player
         if move:
             self.game_state.apply_move(move[0], move[1])
         
         self.is_ai_thinking = False
-        self.callbacks['on_update']()
+        self._notify_update()
+
+        # Let the agent say how it found the move (e.g. an exact endgame solve)
+        agent = self.agent_black if mover == BLACK else self.agent_white
+        if agent and agent.status and not self.game_state.game_over:
+            name = 'Black' if mover == BLACK else 'White'
+            self.callbacks['on_status'](f"AI ({name}) {agent.status}", False)
         
         # Schedule next check
         if not self.game_state.game_over:
             self.check_ai_turn()
 
+    # --- ANALYSIS ---
+    def set_analysis(self, enabled):
+        self.analysis = enabled
+        if enabled:
+            self.start_analysis()
+        else:
+            self.cancel_analysis()
+
+    def start_analysis(self):
+        """Starts scoring the current player's moves in the background if it is a human's turn."""
+        self.cancel_analysis()
+        if not self.analysis or self.closed or not self.should_show_hints():
+            return
+        if self._analysis_search is None:
+            self._analysis_search = Minimax(TranspositionTable(size_mb=16), pattern_eval=True)
+            self._analysis_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="othello-analysis")
+        self._analysis_stop = threading.Event()
+        board = copy.deepcopy(self.game_state.board)
+        self._analysis_executor.submit(self._analysis_worker, board, self.game_state.current_player,
+                                       self.analysis_generation, self._analysis_stop)
+
+    def cancel_analysis(self):
+        """Stops the running analysis without waiting for it; results still in flight become stale."""
+        self._analysis_stop.set()
+        self.analysis_generation += 1
+
+    def _analysis_worker(self, board, player, generation, stop):
+        """Runs on the analysis thread."""
+        if stop.is_set():
+            return
+        search = self._analysis_search
+        search.stop_event = stop
+        scale = search.evaluate.scale
+
+        def on_depth(results, stats):
+            if not stop.is_set() and generation == self.analysis_generation:
+                # Scores in discs (roughly, for the heuristic part) for the side to move
+                scored = [(move, score / scale, line) for move, score, line in results]
+                self.callbacks['on_analysis'](scored, stats, generation)
+        try:
+            search.score_moves(board, player, depth=ANALYSIS_MAX_DEPTH, on_depth=on_depth)
+        except Exception as e:
+            print(f"Analysis Error: {e}")
+        finally:
+            search.stop_event = None
+
+    # --- PONDERING ---
+    def start_pondering(self):
+        """Starts searching the AI's replies in the background if it is a human's turn in a PvA game."""
+        self.stop_pondering()
+        if not self.ponder or self.closed or self.game_state.game_over:
+            return
+        human = self.game_state.current_player
+        agent = self.agent_white if human == BLACK else self.agent_black
+        if agent is None or (self.agent_black and self.agent_white):
+            return
+        self._ponder_stop = threading.Event()
+        board = copy.deepcopy(self.game_state.board)
+        self._ponder_future = self._executor.submit(self._ponder_worker, agent, board, human, self._ponder_stop)
+
+    def stop_pondering(self):
+        """Stops the ponder search and waits for it, so the agent is free for a real search."""
+        if self._ponder_future is None:
+            return
+        self._ponder_stop.set()
+        concurrent.futures.wait([self._ponder_future])
+        self._ponder_future = None
+        self._ponder_stop = None
+
+    def _ponder_worker(self, agent, board, human, stop):
+        """Runs on the AI thread: answers the human's candidate moves, most likely first."""
+        if stop.is_set():
+            return
+        agent.set_stop_event(stop)
+        agent.on_progress = None
+        try:
+            if agent.ponder(board, human):
+                return
+            for r, c in self._ponder_order(agent, board, human):
+                child = board.make_move(r, c, human)
+                if not child.has_moves(agent.color):
+                    continue  # the human would move again (or the game ends)
+                move = agent.get_move(child)
+                if stop.is_set() or move is None:
+                    break
+                self._pondered[child.snapshot(agent.color)] = (move, agent.status, agent.stats)
+        except Exception as e:
+            print(f"Ponder Error: {e}")
+        finally:
+            agent.set_stop_event(None)
+
+    @staticmethod
+    def _ponder_order(agent, board, human):
+        """The human's moves, starting with the reply the agent's last search expected."""
+        moves = board.get_valid_moves(human)
+        stats = agent.stats
+        if stats is not None and len(stats.pv) > 1 and stats.pv[1] in moves:
+            moves.remove(stats.pv[1])
+            moves.insert(0, stats.pv[1])
+        return moves
+
+    def get_record(self):
+        """The game so far as a GameRecord, for saving."""
+        names = [type(agent).__name__ if agent else HUMAN for agent in (self.agent_black, self.agent_white)]
+        return GameRecord.from_game_state(self.game_state, *names, started=self.started)
+
     # --- VIEW HELPERS (Exposing data and logic for GUI) ---
     def get_board(self):
         return self.game_state.board
@@ -0,0 +1,256 @@
+"""
+Game records: compact storage for many finished (or abandoned) games, and replay.
+
+On-disk format (little endian), games appended one after another:
+    file header  5s magic b"OTHR\\x01"
+    per game     B flags, B move count, b result (black discs - white discs),
+                 I start time, I end time (unix seconds),
+                 B length + UTF-8 name of the black agent, the same for white,
+                 one B square (r * 8 + c) per move
+
+Games are played on the 8x8 board from the standard position. Passes are not stored: when the side to
+move has no legal move the other side plays, exactly as in the game. Files are
+read and written as streams, so they can hold any number of games.
+
+    python -m core.game_record games.othr                  # list the games
+    python -m core.game_record games.othr --game 3 --ply 20
+"""
+import argparse
+import os
+import struct
+import time
+
+from .board import Board
+from .constants import BLACK, WHITE, BOARD_SIZE
+
+MAGIC = b"OTHR\x01"
+GAME_HEADER = struct.Struct("<BBbII")
+# flags
+COMPLETE = 1  # the game was played to the end
+# Replay keeps the position every SNAPSHOT_INTERVAL plies, so seeking replays at most that many moves
+SNAPSHOT_INTERVAL = 8
+# Human players have no agent; they are recorded under this name
+HUMAN = "human"
+
+
+class GameRecord:
+    """One game: the agents' names, the moves ((r, c) per move, passes left out), result and times."""
+    def __init__(self, moves, black=HUMAN, white=HUMAN, result=None, complete=False, started=None, finished=None):
+        self.moves = list(moves)
+        self.black = black
+        self.white = white
+        self.complete = complete
+        self.started = int(started if started is not None else time.time())
+        self.finished = int(finished if finished is not None else time.time())
+        if result is None:
+            board, _ = Replay(self).position(len(self.moves))
+            result = board.black_count - board.white_count
+        self.result = result
+
+    @classmethod
+    def from_game_state(cls, state, black=HUMAN, white=HUMAN, started=None):
+        """The record of a GameState played from the start position; ValueError for other board sizes."""
+        if state.board.size != BOARD_SIZE:
+            raise ValueError(f"game records hold {BOARD_SIZE}x{BOARD_SIZE} games only, "
+                             f"not {state.board.size}x{state.board.size}")
+        return cls([(r, c) for _, r, c in state.log], black, white,
+                   complete=state.game_over, started=started)
+
+    @property
+    def winner(self):
+        return BLACK if self.result > 0 else WHITE if self.result < 0 else 0
+
+    def to_bytes(self):
+        names = b""
+        for name in (self.black, self.white):
+            data = name.encode("utf-8")[:255]
+            names += bytes([len(data)]) + data
+        header = GAME_HEADER.pack(COMPLETE if self.complete else 0, len(self.moves), self.result,
+                                  self.started, self.finished)
+        return header + names + bytes(r * 8 + c for r, c in self.moves)
+
+    def __repr__(self):
+        return (f"GameRecord({self.black} vs {self.white}, {len(self.moves)} moves, "
+                f"result {self.result:+d}{'' if self.complete else ', unfinished'})")
+
+
+class RecordWriter:
+    """Appends games to a record file, creating it (with its header) if needed."""
+    def __init__(self, path):
+        self.path = path
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "ab")
+        if new:
+            self._file.write(MAGIC)
+
+    def write(self, record):
+        self._file.write(record.to_bytes())
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_records(path, records):
+    """Appends every record of an iterable (e.g. a generator) to path; returns how many."""
+    count = 0
+    with RecordWriter(path) as writer:
+        for record in records:
+            writer.write(record)
+            count += 1
+    return count
+
+
+def _read_exact(f, size):
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError("truncated game record")
+    return data
+
+
+def _read_game(f):
+    """Reads the game at the file position, or returns None at the end of the file."""
+    header = f.read(GAME_HEADER.size)
+    if not header:
+        return None
+    if len(header) != GAME_HEADER.size:
+        raise ValueError("truncated game record")
+    flags, count, result, started, finished = GAME_HEADER.unpack(header)
+    names = []
+    for _ in range(2):
+        length = _read_exact(f, 1)[0]
+        names.append(_read_exact(f, length).decode("utf-8"))
+    moves = [divmod(sq, 8) for sq in _read_exact(f, count)]
+    return GameRecord(moves, names[0], names[1], result, bool(flags & COMPLETE), started, finished)
+
+
+def _open(path):
+    f = open(path, "rb", buffering=1 << 16)
+    if f.read(len(MAGIC)) != MAGIC:
+        f.close()
+        raise ValueError(f"{path} is not a game record file")
+    return f
+
+
+def read_records(path):
+    """Yields the games of a record file one at a time, without loading the file."""
+    with _open(path) as f:
+        while True:
+            record = _read_game(f)
+            if record is None:
+                return
+            yield record
+
+
+def record_offsets(path):
+    """Yields the file offset of every game, reading only the headers, for read_record_at."""
+    with _open(path) as f:
+        while True:
+            offset = f.tell()
+            header = f.read(GAME_HEADER.size)
+            if not header:
+                return
+            if len(header) != GAME_HEADER.size:
+                raise ValueError("truncated game record")
+            count = header[1]
+            for _ in range(2):
+                f.seek(_read_exact(f, 1)[0], os.SEEK_CUR)
+            f.seek(count, os.SEEK_CUR)
+            yield offset
+
+
+def read_record_at(path, offset):
+    with _open(path) as f:
+        f.seek(offset)
+        record = _read_game(f)
+    if record is None:
+        raise ValueError(f"no game at offset {offset}")
+    return record
+
+
+class Replay:
+    """
+    Positions of a recorded game by ply (0 = start position). The moves are played
+    through once and the position kept every SNAPSHOT_INTERVAL plies, so any ply is
+    reached by replaying a few moves from the snapshot before it.
+    """
+    def __init__(self, record):
+        self.moves = record.moves
+        # ply // SNAPSHOT_INTERVAL -> (black, white, side to move); also the mover of every ply
+        self.snapshots = []
+        self.players = []
+        board = Board()
+        player = BLACK
+        for ply, (r, c) in enumerate(self.moves):
+            if ply % SNAPSHOT_INTERVAL == 0:
+                self.snapshots.append((board.black, board.white, player))
+            player = self._mover(board, player)
+            if player is None or not board.is_valid_move(r, c, player):
+                raise ValueError(f"illegal move {(r, c)} at ply {ply + 1}")
+            self.players.append(player)
+            board = board.make_move(r, c, player)
+            player = -player
+        if len(self.moves) % SNAPSHOT_INTERVAL == 0:
+            self.snapshots.append((board.black, board.white, player))
+
+    @staticmethod
+    def _mover(board, player):
+        """Who actually moves when `player` is due: the other side if player must pass, None if nobody can."""
+        if board.has_moves(player):
+            return player
+        if board.has_moves(-player):
+            return -player
+        return None
+
+    def __len__(self):
+        return len(self.moves)
+
+    def position(self, ply):
+        """(board, side to move) after `ply` moves."""
+        if not 0 <= ply <= len(self.moves):
+            raise IndexError(f"ply {ply} out of range 0..{len(self.moves)}")
+        base = ply // SNAPSHOT_INTERVAL
+        black, white, player = self.snapshots[base]
+        board = Board.from_bitboards(black, white)
+        for i in range(base * SNAPSHOT_INTERVAL, ply):
+            r, c = self.moves[i]
+            board = board.make_move(r, c, self.players[i])
+            player = -self.players[i]
+        return board, self._mover(board, player) or player
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List the games of a record file or show one position.")
+    parser.add_argument("path")
+    parser.add_argument("--game", type=int, help="game number (from 0) to show")
+    parser.add_argument("--ply", type=int, help="moves to replay (default: the whole game)")
+    args = parser.parse_args(argv)
+
+    if args.game is None:
+        for i, record in enumerate(read_records(args.path)):
+            when = time.strftime("%Y-%m-%d %H:%M", time.localtime(record.started))
+            print(f"{i:>6}  {when}  {record.black} vs {record.white}: {len(record.moves)} moves, "
+                  f"{record.result:+d}{'' if record.complete else ' (unfinished)'}")
+        return
+
+    for i, offset in enumerate(record_offsets(args.path)):
+        if i == args.game:
+            record = read_record_at(args.path, offset)
+            break
+    else:
+        parser.error(f"no game {args.game}")
+    ply = len(record.moves) if args.ply is None else args.ply
+    board, player = Replay(record).position(ply)
+    for row in board.grid:
+        print("".join('X' if v == BLACK else 'O' if v == WHITE else '-' for v in row))
+    print(f"ply {ply}/{len(record.moves)}, {'black' if player == BLACK else 'white'} to move, "
+          f"discs {board.black_count}-{board.white_count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,33 @@
 from .board import Board
-from .constants import BLACK, WHITE
+from .constants import BLACK, WHITE, BOARD_SIZE
 
 class GameState:
-    def __init__(self):
-        self.board = Board()
+    def __init__(self, size=BOARD_SIZE):
+        self.board = Board(size)
         self.current_player = BLACK
         self.game_over = False
         self.winner = None
-        self.log = []
+        # history[ply] is the position after `ply` moves (a Snapshot, side to move included) and
+        # moves[ply - 1] the (player, r, c) that led to it. Undone moves stay until a new move
+        # replaces them, so undo, redo and jump_to only move `ply`.
+        self.history = [self.board.snapshot(BLACK)]
+        self.moves = []
+        self.ply = 0
+
+    @classmethod
+    def from_position(cls, board, player):
+        """A game starting from `board` with `player` to move (the other side moves if player cannot)."""
+        state = cls(board.size)
+        state.board = board
+        state.current_player = -player
+        state.switch_turn()
+        state.history = [board.snapshot(state.current_player)]
+        return state
+
+    @property
+    def log(self):
+        """(player, r, c) of every move up to the current ply."""
+        return self.moves[:self.ply]
 
     def apply_move(self, r, c):
         if self.game_over:
@@ -16,17 +36,23 @@ class GameState:
         new_board = self.board.make_move(r, c, self.current_player)
         if new_board: # if the move is valid
             self.board = new_board
-            self.log.append((self.current_player, r, c))
+            # A new move drops the undone ones after it
+            del self.moves[self.ply:]
+            del self.history[self.ply + 1:]
+            self.moves.append((self.current_player, r, c))
             self.switch_turn()
+            self.ply += 1
+            self.history.append(new_board.snapshot(self.current_player))
             return True
         return False
 
     def switch_turn(self):
         self.current_player = -self.current_player
-        if not self.board.get_valid_moves(self.current_player):
+        # The board caches each side's moves, so the GUI and agents reuse this pass
+        if not self.board.has_moves(self.current_player):
             print(f"Player {self.current_player} has no moves.")
             self.current_player = -self.current_player
-            if not self.board.get_valid_moves(self.current_player):
+            if not self.board.has_moves(self.current_player):
                 self.game_over = True
                 self.determine_winner()
 
@@ -35,3 +61,31 @@ class GameState:
         if b > w: self.winner = BLACK
         elif w > b: self.winner = WHITE
         else: self.winner = 0 # Draw
+
+    # --- HISTORY ---
+    def can_undo(self):
+        return self.ply > 0
+
+    def can_redo(self):
+        return self.ply < len(self.moves)
+
+    def undo(self):
+        return self.jump_to(self.ply - 1)
+
+    def redo(self):
+        return self.jump_to(self.ply + 1)
+
+    def jump_to(self, ply):
+        """Shows the position after `ply` moves of the current line; False if there is no such ply."""
+        if not 0 <= ply < len(self.history):
+            return False
+        snapshot = self.history[ply]
+        self.ply = ply
+        self.board = snapshot.to_board()
+        # Snapshots are stored after passes are resolved: the side to move can move unless the game is over
+        self.current_player = snapshot.player
+        self.game_over = not self.board.has_moves(snapshot.player)
+        self.winner = None
+        if self.game_over:
+            self.determine_winner()
+        return True
@@ -0,0 +1,35 @@
+import random
+
+from .constants import MAX_SQUARES
+
+# Fixed seed so every process (and every saved hash) agrees on the same keys.
+_rng = random.Random(0x0E11E110)
+
+ZOBRIST_BLACK = [_rng.getrandbits(64) for _ in range(64)]
+ZOBRIST_WHITE = [_rng.getrandbits(64) for _ in range(64)]
+# XOR-ing this in turns a black disc on the square into a white one and back.
+ZOBRIST_FLIP = [b ^ w for b, w in zip(ZOBRIST_BLACK, ZOBRIST_WHITE)]
+# Mixed into search keys when white is to move.
+ZOBRIST_SIDE = _rng.getrandbits(64)
+
+# Keys for the squares of larger boards come after, so 8x8 hashes (and the
+# opening book keyed by them) stay the same.
+_extra = MAX_SQUARES - 64
+ZOBRIST_BLACK += [_rng.getrandbits(64) for _ in range(_extra)]
+ZOBRIST_WHITE += [_rng.getrandbits(64) for _ in range(_extra)]
+ZOBRIST_FLIP += [b ^ w for b, w in zip(ZOBRIST_BLACK[64:], ZOBRIST_WHITE[64:])]
+
+
+def compute_hash(black, white):
+    """Hashes a position from scratch. Board keeps its hash updated incrementally."""
+    h = 0
+    sq = 0
+    while black or white:
+        if black & 1:
+            h ^= ZOBRIST_BLACK[sq]
+        elif white & 1:
+            h ^= ZOBRIST_WHITE[sq]
+        black >>= 1
+        white >>= 1
+        sq += 1
+    return h
@@ -0,0 +1,308 @@
+"""
+Headless engine: drives the board and the agents over a line-based protocol on
+stdin/stdout, for scripts, GUIs and batch analysis. Imports only core and ai.
+
+    python engine.py [--agent advanced] [--depth N | --time SECONDS] [--book]
+
+One command per line; every reply is one or more lines on stdout, anything else
+(diagnostics) goes to stderr. Squares are written a1..h8: column a-h, row 1-8
+from the top, so black's opening moves are d3, c4, f5 and e6.
+
+    ping [n]                  -> pong [n]   (sync point: earlier commands are done)
+    newgame                   start position, black to move
+    position <64 chars> <X|O> squares a1, b1 .. h8: X black, O white, - or . empty;
+                              then the side to move (it passes if it has no move)
+    moves <m> [<m> ...]       plays moves from the current position ("pass" is skipped)
+    undo                      takes back the last move
+    redo                      plays the last taken-back move again
+    set agent <beginner|intermediate|advanced|mcts>
+    set depth <n>             search n plies (clears the time limit; mcts plays its default playouts)
+    set time <seconds>        search until the time runs out (clears the depth)
+    set book <on|off>         opening book for the intermediate/advanced agents (default off)
+    go                        -> move <m> score <s> depth <d> nodes <n> time <t>   (not played)
+    play                      like go, then plays the move
+    save <file>               appends the game so far to a game-record file (core.game_record)
+    replay <file> <n> [ply]   sets up game n (from 0) of a record file after `ply` moves
+                              (default: all of them); undo steps back through it
+    analyze                   -> search <m> <score> <depth> <line...>, one per legal move,
+                                 best first, then "analyze end"
+    show                      -> the board, 8 lines, then "to-move <X|O> discs <black> <white>"
+                                 ("game-over discs ..." once neither side can move)
+    quit
+
+Scores are in the agent's evaluation units, from the point of view of the side to
+move; "-" means the agent did not search (book, random or a single legal move).
+For mcts the score is the expected result in percent, depth the deepest line of the
+tree and nodes the playouts; it cannot analyze.
+Replies to bad commands start with "error". Agents are kept between commands, so
+their transposition tables carry over from move to move; changing a setting
+replaces them.
+"""
+import argparse
+import contextlib
+import sys
+
+from core.board import Board
+from core.constants import BLACK, WHITE
+from core.game_state import GameState
+from core.game_record import GameRecord, RecordWriter, HUMAN, record_offsets, read_record_at
+from ai.BeginnerAgent import BeginnerAgent
+from ai.IntermediateAgent import IntermediateAgent
+from ai.AdvancedAgent import AdvancedAgent
+from ai.MCTSAgent import MCTSAgent
+
+AGENTS = {'beginner': BeginnerAgent, 'intermediate': IntermediateAgent, 'advanced': AdvancedAgent, 'mcts': MCTSAgent}
+COLUMNS = "abcdefgh"
+SIDES = {'X': BLACK, 'O': WHITE}
+SIDE_NAMES = {BLACK: 'X', WHITE: 'O'}
+
+
+class ProtocolError(Exception):
+    """A command that cannot be carried out; reported as an 'error' line."""
+
+
+def parse_square(text):
+    if len(text) == 2 and text[0].lower() in COLUMNS and text[1] in "12345678":
+        return int(text[1]) - 1, COLUMNS.index(text[0].lower())
+    raise ProtocolError(f"bad square '{text}'")
+
+
+def format_square(move):
+    if move is None:
+        return "pass"
+    r, c = move
+    return f"{COLUMNS[c]}{r + 1}"
+
+
+def parse_board(text):
+    if len(text) != 64:
+        raise ProtocolError("a position needs 64 squares")
+    black = white = 0
+    for sq, ch in enumerate(text):
+        if ch in "Xx*":
+            black |= 1 << sq
+        elif ch in "Oo":
+            white |= 1 << sq
+        elif ch not in "-.":
+            raise ProtocolError(f"bad square character '{ch}'")
+    return Board.from_bitboards(black, white)
+
+
+class EngineSession:
+    """One protocol session: a game in progress and the agents searching it."""
+    def __init__(self, out, agent='advanced', depth=None, time_limit=None, use_book=False):
+        self.out = out
+        self.agent_name = agent
+        self.depth = depth
+        self.time_limit = time_limit
+        self.use_book = use_book
+        self._agents = {}
+        self.new_game()
+
+    # --- GAME ---
+    def new_game(self):
+        self.set_position(Board(), BLACK)
+        # Only games played from the start position can be saved as records
+        self.from_start = True
+
+    def set_position(self, board, player):
+        self.game = GameState.from_position(board, player)
+        self.from_start = False
+
+    def play(self, move):
+        if self.game.game_over:
+            raise ProtocolError("game over")
+        if not self.game.apply_move(*move):
+            raise ProtocolError(f"illegal move {format_square(move)}")
+
+    def undo(self):
+        if not self.game.undo():
+            raise ProtocolError("nothing to undo")
+
+    # --- AGENTS ---
+    def agent(self, color):
+        """The agent for `color`, built on first use with the current settings."""
+        agent = self._agents.get(color)
+        if agent is None:
+            agent_class = AGENTS[self.agent_name]
+            if agent_class is BeginnerAgent:
+                agent = agent_class(color)
+            elif agent_class is MCTSAgent:
+                agent = agent_class(color, time_limit=self.time_limit)
+            else:
+                agent = agent_class(color, depth=self.depth, time_limit=self.time_limit, use_book=self.use_book)
+            self._agents[color] = agent
+        return agent
+
+    def reset_agents(self):
+        for agent in self._agents.values():
+            agent.close()
+        self._agents = {}
+
+    def close(self):
+        self.reset_agents()
+
+    # --- COMMANDS ---
+    def handle(self, line):
+        """Runs one command line; returns False once the session should end."""
+        words = line.split()
+        if not words:
+            return True
+        command, args = words[0].lower(), words[1:]
+        if command == "quit":
+            return False
+        handler = getattr(self, f"cmd_{command}", None)
+        try:
+            if handler is None:
+                raise ProtocolError(f"unknown command '{command}'")
+            handler(args)
+        except ProtocolError as e:
+            self.reply(f"error {e}")
+        return True
+
+    def reply(self, text):
+        self.out.write(text + "\n")
+        self.out.flush()
+
+    def cmd_ping(self, args):
+        self.reply(" ".join(["pong"] + args))
+
+    def cmd_newgame(self, args):
+        self.new_game()
+
+    def cmd_position(self, args):
+        if len(args) != 2 or args[1].upper() not in SIDES:
+            raise ProtocolError("usage: position <64 squares> <X|O>")
+        self.set_position(parse_board(args[0]), SIDES[args[1].upper()])
+
+    def cmd_moves(self, args):
+        for text in args:
+            if text.lower() != "pass":
+                self.play(parse_square(text))
+
+    def cmd_undo(self, args):
+        self.undo()
+
+    def cmd_redo(self, args):
+        if not self.game.redo():
+            raise ProtocolError("nothing to redo")
+
+    def cmd_set(self, args):
+        if len(args) != 2:
+            raise ProtocolError("usage: set <agent|depth|time|book> <value>")
+        name, value = args[0].lower(), args[1]
+        try:
+            if name == "agent":
+                if value not in AGENTS:
+                    raise ProtocolError(f"unknown agent '{value}'")
+                self.agent_name = value
+            elif name == "depth":
+                self.depth, self.time_limit = int(value), None
+            elif name == "time":
+                self.depth, self.time_limit = None, float(value)
+            elif name == "book":
+                self.use_book = value.lower() in ("on", "true", "1")
+            else:
+                raise ProtocolError(f"unknown setting '{name}'")
+        except ValueError:
+            raise ProtocolError(f"bad value '{value}' for {name}")
+        self.reset_agents()
+
+    def search(self):
+        if self.game.game_over:
+            raise ProtocolError("game over")
+        agent = self.agent(self.game.current_player)
+        move = agent.get_move(self.game.board)
+        if move is None:
+            raise ProtocolError("no move found")
+        return move, agent.stats
+
+    def cmd_go(self, args):
+        move, stats = self.search()
+        self.reply(self.format_move(move, stats))
+
+    def cmd_play(self, args):
+        move, stats = self.search()
+        self.play(move)
+        self.reply(self.format_move(move, stats))
+
+    @staticmethod
+    def format_move(move, stats):
+        if stats is None:
+            return f"move {format_square(move)} score - depth - nodes 0 time 0"
+        score = "-" if stats.score is None else stats.score
+        depth = "-" if stats.depth is None else stats.depth
+        return f"move {format_square(move)} score {score} depth {depth} nodes {stats.nodes} time {stats.elapsed:.3f}"
+
+    def cmd_save(self, args):
+        if len(args) != 1:
+            raise ProtocolError("usage: save <file>")
+        if not self.from_start:
+            raise ProtocolError("only games played from the start position can be saved")
+        # A side counts as the engine's if it searched for that colour
+        names = [self.agent_name if color in self._agents else HUMAN for color in (BLACK, WHITE)]
+        try:
+            with RecordWriter(args[0]) as writer:
+                writer.write(GameRecord.from_game_state(self.game, *names))
+        except (OSError, ValueError) as e:
+            raise ProtocolError(str(e))
+
+    def cmd_replay(self, args):
+        if len(args) not in (2, 3):
+            raise ProtocolError("usage: replay <file> <game> [ply]")
+        try:
+            index = int(args[1])
+            offset = next((o for i, o in enumerate(record_offsets(args[0])) if i == index), None)
+            if offset is None:
+                raise ProtocolError(f"no game {index} in {args[0]}")
+            record = read_record_at(args[0], offset)
+            ply = int(args[2]) if len(args) == 3 else len(record.moves)
+        except (OSError, ValueError) as e:
+            raise ProtocolError(str(e))
+        self.new_game()
+        for move in record.moves[:max(0, ply)]:
+            self.play(move)
+
+    def cmd_analyze(self, args):
+        if self.game.game_over:
+            raise ProtocolError("game over")
+        agent = self.agent(self.game.current_player)
+        if not hasattr(getattr(agent, 'ai', None), 'score_moves'):
+            raise ProtocolError(f"the {self.agent_name} agent cannot analyze")
+        results, stats = agent.ai.score_moves(self.game.board, self.game.current_player, depth=agent.depth,
+                                              time_limit=agent.time_limit, node_limit=agent.node_limit)
+        for move, score, line in results:
+            self.reply(f"search {format_square(move)} {score} {stats.depth} " + " ".join(map(format_square, line)))
+        self.reply("analyze end")
+
+    def cmd_show(self, args):
+        grid = self.game.board.grid
+        for row in grid:
+            self.reply("".join('X' if v == BLACK else 'O' if v == WHITE else '-' for v in row))
+        b, w = self.game.board.get_score()
+        state = "game-over" if self.game.game_over else f"to-move {SIDE_NAMES[self.game.current_player]}"
+        self.reply(f"{state} discs {b} {w}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Line-based Othello engine on stdin/stdout.")
+    parser.add_argument("--agent", choices=sorted(AGENTS), default="advanced")
+    parser.add_argument("--depth", type=int, help="search depth (default: the agent's)")
+    parser.add_argument("--time", type=float, help="seconds per move instead of a fixed depth")
+    parser.add_argument("--book", action="store_true", help="play from the opening book")
+    args = parser.parse_args(argv)
+
+    out = sys.stdout
+    session = EngineSession(out, args.agent, args.depth, args.time, args.book)
+    # The game and the agents print diagnostics (e.g. passes); keep them off the protocol stream
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            for line in sys.stdin:
+                if not session.handle(line):
+                    break
+        finally:
+            session.close()
+
+
+if __name__ == "__main__":
+    main()
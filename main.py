@@ -5,7 +5,8 @@ import os
 # Ensure we can find the submodules
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from ui.gui import MenuScreen, GameScreen, COLOR_BG
+from tkinter import filedialog
+from ui.gui import MenuScreen, GameScreen, ReplayScreen, COLOR_BG, GAME_FILE_TYPES
 from modes.pvp import PvPMode
 from modes.pva import PvAMode
 from modes.ava import AvAMode
@@ -33,16 +34,17 @@ class OthelloApp(ctk.CTk):
         self.current_frame = MenuScreen(
             self, 
             start_pvp=lambda: self.start_game(PvPMode),
-            start_pva=lambda: self.start_game(PvAMode),
-            start_ava=lambda: self.start_game(AvAMode)
+            start_pva=lambda level='advanced': self.start_game(PvAMode, level),
+            start_ava=lambda black='beginner', white='advanced': self.start_game(AvAMode, black, white),
+            start_replay=self.start_replay
         )
         self.current_frame.pack(fill="both", expand=True)
 
-    def start_game(self, mode_class):
+    def start_game(self, mode_class, *choices):
         if self.current_frame: self.current_frame.destroy()
         
-        # Get agents from the mode class factory
-        agent_black, agent_white = mode_class.get_agents()
+        # Get agents from the mode class factory (choices: the difficulties picked in the menu)
+        agent_black, agent_white = mode_class.get_agents(*choices)
         
         self.current_frame = GameScreen(
             self, 
@@ -52,6 +54,19 @@ class OthelloApp(ctk.CTk):
         )
         self.current_frame.pack(fill="both", expand=True)
 
+    def start_replay(self):
+        path = filedialog.askopenfilename(parent=self, title="Open saved games", filetypes=GAME_FILE_TYPES)
+        if not path:
+            return
+        try:
+            screen = ReplayScreen(self, on_back=self.show_menu, path=path)
+        except (OSError, ValueError) as e:
+            print(f"Cannot open {path}: {e}")
+            return
+        if self.current_frame: self.current_frame.destroy()
+        self.current_frame = screen
+        self.current_frame.pack(fill="both", expand=True)
+
 if __name__ == "__main__":
     app = OthelloApp()
-    app.mainloop()
\ No newline at end of file
+    app.mainloop()
\ No newline at end of file
@@ -1,9 +1,15 @@
-from ai.BeginnerAgent import BeginnerAgent
-from ai.AdvancedAgent import AdvancedAgent
+from modes.pva import PvAMode
 from core.constants import BLACK, WHITE
 
+# Matchups offered in the menu: (black difficulty, white difficulty), see PvAMode.create_agent
+MATCHUPS = (
+    ('beginner', 'advanced'),
+    ('mcts', 'advanced'),
+    ('intermediate', 'mcts'),
+    ('advanced', 'advanced'),
+)
+
 class AvAMode:
     @staticmethod
-    def get_agents():  
-        return BeginnerAgent(BLACK), AdvancedAgent(WHITE)
-
+    def get_agents(black='beginner', white='advanced'):
+        return PvAMode.create_agent(black, BLACK), PvAMode.create_agent(white, WHITE)
@@ -0,0 +1,149 @@
+"""
+Load generator for modes.server: many simulated players, each on its own
+connection, play random legal moves against the AI and time every reply.
+
+    python -m modes.load_test --clients 64 --games 2 --difficulty intermediate
+    python -m modes.load_test --spawn --workers 4 --clients 64   # starts a local server too
+
+Reports p50/p99 move latency (human move sent -> AI reply received), throughput,
+and sessions per core: concurrent games divided by the server's AI workers.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from modes.server import GameServer, parse_budgets, DEFAULT_QUEUE_LIMIT
+from modes.tournament import percentile
+
+
+class Client:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self._next_id = 0
+
+    @classmethod
+    async def connect(cls, host, port):
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def request(self, **request):
+        self._next_id += 1
+        request['id'] = self._next_id
+        self.writer.write(json.dumps(request).encode() + b"\n")
+        await self.writer.drain()
+        return json.loads(await self.reader.readline())
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def play_games(host, port, games, difficulty, rng, latencies, counters):
+    """One simulated player: `games` games in a row, backing off when the server is busy."""
+    client = await Client.connect(host, port)
+    try:
+        for _ in range(games):
+            color = rng.choice(("black", "white"))
+            reply = await _retry(client, counters, op="new", difficulty=difficulty, color=color)
+            while not reply['game_over']:
+                move = rng.choice(reply['moves'])
+                start = time.perf_counter()
+                reply = await _retry(client, counters, op="move", session=reply['session'], move=move)
+                latencies.append(time.perf_counter() - start)
+            await client.request(op="close", session=reply['session'])
+            counters['games'] += 1
+    finally:
+        await client.close()
+
+
+async def _retry(client, counters, **request):
+    delay = 0.05
+    while True:
+        reply = await client.request(**request)
+        if reply['ok']:
+            return reply
+        if not reply.get('retry'):
+            raise RuntimeError(f"{request['op']} failed: {reply['error']}")
+        counters['retries'] += 1
+        await asyncio.sleep(delay)
+        delay = min(1.0, delay * 2)
+
+
+async def run_load(host, port, clients=16, games=1, difficulty="intermediate", seed=0):
+    rng = random.Random(seed)
+    latencies = []
+    counters = {'games': 0, 'retries': 0}
+    start = time.perf_counter()
+    await asyncio.gather(*(play_games(host, port, games, difficulty, random.Random(rng.random()), latencies, counters)
+                           for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    client = await Client.connect(host, port)
+    server_stats = await client.request(op="stats")
+    await client.close()
+
+    latencies.sort()
+    return {
+        'clients': clients,
+        'difficulty': difficulty,
+        'games': counters['games'],
+        'moves': len(latencies),
+        'elapsed': elapsed,
+        'moves_per_sec': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'latency_p50': percentile(latencies, 0.50),
+        'latency_p99': percentile(latencies, 0.99),
+        'latency_max': latencies[-1] if latencies else 0.0,
+        'retries': counters['retries'],
+        'workers': server_stats['workers'],
+        'sessions_per_core': clients / server_stats['workers'],
+        'server': server_stats,
+    }
+
+
+def format_report(report):
+    return "\n".join([
+        f"{report['clients']} clients vs {report['difficulty']}: {report['games']} games, {report['moves']} moves "
+        f"in {report['elapsed']:.1f}s ({report['moves_per_sec']:.1f} moves/s)",
+        f"move latency p50 {report['latency_p50'] * 1000:.1f} ms, p99 {report['latency_p99'] * 1000:.1f} ms, "
+        f"max {report['latency_max'] * 1000:.1f} ms; {report['retries']} busy retries",
+        f"{report['sessions_per_core']:.1f} concurrent sessions per core ({report['workers']} AI workers)",
+    ])
+
+
+async def _main(args):
+    server = None
+    port = args.port
+    if args.spawn:
+        server = GameServer(workers=args.workers, queue_limit=args.queue_limit, budgets=parse_budgets(args.agent))
+        port = await server.start(args.host, 0)
+    try:
+        report = await run_load(args.host, port, args.clients, args.games, args.difficulty, args.seed)
+    finally:
+        if server:
+            await server.close()
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the game server with simulated players.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--clients", type=int, default=16, help="concurrent simulated players")
+    parser.add_argument("--games", type=int, default=1, help="games per player")
+    parser.add_argument("--difficulty", default="intermediate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--spawn", action="store_true", help="start a server in this process on a free port")
+    parser.add_argument("--workers", type=int, default=None, help="AI processes of the spawned server")
+    parser.add_argument("--queue-limit", type=int, default=DEFAULT_QUEUE_LIMIT, help="queue limit of the spawned server")
+    parser.add_argument("--agent", action="append", default=[], help="budget override for the spawned server")
+    parser.add_argument("--json", help="also write the report to this file")
+    asyncio.run(_main(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,36 @@
 from ai.BeginnerAgent import BeginnerAgent
 from ai.IntermediateAgent import IntermediateAgent
 from ai.AdvancedAgent import AdvancedAgent
+from ai.MCTSAgent import MCTSAgent
 from core.constants import WHITE
 
+# Per-move search budget of each difficulty. Agents deepen iteratively until
+# the budget runs out, so think time stays predictable whatever the position.
+# Keys are passed straight to the agent: time_limit (seconds), node_limit, depth (cap),
+# workers (processes to search with); MCTS takes time_limit and/or playouts.
+DIFFICULTY_BUDGETS = {
+    'beginner': {},
+    'intermediate': {'time_limit': 0.2},
+    'advanced': {'time_limit': 1.5},
+    'mcts': {'time_limit': 1.5},
+}
+
 class PvAMode:
     @staticmethod
-    def get_agents(difficulty='advanced'):
-        # Player (None) vs Agent (White)
+    def create_agent(difficulty, color, **budget):
+        """Builds the agent for a difficulty; keyword arguments override its default budget."""
         if difficulty == 'beginner':
-            return None, BeginnerAgent(WHITE)
-        elif difficulty == 'intermediate':
-            return None, IntermediateAgent(WHITE)
-        else:
-            # Default to advanced
-            return None, AdvancedAgent(WHITE)
+            return BeginnerAgent(color)
+        options = dict(DIFFICULTY_BUDGETS.get(difficulty, DIFFICULTY_BUDGETS['advanced']))
+        options.update(budget)
+        if difficulty == 'intermediate':
+            return IntermediateAgent(color, **options)
+        if difficulty == 'mcts':
+            return MCTSAgent(color, **options)
+        # Default to advanced
+        return AdvancedAgent(color, **options)
 
+    @staticmethod
+    def get_agents(difficulty='advanced', **budget):
+        # Player (None) vs Agent (White)
+        return None, PvAMode.create_agent(difficulty, WHITE, **budget)
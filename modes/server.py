@@ -0,0 +1,432 @@
+"""
+Asyncio game server: hosts many player-vs-AI games at once over TCP, one JSON
+object per line in each direction.
+
+AI moves run on one shared process pool that is never handed more jobs than it
+has workers. Waiting moves queue per difficulty and are dispatched round-robin
+across difficulties, so fast beginner replies are not stuck behind advanced
+searches; a full queue is answered with a retryable "busy" error instead of
+growing without bound. If a worker process dies, the moves it took down fail with
+a retryable error and the pool is replaced. Sessions idle for longer than
+--idle-timeout are evicted.
+
+    python -m modes.server --port 8765 --workers 4 --agent advanced:time_limit=0.5
+
+Requests carry an optional "id" that is echoed back:
+
+    {"op": "new", "difficulty": "advanced", "color": "black"}   human plays black (default)
+    {"op": "move", "session": "...", "move": [r, c]}             human move; the reply
+                                                                  follows the AI's answer
+    {"op": "state", "session": "..."}
+    {"op": "close", "session": "..."}
+    {"op": "stats"}
+
+Game replies hold the session id, "board" (64 chars, X black, O white, - empty,
+row by row), "to_move", "moves" (the human's legal moves when it is their turn),
+"ai_moves" (moves the AI played since the request), "discs", "game_over" and
+"winner". Errors are {"ok": false, "error": "...", "retry": true|false}.
+"""
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+import json
+import os
+import time
+import uuid
+
+from core.board import Board
+from core.constants import BLACK, WHITE
+from core.game_state import GameState
+from modes.pva import PvAMode, DIFFICULTY_BUDGETS
+from modes.tournament import parse_agent_spec, percentile
+
+DIFFICULTIES = tuple(DIFFICULTY_BUDGETS)
+COLOR_NAMES = {BLACK: "black", WHITE: "white"}
+COLORS = {name: color for color, name in COLOR_NAMES.items()}
+# Queued AI moves per difficulty before new ones are refused
+DEFAULT_QUEUE_LIMIT = 256
+DEFAULT_IDLE_TIMEOUT = 300.0
+DEFAULT_MAX_SESSIONS = 10000
+
+
+class RequestError(Exception):
+    """A request that cannot be served; retry marks errors worth trying again later."""
+    def __init__(self, message, retry=False):
+        super().__init__(message)
+        self.retry = retry
+
+
+# --- POOL WORKERS ---
+# Each worker process keeps one agent per (difficulty, color) for its lifetime, so
+# transposition tables stay warm across games.
+_worker_budgets = {}
+_worker_agents = {}
+
+
+def _init_worker(budgets):
+    global _worker_budgets
+    _worker_budgets = budgets
+
+
+def _ai_move(difficulty, black, white, player):
+    """Runs in a pool worker: returns (move, seconds spent)."""
+    agent = _worker_agents.get((difficulty, player))
+    if agent is None:
+        agent = PvAMode.create_agent(difficulty, player, **_worker_budgets.get(difficulty, {}))
+        _worker_agents[(difficulty, player)] = agent
+    start = time.perf_counter()
+    move = agent.get_move(Board.from_bitboards(black, white))
+    return move, time.perf_counter() - start
+
+
+class MoveScheduler:
+    """
+    Hands AI moves to the process pool, at most one per worker at a time. Jobs wait
+    in a bounded queue per difficulty and leave them round-robin. make_pool() creates
+    the pool, again whenever a dead worker breaks it.
+    """
+    def __init__(self, make_pool, workers, queue_limit=DEFAULT_QUEUE_LIMIT):
+        self.make_pool = make_pool
+        self.pool = make_pool()
+        self.restarts = 0
+        self.free = workers
+        self.queue_limit = queue_limit
+        self.queues = {difficulty: collections.deque() for difficulty in DIFFICULTIES}
+        self._turn = 0
+        self._running = set()
+        self.closed = False
+        self.completed = 0
+        self.rejected = 0
+        self.latencies = collections.deque(maxlen=10000)  # queue wait + search, seconds
+
+    def submit(self, difficulty, board, player):
+        """Queues a move search; returns a future for (move, search seconds)."""
+        queue = self.queues[difficulty]
+        if self.closed:
+            raise RequestError("server shutting down")
+        if len(queue) >= self.queue_limit:
+            self.rejected += 1
+            raise RequestError("server busy", retry=True)
+        future = asyncio.get_running_loop().create_future()
+        queue.append((future, (difficulty, board.black, board.white, player), time.perf_counter()))
+        self._dispatch()
+        return future
+
+    def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while self.free and not self.closed:
+            job = self._next_job()
+            if job is None:
+                return
+            future, args, queued = job
+            if future.cancelled():
+                continue  # the session went away while the move was waiting
+            self.free -= 1
+            self._running.add(future)
+            try:
+                done = loop.run_in_executor(self.pool, _ai_move, *args)
+            except BrokenProcessPool:
+                # Broke before the failed jobs reported back: replace it and submit again
+                self._replace_pool(self.pool)
+                done = loop.run_in_executor(self.pool, _ai_move, *args)
+            done.add_done_callback(lambda result, future=future, queued=queued, pool=self.pool:
+                                   self._finished(result, future, queued, pool))
+
+    def _next_job(self):
+        for i in range(len(DIFFICULTIES)):
+            queue = self.queues[DIFFICULTIES[(self._turn + i) % len(DIFFICULTIES)]]
+            if queue:
+                self._turn = (self._turn + i + 1) % len(DIFFICULTIES)
+                return queue.popleft()
+        return None
+
+    def _finished(self, result, future, queued, pool):
+        self.free += 1
+        self._running.discard(future)
+        error = result.exception()
+        if isinstance(error, BrokenProcessPool):
+            # Every job of the broken pool ends here; the first one replaces it
+            self._replace_pool(pool)
+            error = RequestError("AI worker failed", retry=True)
+        else:
+            self.completed += 1
+            self.latencies.append(time.perf_counter() - queued)
+        if not future.done():
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result.result())
+        self._dispatch()
+
+    def _replace_pool(self, broken):
+        if broken is not self.pool or self.closed:
+            return
+        broken.shutdown(wait=False, cancel_futures=True)
+        self.pool = self.make_pool()
+        self.restarts += 1
+
+    def close(self):
+        """Fails every queued and running move, so the requests waiting on them can answer."""
+        self.closed = True
+        for queue in self.queues.values():
+            while queue:
+                self._running.add(queue.popleft()[0])
+        for future in self._running:
+            if not future.done():
+                future.set_exception(RequestError("server shutting down"))
+        self._running.clear()
+
+    def shutdown(self):
+        self.pool.shutdown(cancel_futures=True)
+
+    def queued(self):
+        return {difficulty: len(queue) for difficulty, queue in self.queues.items()}
+
+
+class Session:
+    """One game between a remote human and an AI difficulty."""
+    def __init__(self, difficulty, human):
+        self.id = uuid.uuid4().hex
+        self.difficulty = difficulty
+        self.human = human
+        self.game = GameState()
+        self.lock = asyncio.Lock()  # one request at a time per game
+        self.last_active = time.monotonic()
+
+    def touch(self):
+        self.last_active = time.monotonic()
+
+    def snapshot(self):
+        return self.game.ply
+
+    def restore(self, snapshot):
+        self.game.jump_to(snapshot)
+
+    def describe(self, ai_moves=()):
+        game = self.game
+        board = game.board
+        grid = "".join('X' if board.black >> sq & 1 else 'O' if board.white >> sq & 1 else '-' for sq in range(64))
+        human_turn = not game.game_over and game.current_player == self.human
+        b, w = board.get_score()
+        return {
+            'ok': True,
+            'session': self.id,
+            'difficulty': self.difficulty,
+            'human': COLOR_NAMES[self.human],
+            'board': grid,
+            'to_move': None if game.game_over else COLOR_NAMES[game.current_player],
+            'moves': board.get_valid_moves(self.human) if human_turn else [],
+            'ai_moves': list(ai_moves),
+            'discs': [b, w],
+            'game_over': game.game_over,
+            'winner': None if game.winner is None else "draw" if game.winner == 0 else COLOR_NAMES[game.winner],
+        }
+
+
+class GameServer:
+    def __init__(self, workers=None, queue_limit=DEFAULT_QUEUE_LIMIT, idle_timeout=DEFAULT_IDLE_TIMEOUT,
+                 max_sessions=DEFAULT_MAX_SESSIONS, budgets=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_limit = queue_limit
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.budgets = budgets or {}
+        self.sessions = {}
+        self.evicted = 0
+        self.scheduler = None
+        self._server = None
+        self._reaper = None
+        self._connections = {}  # reader -> the task serving its connection
+        self.started = time.perf_counter()
+
+    async def start(self, host="127.0.0.1", port=8765):
+        self.scheduler = MoveScheduler(self._make_pool, self.workers, self.queue_limit)
+        self._server = await asyncio.start_server(self.handle_client, host, port)
+        self._reaper = asyncio.create_task(self._evict_idle())
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self._reaper:
+            self._reaper.cancel()
+        if self._server:
+            self._server.close()
+        # Requests waiting on the AI are answered with an error, then every connection reads
+        # end-of-input, so each handler finishes its reply and closes
+        if self.scheduler:
+            self.scheduler.close()
+        for reader in self._connections:
+            reader.feed_eof()
+        await asyncio.gather(*self._connections.values(), return_exceptions=True)
+        if self._server:
+            await self._server.wait_closed()
+        if self.scheduler:
+            self.scheduler.shutdown()
+
+    def _make_pool(self):
+        return concurrent.futures.ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                      initargs=(self.budgets,))
+
+    async def _evict_idle(self):
+        while True:
+            await asyncio.sleep(max(0.05, self.idle_timeout / 4))
+            cutoff = time.monotonic() - self.idle_timeout
+            for session in list(self.sessions.values()):
+                if session.last_active < cutoff and not session.lock.locked():
+                    del self.sessions[session.id]
+                    self.evicted += 1
+
+    # --- PROTOCOL ---
+    async def handle_client(self, reader, writer):
+        self._connections[reader] = asyncio.current_task()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request = {}
+                try:
+                    request = json.loads(line)
+                    reply = await self.handle(request)
+                except RequestError as e:
+                    reply = {'ok': False, 'error': str(e), 'retry': e.retry}
+                except (ValueError, TypeError, KeyError) as e:
+                    reply = {'ok': False, 'error': f"bad request: {e}", 'retry': False}
+                if isinstance(request, dict) and 'id' in request:
+                    reply['id'] = request['id']
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            del self._connections[reader]
+            writer.close()
+
+    async def handle(self, request):
+        if not isinstance(request, dict):
+            raise RequestError("bad request")
+        op = request.get('op')
+        if op not in ("new", "move", "state", "close", "stats"):
+            raise RequestError(f"unknown op {op!r}")
+        if op == "new":
+            return await self.new_session(request.get('difficulty', 'advanced'), request.get('color', 'black'))
+        if op == "stats":
+            return self.stats()
+        session = self.sessions.get(request.get('session'))
+        if session is None:
+            raise RequestError("unknown or expired session")
+        session.touch()
+        if op == "move":
+            r, c = request['move']
+            return await self.human_move(session, int(r), int(c))
+        if op == "state":
+            return session.describe()
+        del self.sessions[session.id]
+        return {'ok': True, 'session': session.id}
+
+    async def new_session(self, difficulty, color):
+        if difficulty not in DIFFICULTIES:
+            raise RequestError(f"unknown difficulty {difficulty!r}")
+        if color not in COLORS:
+            raise RequestError(f"unknown color {color!r}")
+        if len(self.sessions) >= self.max_sessions:
+            raise RequestError("server full", retry=True)
+        session = Session(difficulty, COLORS[color])
+        self.sessions[session.id] = session
+        async with session.lock:
+            try:
+                ai_moves = await self.ai_moves(session)
+            except RequestError:
+                del self.sessions[session.id]
+                raise
+        return session.describe(ai_moves)
+
+    async def human_move(self, session, r, c):
+        async with session.lock:
+            game = session.game
+            if game.game_over or game.current_player != session.human:
+                raise RequestError("not your turn")
+            snapshot = session.snapshot()
+            if not game.apply_move(r, c):
+                raise RequestError(f"illegal move {[r, c]}")
+            try:
+                ai_moves = await self.ai_moves(session)
+            except RequestError:
+                # The request fails as a whole, so the client can simply send it again
+                session.restore(snapshot)
+                raise
+            session.touch()
+            return session.describe(ai_moves)
+
+    async def ai_moves(self, session):
+        """Plays the AI's moves until it is the human's turn (the human may have to pass)."""
+        game = session.game
+        played = []
+        while not game.game_over and game.current_player != session.human:
+            move, _ = await self.scheduler.submit(session.difficulty, game.board, game.current_player)
+            if move is None or not game.apply_move(*move):
+                raise RequestError("the AI failed to move")
+            played.append(move)
+        return played
+
+    def stats(self):
+        latencies = sorted(self.scheduler.latencies)
+        return {
+            'ok': True,
+            'sessions': len(self.sessions),
+            'evicted': self.evicted,
+            'workers': self.workers,
+            'queued': self.scheduler.queued(),
+            'busy_workers': self.workers - self.scheduler.free,
+            'ai_moves': self.scheduler.completed,
+            'rejected': self.scheduler.rejected,
+            'pool_restarts': self.scheduler.restarts,
+            'ai_latency_p50': percentile(latencies, 0.50),
+            'ai_latency_p99': percentile(latencies, 0.99),
+            'uptime': time.perf_counter() - self.started,
+        }
+
+
+def parse_budgets(specs):
+    """['advanced:time_limit=0.5', ...] -> {'advanced': {'time_limit': 0.5}}."""
+    budgets = {}
+    for spec in specs:
+        difficulty, options = parse_agent_spec(spec)
+        if difficulty not in DIFFICULTIES:
+            raise ValueError(f"unknown difficulty {difficulty!r}")
+        budgets[difficulty] = options
+    return budgets
+
+
+async def serve(host, port, **options):
+    server = GameServer(**options)
+    port = await server.start(host, port)
+    print(f"serving on {host}:{port} with {server.workers} workers")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve player-vs-AI games over TCP (JSON lines).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None, help="AI processes (default: all cores)")
+    parser.add_argument("--queue-limit", type=int, default=DEFAULT_QUEUE_LIMIT, help="queued AI moves per difficulty")
+    parser.add_argument("--idle-timeout", type=float, default=DEFAULT_IDLE_TIMEOUT, help="seconds before an idle game is dropped")
+    parser.add_argument("--max-sessions", type=int, default=DEFAULT_MAX_SESSIONS)
+    parser.add_argument("--agent", action="append", default=[],
+                        help="budget override per difficulty, e.g. advanced:time_limit=0.5 (repeatable)")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, workers=args.workers, queue_limit=args.queue_limit,
+                          idle_timeout=args.idle_timeout, max_sessions=args.max_sessions,
+                          budgets=parse_budgets(args.agent)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
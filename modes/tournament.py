@@ -0,0 +1,362 @@
+"""
+Headless self-play tournaments between agents, spread over a process pool.
+
+Agents are given as specs: a difficulty name understood by PvAMode.create_agent,
+optionally followed by budget overrides, e.g.  advanced:time_limit=0.1,depth=6
+Every pair of agents plays `games` games; openings are random but seeded, and each
+opening is played twice with the colors swapped.
+
+    python -m modes.tournament advanced intermediate:time_limit=0.05 --games 200 --workers 4
+"""
+import argparse
+import concurrent.futures
+import json
+import math
+import random
+import sys
+import time
+
+from core.board import Board
+from core.constants import BLACK, WHITE
+from core.game_record import GameRecord, RecordWriter
+from modes.pva import PvAMode
+
+# Elo scale: a 400 point gap means 10:1 odds
+ELO_SCALE = 400 / math.log(10)
+
+
+def parse_agent_spec(spec):
+    """'advanced:time_limit=0.1,depth=6' -> ('advanced', {'time_limit': 0.1, 'depth': 6})."""
+    difficulty, _, options_text = spec.partition(':')
+    options = {}
+    for item in filter(None, options_text.split(',')):
+        key, _, value = item.partition('=')
+        if not value:
+            raise ValueError(f"bad agent option {item!r} in {spec!r} (expected key=value)")
+        for cast in (int, float):
+            try:
+                value = cast(value)
+                break
+            except ValueError:
+                pass
+        if value in ('True', 'False'):
+            value = value == 'True'
+        options[key.strip()] = value
+    return difficulty.strip(), options
+
+
+def create_agent(spec, color):
+    difficulty, options = parse_agent_spec(spec)
+    return PvAMode.create_agent(difficulty, color, **options)
+
+
+def random_opening(rng, plies):
+    """A list of `plies` random legal moves from the start position."""
+    board = Board()
+    player = BLACK
+    moves = []
+    while len(moves) < plies:
+        legal = board.get_valid_moves(player)
+        if not legal:
+            break
+        move = rng.choice(legal)
+        board = board.make_move(move[0], move[1], player)
+        moves.append(move)
+        player = -player
+    return moves
+
+
+def play_game(black_spec, white_spec, opening=()):
+    """
+    Plays one game without any UI and returns a result dict: final discs, winner
+    (BLACK, WHITE or 0), number of moves, the per-move think times of each side and
+    the moves played (opening included) for a GameRecord.
+    A side whose agent fails or returns an illegal move loses the game.
+    """
+    agents = {BLACK: create_agent(black_spec, BLACK), WHITE: create_agent(white_spec, WHITE)}
+    latencies = {BLACK: [], WHITE: []}
+    started = time.time()
+    board = Board()
+    player = BLACK
+    played = list(opening)
+    for r, c in opening:
+        board = board.make_move(r, c, player)
+        player = -player
+
+    forfeit = None
+    try:
+        while True:
+            if not board.has_moves(player):
+                player = -player
+                if not board.has_moves(player):
+                    break
+            start = time.perf_counter()
+            try:
+                move = agents[player].get_move(board)
+            except Exception as e:
+                forfeit = (player, f"{type(e).__name__}: {e}")
+                break
+            latencies[player].append(time.perf_counter() - start)
+            new_board = board.make_move(move[0], move[1], player) if move else None
+            if new_board is None:
+                forfeit = (player, f"illegal move {move}")
+                break
+            board = new_board
+            played.append(move)
+            player = -player
+    finally:
+        for agent in agents.values():
+            agent.close()
+
+    b, w = board.get_score()
+    if forfeit:
+        winner = -forfeit[0]
+    else:
+        winner = BLACK if b > w else WHITE if w > b else 0
+    return {
+        'black': black_spec,
+        'white': white_spec,
+        'discs': (b, w),
+        'winner': winner,
+        'moves': len(latencies[BLACK]) + len(latencies[WHITE]),
+        'latencies': latencies,
+        'forfeit': forfeit[1] if forfeit else None,
+        'record': played,
+        'started': started,
+        'finished': time.time(),
+    }
+
+
+def _play_game_task(args):
+    return play_game(*args)
+
+
+def schedule(specs, games, seed=0, opening_plies=4):
+    """(black spec, white spec, opening) for every game: each pair plays each opening with both colors."""
+    rng = random.Random(seed)
+    tasks = []
+    for i in range(len(specs)):
+        for j in range(i + 1, len(specs)):
+            for _ in range((games + 1) // 2):
+                opening = random_opening(rng, opening_plies)
+                tasks.append((specs[i], specs[j], opening))
+                tasks.append((specs[j], specs[i], opening))
+    return tasks
+
+
+def run_tournament(specs, games=100, workers=None, seed=0, opening_plies=4, progress=None, record_path=None):
+    """
+    Plays every pairing of `specs` and returns the summary (see summarize).
+    workers=1 plays in this process; otherwise games are spread over a process pool.
+    With record_path every game is appended to that game-record file as it finishes.
+    """
+    if len(set(specs)) != len(specs):
+        raise ValueError("agent specs must be distinct")
+    tasks = schedule(specs, games, seed, opening_plies)
+    results = []
+    writer = RecordWriter(record_path) if record_path else None
+    start = time.perf_counter()
+
+    def finished(result):
+        results.append(result)
+        if writer:
+            writer.write(GameRecord(result['record'], result['black'], result['white'],
+                                    result['discs'][0] - result['discs'][1], result['forfeit'] is None,
+                                    result['started'], result['finished']))
+        if progress:
+            progress(len(results), len(tasks))
+
+    try:
+        if workers == 1:
+            for task in tasks:
+                finished(play_game(*task))
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+                for result in pool.map(_play_game_task, tasks):
+                    finished(result)
+    finally:
+        if writer:
+            writer.close()
+    return summarize(specs, results, time.perf_counter() - start)
+
+
+# --- STATISTICS ---
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def elo_from_score(score, n):
+    """Elo difference and its 95% error for a score fraction over n games (None when unbounded)."""
+    if n == 0 or score <= 0 or score >= 1:
+        return None, None
+    diff = -ELO_SCALE * math.log(1 / score - 1)
+    # Binomial standard error of the score, carried through the logistic curve
+    error = 1.96 * math.sqrt(score * (1 - score) / n) * ELO_SCALE / (score * (1 - score))
+    return diff, error
+
+
+def fit_ratings(specs, pair_scores, iterations=200):
+    """
+    Bradley-Terry (logistic Elo) ratings from pairwise points, the first rated agent anchored at 0.
+    pair_scores[(a, b)] = (points of a, games). Returns {spec: (rating, 95% error)}; the
+    rating is None for an agent that won or lost every game, which has no finite estimate.
+    """
+    points = {spec: 0.0 for spec in specs}
+    played = {spec: 0 for spec in specs}
+    for (a, b), (p, n) in pair_scores.items():
+        points[a] += p
+        played[a] += n
+    unbounded = {spec for spec in specs if played[spec] == 0 or points[spec] in (0, played[spec])}
+    rated = [spec for spec in specs if spec not in unbounded]
+
+    strength = {spec: 1.0 for spec in rated}
+    for _ in range(iterations):
+        for spec in rated:
+            games_weight = 0.0
+            for (a, b), (p, n) in pair_scores.items():
+                if a == spec and b in strength:
+                    games_weight += n / (strength[a] + strength[b])
+            if games_weight > 0:
+                strength[spec] = sum(p for (a, b), (p, n) in pair_scores.items()
+                                     if a == spec and b in strength) / games_weight or strength[spec]
+        # Keep the anchor at 0 Elo
+        if rated:
+            anchor = strength[rated[0]]
+            strength = {spec: s / anchor for spec, s in strength.items()}
+
+    ratings = {}
+    for spec in specs:
+        if spec not in strength:
+            ratings[spec] = (None, None)
+            continue
+        rating = ELO_SCALE * math.log(strength[spec])
+        information = 0.0
+        for (a, b), (points, n) in pair_scores.items():
+            if a == spec and b in strength:
+                p = strength[a] / (strength[a] + strength[b])
+                information += n * p * (1 - p)
+        error = 1.96 * ELO_SCALE / math.sqrt(information) if spec != rated[0] and information > 0 else 0.0
+        ratings[spec] = (rating, error)
+    return ratings
+
+
+def summarize(specs, results, elapsed):
+    """Win/draw/loss per pairing, Elo estimates, throughput and per-agent move latency percentiles."""
+    table = {(a, b): [0, 0, 0] for a in specs for b in specs if a != b}
+    latencies = {spec: [] for spec in specs}
+    forfeits = []
+    total_moves = 0
+    for result in results:
+        black, white = result['black'], result['white']
+        latencies[black].extend(result['latencies'][BLACK])
+        latencies[white].extend(result['latencies'][WHITE])
+        total_moves += result['moves']
+        if result['forfeit']:
+            forfeits.append(result)
+        if result['winner'] == 0:
+            table[(black, white)][1] += 1
+            table[(white, black)][1] += 1
+        else:
+            winner, loser = (black, white) if result['winner'] == BLACK else (white, black)
+            table[(winner, loser)][0] += 1
+            table[(loser, winner)][2] += 1
+
+    pair_scores = {}
+    pairs = {}
+    for (a, b), (w, d, l) in table.items():
+        n = w + d + l
+        pair_scores[(a, b)] = (w + d / 2, n)
+        diff, error = elo_from_score((w + d / 2) / n, n) if n else (None, None)
+        pairs[(a, b)] = {'wins': w, 'draws': d, 'losses': l, 'elo': diff, 'elo_error': error}
+
+    latency_stats = {}
+    for spec, values in latencies.items():
+        values.sort()
+        latency_stats[spec] = {
+            'moves': len(values),
+            'mean': sum(values) / len(values) if values else 0.0,
+            'p50': percentile(values, 0.50),
+            'p90': percentile(values, 0.90),
+            'p99': percentile(values, 0.99),
+            'max': values[-1] if values else 0.0,
+        }
+
+    return {
+        'agents': list(specs),
+        'games': len(results),
+        'elapsed': elapsed,
+        'games_per_sec': len(results) / elapsed if elapsed > 0 else 0.0,
+        'moves_per_sec': total_moves / elapsed if elapsed > 0 else 0.0,
+        'pairs': pairs,
+        'ratings': fit_ratings(list(specs), pair_scores),
+        'latency': latency_stats,
+        'forfeits': [(r['black'], r['white'], r['forfeit']) for r in forfeits],
+    }
+
+
+def format_report(summary):
+    def elo_text(value, error):
+        if value is None:
+            return "n/a"
+        return f"{value:+.0f} ± {error:.0f}"
+
+    lines = [f"{summary['games']} games in {summary['elapsed']:.1f}s "
+             f"({summary['games_per_sec']:.2f} games/s, {summary['moves_per_sec']:.0f} moves/s)", ""]
+    lines.append(f"{'agent':<36} {'opponent':<36} {'W':>5} {'D':>5} {'L':>5}  elo")
+    specs = summary['agents']
+    for i, a in enumerate(specs):
+        for b in specs:
+            if a == b:
+                continue
+            pair = summary['pairs'][(a, b)]
+            lines.append(f"{a:<36} {b:<36} {pair['wins']:>5} {pair['draws']:>5} {pair['losses']:>5}  "
+                         f"{elo_text(pair['elo'], pair['elo_error'])}")
+    lines.append("")
+    lines.append(f"{'agent':<36} {'rating':>14} {'moves':>7} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for spec in specs:
+        rating, error = summary['ratings'][spec]
+        lat = summary['latency'][spec]
+        lines.append(f"{spec:<36} {elo_text(rating, error):>14} {lat['moves']:>7} {lat['p50'] * 1000:>8.1f} "
+                     f"{lat['p90'] * 1000:>8.1f} {lat['p99'] * 1000:>8.1f} {lat['max'] * 1000:>8.1f}")
+    for black, white, reason in summary['forfeits']:
+        lines.append(f"forfeit: {black} (black) vs {white} (white): {reason}")
+    return "\n".join(lines)
+
+
+def _json_ready(summary):
+    out = dict(summary)
+    out['pairs'] = [{'agent': a, 'opponent': b, **pair} for (a, b), pair in summary['pairs'].items()]
+    out['ratings'] = {spec: {'elo': r, 'error': e} for spec, (r, e) in summary['ratings'].items()}
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play a headless tournament between agents.")
+    parser.add_argument("agents", nargs="+", help="agent specs, e.g. advanced:time_limit=0.1 intermediate beginner")
+    parser.add_argument("--games", type=int, default=100, help="games per pairing (rounded up to even)")
+    parser.add_argument("--workers", type=int, default=None, help="processes to play on (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the random openings")
+    parser.add_argument("--opening-plies", type=int, default=4, help="random moves played before the agents take over")
+    parser.add_argument("--json", help="also write the summary to this file")
+    parser.add_argument("--record", help="append every game to this game-record file (see core.game_record)")
+    args = parser.parse_args(argv)
+    if len(args.agents) < 2:
+        parser.error("need at least two agents")
+
+    def progress(done, total):
+        print(f"\r{done}/{total} games", end="", file=sys.stderr, flush=True)
+
+    summary = run_tournament(args.agents, args.games, args.workers, args.seed, args.opening_plies, progress,
+                             args.record)
+    print(file=sys.stderr)
+    print(format_report(summary))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(_json_ready(summary), f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
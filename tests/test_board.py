@@ -0,0 +1,97 @@
+"""Board moves, apply/undo and the incremental Zobrist hash on random games of every size."""
+import random
+
+import pytest
+
+from core.board import Board
+from core.constants import BLACK, BOARD_SIZES, DIRECTIONS, EMPTY
+from core.zobrist import compute_hash
+
+GAMES = 20
+
+
+def grid_moves(grid, player):
+    """Reference move generator: walks the grid in every direction from every empty square."""
+    size = len(grid)
+    moves = {}
+    for r in range(size):
+        for c in range(size):
+            if grid[r][c] != EMPTY:
+                continue
+            flips = []
+            for dr, dc in DIRECTIONS:
+                line = []
+                rr, cc = r + dr, c + dc
+                while 0 <= rr < size and 0 <= cc < size and grid[rr][cc] == -player:
+                    line.append((rr, cc))
+                    rr, cc = rr + dr, cc + dc
+                if line and 0 <= rr < size and 0 <= cc < size and grid[rr][cc] == player:
+                    flips.extend(line)
+            if flips:
+                moves[(r, c)] = set(flips)
+    return moves
+
+
+def random_games(size, count, seed=0):
+    """Yields (board, player) for every position of `count` random games."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        board, player = Board(size), BLACK
+        while True:
+            yield board, player
+            moves = board.get_valid_moves(player)
+            if not moves:
+                if not board.has_moves(-player):
+                    break
+                player = -player
+                continue
+            board = board.make_move(*rng.choice(moves), player)
+            player = -player
+
+
+def state(board):
+    return board.black, board.white, board.hash, board.black_count, board.white_count
+
+
+@pytest.mark.parametrize("size", BOARD_SIZES)
+def test_moves_match_grid_generator(size):
+    for board, player in random_games(size, GAMES):
+        reference = grid_moves(board.grid, player)
+        assert sorted(board.get_valid_moves(player)) == sorted(reference)
+        for (r, c), flips in reference.items():
+            child = board.make_move(r, c, player)
+            changed = {(rr, cc) for rr in range(size) for cc in range(size)
+                       if child.grid[rr][cc] != board.grid[rr][cc]}
+            assert changed == flips | {(r, c)}
+            assert all(child.grid[rr][cc] == player for rr, cc in changed)
+
+
+@pytest.mark.parametrize("size", BOARD_SIZES)
+def test_incremental_hash_and_counts(size):
+    for board, _ in random_games(size, GAMES):
+        assert board.hash == compute_hash(board.black, board.white)
+        assert (board.black_count, board.white_count) == (board.black.bit_count(), board.white.bit_count())
+
+
+@pytest.mark.parametrize("size", BOARD_SIZES)
+def test_apply_undo_round_trip(size):
+    for board, player in random_games(size, GAMES):
+        before = state(board)
+        moves_before = board.valid_moves_mask(player)
+        for r, c in board.get_valid_moves(player):
+            expected = board.make_move(r, c, player)
+            record = board.apply(r, c, player)
+            assert state(board) == state(expected)
+            board.undo(record)
+            assert state(board) == before
+            assert board.valid_moves_mask(player) == moves_before
+
+
+@pytest.mark.parametrize("size", BOARD_SIZES)
+def test_snapshot_restores_board(size):
+    for board, player in random_games(size, 5):
+        snapshot = board.snapshot(player)
+        restored = snapshot.to_board()
+        assert state(restored) == state(board)
+        assert restored.valid_moves_mask(player) == board.valid_moves_mask(player)
+        assert restored.snapshot(player) == snapshot and hash(restored.snapshot(player)) == hash(snapshot)
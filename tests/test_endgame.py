@@ -0,0 +1,86 @@
+"""The endgame solver against a plain minimax over every line to the end of the game."""
+import random
+
+import pytest
+
+from ai.algorithm import CHECK_INTERVAL
+from ai.endgame import EndgameSolver, final_score
+from core.board import Board, flips_bb, iter_bits, legal_moves_bb
+from core.constants import BLACK
+
+POSITIONS = 12
+
+
+def brute_force(own, opp, passed=False):
+    """Exact final margin for the side to move, without pruning or move ordering."""
+    moves = legal_moves_bb(own, opp)
+    if not moves:
+        if passed:
+            return final_score(own, opp)
+        return -brute_force(opp, own, True)
+    best = -65
+    for sq in iter_bits(moves):
+        move = 1 << sq
+        flips = flips_bb(own, opp, move)
+        best = max(best, -brute_force(opp ^ flips, own | move | flips))
+    return best
+
+
+def endgame_positions(empties, count, seed=0):
+    """(board, player) with `empties` empty squares and a move for player, from random games."""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board, player = Board(), BLACK
+        while board.empty_count > empties:
+            moves = board.get_valid_moves(player)
+            if not moves:
+                if not board.has_moves(-player):
+                    break
+                player = -player
+                continue
+            board = board.make_move(*rng.choice(moves), player)
+            player = -player
+        if board.empty_count == empties and board.has_moves(player):
+            positions.append((board, player))
+    return positions
+
+
+def sides(board, player):
+    return (board.black, board.white) if player == BLACK else (board.white, board.black)
+
+
+@pytest.mark.parametrize("empties", range(1, 9))
+def test_solver_matches_brute_force(empties):
+    solver = EndgameSolver()
+    for board, player in endgame_positions(empties, POSITIONS, seed=empties):
+        own, opp = sides(board, player)
+        expected = brute_force(own, opp)
+        (r, c), score = solver.solve(board, player)
+        assert score == expected
+        # The move it returns must reach that score
+        child = board.make_move(r, c, player)
+        assert -brute_force(*sides(child, -player)) == expected
+
+
+@pytest.mark.parametrize("empties", (4, 7))
+def test_wld_solve_matches_sign(empties):
+    solver = EndgameSolver()
+    for board, player in endgame_positions(empties, POSITIONS, seed=100 + empties):
+        expected = brute_force(*sides(board, player))
+        (r, c), score = solver.solve(board, player, wld=True)
+        assert score == (expected > 0) - (expected < 0)
+        child = board.make_move(r, c, player)
+        outcome = -brute_force(*sides(child, -player))
+        assert (outcome > 0) - (outcome < 0) == score
+
+
+def test_node_limit():
+    solver = EndgameSolver()
+    for board, player in endgame_positions(12, 4, seed=200):
+        move, score = solver.solve(board, player)
+        nodes = solver.nodes
+        # The budget is checked every CHECK_INTERVAL nodes, so a tiny one stops at the first check
+        assert nodes > CHECK_INTERVAL
+        assert solver.solve(board, player, node_limit=1) is None
+        assert solver.solve(board, player, node_limit=nodes + 1) == (move, score)
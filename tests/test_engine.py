@@ -0,0 +1,107 @@
+"""The engine's line protocol, over stdin/stdout of a real engine process."""
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+START = "-" * 27 + "OX" + "-" * 6 + "XO" + "-" * 27
+
+
+class Engine:
+    def __init__(self, *args):
+        self.process = subprocess.Popen([sys.executable, "engine.py", *args], cwd=ROOT, text=True,
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        self.pings = 0
+
+    def send(self, line):
+        """Sends a command and returns its reply lines, up to a ping sent after it."""
+        self.pings += 1
+        self.process.stdin.write(f"{line}\nping {self.pings}\n")
+        self.process.stdin.flush()
+        lines = []
+        while True:
+            reply = self.process.stdout.readline()
+            assert reply, "the engine stopped"
+            if reply.strip() == f"pong {self.pings}":
+                return lines
+            lines.append(reply.rstrip("\n"))
+
+    def quit(self):
+        self.process.stdin.write("quit\n")
+        self.process.stdin.close()
+        return self.process.wait(timeout=30)
+
+
+@pytest.fixture
+def engine():
+    engine = Engine("--depth", "2")
+    yield engine
+    if engine.process.poll() is None:
+        engine.process.kill()
+        engine.process.wait()
+
+
+def legal_moves(engine):
+    """The engine's own legal moves, as listed by analyze."""
+    lines = engine.send("analyze")
+    assert lines[-1] == "analyze end"
+    return [line.split()[1] for line in lines[:-1]]
+
+
+def test_session(engine):
+    assert engine.send("show") == [START[i:i + 8] for i in range(0, 64, 8)] + ["to-move X discs 2 2"]
+    assert engine.send("moves d3") == []
+    assert engine.send("show")[-1] == "to-move O discs 4 1"
+
+    # go searches without playing, play searches and plays
+    reply = engine.send("go").pop().split()
+    assert reply[0::2] == ["move", "score", "depth", "nodes", "time"]
+    assert reply[1] in legal_moves(engine) and reply[5] == "2"
+    assert engine.send("show")[-1] == "to-move O discs 4 1"
+    assert engine.send("play")[0].split()[1] == reply[1]
+    assert engine.send("show")[-1] == "to-move X discs 3 3"
+
+    assert engine.send("undo") == []
+    assert engine.send("show")[-1] == "to-move O discs 4 1"
+    assert engine.send("redo") == []
+    assert engine.send("show")[-1] == "to-move X discs 3 3"
+    assert engine.send("newgame") == []
+    assert sorted(legal_moves(engine)) == ["c4", "d3", "e6", "f5"]
+    assert engine.quit() == 0
+
+
+def test_position_and_passes(engine):
+    # White has no move here: play passes to black, who has the last move
+    board = "X" * 62 + "O-"
+    assert engine.send(f"position {board} O") == []
+    assert engine.send("show")[-1] == "to-move X discs 62 1"
+    assert engine.send("play")[0].split()[1] == "h8"
+    assert engine.send("show")[-1] == "game-over discs 64 0"
+    assert engine.send("go") == ["error game over"]
+
+
+def test_bad_commands(engine):
+    assert engine.send("frobnicate") == ["error unknown command 'frobnicate'"]
+    assert engine.send("moves z9") == ["error bad square 'z9'"]
+    assert engine.send("moves a1") == ["error illegal move a1"]
+    assert engine.send("set depth deep") == ["error bad value 'deep' for depth"]
+    assert engine.send("position xyz X") == ["error a position needs 64 squares"]
+    assert engine.send("undo") == ["error nothing to undo"]
+    # The session carries on after errors
+    assert engine.send("show")[-1] == "to-move X discs 2 2"
+
+
+def test_save_and_replay(engine, tmp_path):
+    path = str(tmp_path / "games.othr")
+    for _ in range(6):
+        engine.send("play")
+    assert engine.send(f"save {path}") == []
+    final = engine.send("show")
+    assert engine.send("newgame") == []
+    assert engine.send(f"replay {path} 0") == []
+    assert engine.send("show") == final
+    assert engine.send(f"replay {path} 0 1") == []
+    assert engine.send("show")[-1] == "to-move O discs 4 1"
+    assert engine.send(f"replay {path} 1") == [f"error no game 1 in {path}"]
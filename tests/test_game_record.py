@@ -0,0 +1,70 @@
+"""Game records: write/read round trip, random access and replay against the played game."""
+import random
+
+import pytest
+
+from core.game_record import GameRecord, Replay, read_record_at, read_records, record_offsets, write_records
+from core.game_state import GameState
+
+
+def random_game(rng, max_moves=60):
+    state = GameState()
+    while not state.game_over and len(state.log) < max_moves:
+        state.apply_move(*rng.choice(state.board.get_valid_moves(state.current_player)))
+    return state
+
+
+@pytest.fixture
+def games():
+    rng = random.Random(0)
+    # Finished games and a few abandoned part-way
+    return [random_game(rng, 60 if i % 4 else rng.randrange(1, 40)) for i in range(20)]
+
+
+def fields(record):
+    return (record.moves, record.black, record.white, record.result, record.complete, record.started, record.finished)
+
+
+def test_round_trip(tmp_path, games):
+    path = str(tmp_path / "games.othr")
+    records = [GameRecord.from_game_state(state, "advanced", "mcts é", started=1700000000 + i)
+               for i, state in enumerate(games)]
+    assert write_records(path, records[:10]) == 10
+    # Appending keeps the file one stream of games
+    assert write_records(path, records[10:]) == 10
+
+    read = list(read_records(path))
+    assert [fields(record) for record in read] == [fields(record) for record in records]
+    assert [record.complete for record in read] == [state.game_over for state in games]
+
+    offsets = list(record_offsets(path))
+    assert len(offsets) == len(records)
+    for offset, record in zip(offsets, records):
+        assert fields(read_record_at(path, offset)) == fields(record)
+
+
+def test_replay_matches_game(games):
+    for state in games:
+        replay = Replay(GameRecord.from_game_state(state))
+        assert len(replay) == state.ply
+        for ply, snapshot in enumerate(state.history):
+            board, player = replay.position(ply)
+            assert (board.black, board.white) == (snapshot.black, snapshot.white)
+            if ply < state.ply or not state.game_over:
+                assert player == snapshot.player
+
+
+def test_truncated_file_is_an_error(tmp_path, games):
+    path = tmp_path / "games.othr"
+    write_records(str(path), [GameRecord.from_game_state(games[0])])
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(ValueError):
+        list(read_records(str(path)))
+
+
+@pytest.mark.parametrize("size", (6, 10))
+def test_other_board_sizes_are_refused(size):
+    state = GameState(size)
+    state.apply_move(*state.board.get_valid_moves(state.current_player)[0])
+    with pytest.raises(ValueError, match="8x8"):
+        GameRecord.from_game_state(state)
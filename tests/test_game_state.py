@@ -0,0 +1,48 @@
+"""Undo, redo and jumps through a game's history."""
+import random
+
+import pytest
+
+from core.constants import BOARD_SIZES
+from core.game_state import GameState
+
+
+def position(state):
+    return state.board.black, state.board.white, state.board.hash, state.current_player, state.game_over, state.winner
+
+
+@pytest.mark.parametrize("size", BOARD_SIZES)
+def test_undo_redo_restore_every_position(size):
+    rng = random.Random(size)
+    for _ in range(5):
+        state = GameState(size)
+        played = [position(state)]
+        while not state.game_over:
+            state.apply_move(*rng.choice(state.board.get_valid_moves(state.current_player)))
+            played.append(position(state))
+
+        for ply in range(len(played) - 1, 0, -1):
+            assert state.undo()
+            assert position(state) == played[ply - 1]
+        assert not state.undo()
+        for ply in range(1, len(played)):
+            assert state.redo()
+            assert position(state) == played[ply]
+        assert not state.redo()
+        for ply in rng.sample(range(len(played)), 10):
+            assert state.jump_to(ply)
+            assert position(state) == played[ply]
+            assert state.log == state.moves[:ply]
+
+
+def test_new_move_after_undo_drops_the_undone_line():
+    state = GameState()
+    for _ in range(4):
+        state.apply_move(*state.board.get_valid_moves(state.current_player)[0])
+    state.undo()
+    state.undo()
+    moves = state.board.get_valid_moves(state.current_player)
+    state.apply_move(*moves[-1])
+    assert state.ply == len(state.moves) == len(state.history) - 1 == 3
+    assert not state.can_redo()
+    assert state.moves[-1][1:] == moves[-1]
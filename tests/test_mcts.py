@@ -0,0 +1,77 @@
+"""MCTS: tree reuse between moves, subtree compaction and the max_nodes bound."""
+import random
+
+import pytest
+
+from ai.mcts import MCTS
+from core.constants import BOARD_SIZES
+from core.game_state import GameState
+
+
+def children(tree, node):
+    first = tree.first[node]
+    if first < 0:
+        return []
+    return list(range(first, first + tree.count[node]))
+
+
+def same_subtree(tree, node, other, other_node):
+    """Whether the subtrees hold the same moves, visits and results below and at their roots."""
+    if (tree.visits[node], tree.value[node]) != (other.visits[other_node], other.value[other_node]):
+        return False
+    below, other_below = children(tree, node), children(other, other_node)
+    return ([tree.move[child] for child in below] == [other.move[child] for child in other_below]
+            and all(same_subtree(tree, child, other, other_child) for child, other_child in zip(below, other_below)))
+
+
+def check_visits(tree):
+    """Every visit of a child passed through its parent."""
+    for node in range(len(tree)):
+        assert tree.visits[node] >= sum(tree.visits[child] for child in children(tree, node))
+
+
+def test_subtree_is_copied_whole():
+    search = MCTS(seed=0)
+    state = GameState()
+    search.search(state.board, state.current_player, playouts=2000)
+    tree = search.tree
+    for child in children(tree, 0):
+        subtree = tree.subtree(child)
+        assert same_subtree(tree, child, subtree, 0)
+        check_visits(subtree)
+
+
+def test_tree_is_reused_after_a_move():
+    rng = random.Random(0)
+    search = MCTS(seed=0)
+    state = GameState()
+    reused = []
+    while not state.game_over:
+        player = state.current_player
+        # Where the new position sits in the old tree, and its visits
+        node = None
+        if search.root is not None:
+            node = search._find(0, *search.root[:3], state.board.black, state.board.white, player, 4)
+        expected = search.tree.visits[node] if node is not None else 0
+
+        move, stats = search.search(state.board, player, playouts=300)
+        if len(state.board.get_valid_moves(player)) > 1:
+            # The node became the root with its visits
+            assert stats.reused == expected
+            reused.append(stats.reused)
+        check_visits(search.tree)
+        state.apply_move(*move)
+        if not state.game_over:
+            state.apply_move(*rng.choice(state.board.get_valid_moves(state.current_player)))
+    assert sum(1 for visits in reused if visits) > len(reused) // 2
+
+
+@pytest.mark.parametrize("size", BOARD_SIZES)
+def test_tree_stays_within_max_nodes(size):
+    max_nodes = 1000
+    search = MCTS(max_nodes=max_nodes, seed=size)
+    state = GameState(size)
+    while not state.game_over:
+        move, _ = search.search(state.board, state.current_player, playouts=200)
+        assert len(search.tree) <= max_nodes
+        state.apply_move(*move)
@@ -0,0 +1,65 @@
+"""Symmetry-canonical keys of the opening book and the moves mapped back on lookup."""
+import pytest
+
+from ai.opening_book import SYMMETRIES, OpeningBook, build_book, canonical, transform_bitboard
+from core.board import Board
+from core.constants import BLACK
+
+PLIES = 3
+
+
+def positions(plies):
+    """Every (board, player) up to `plies` moves from the start."""
+    frontier = [(Board(), BLACK)]
+    for _ in range(plies):
+        yield from frontier
+        frontier = [(board.make_move(r, c, player), -player)
+                    for board, player in frontier for r, c in board.get_valid_moves(player)]
+
+
+def transformed(board, table):
+    return Board.from_bitboards(transform_bitboard(board.black, table), transform_bitboard(board.white, table))
+
+
+def child_key(board, move, player):
+    child = board.make_move(*move, player)
+    return canonical(*((child.white, child.black) if player == BLACK else (child.black, child.white)))[0]
+
+
+@pytest.fixture(scope="module")
+def book(tmp_path_factory):
+    path = tmp_path_factory.mktemp("book") / "book.bin"
+    build_book(str(path), plies=PLIES, depth=1, verbose=False)
+    book = OpeningBook(str(path))
+    yield book
+    book.close()
+
+
+def test_symmetries_are_permutations():
+    for table in SYMMETRIES:
+        assert sorted(table) == list(range(64))
+
+
+def test_canonical_key_is_shared_by_all_symmetries():
+    for board, player in positions(PLIES + 1):
+        own, opp = (board.black, board.white) if player == BLACK else (board.white, board.black)
+        key = canonical(own, opp)[0]
+        for table in SYMMETRIES:
+            assert canonical(transform_bitboard(own, table), transform_bitboard(opp, table))[0] == key
+
+
+def test_lookup_maps_moves_back(book):
+    for board, player in positions(PLIES):
+        move, score = book.lookup(board, player)
+        for table in SYMMETRIES:
+            variant = transformed(board, table)
+            variant_move, variant_score = book.lookup(variant, player)
+            assert variant_score == score
+            # The same move up to symmetry: symmetric positions (e.g. the start) have several
+            assert variant.is_valid_move(*variant_move, player)
+            assert child_key(variant, variant_move, player) == child_key(board, move, player)
+
+
+def test_positions_past_the_book_miss(book):
+    board, player = next(position for position in positions(PLIES + 1) if position[0].empty_count == 60 - PLIES)
+    assert book.lookup(board, player) is None
@@ -0,0 +1,69 @@
+"""The pattern evaluation's incremental indices and NumPy batch scoring against evaluate_board."""
+import random
+
+import pytest
+
+from ai.pattern_evaluation import PatternEvaluation, default_weights, pattern_indices
+from core.board import Board
+from core.constants import BLACK, WHITE
+
+GAMES = 10
+
+
+def random_game(rng):
+    """Undo records of a random game played in place on a new board, with the board."""
+    board, player = Board(), BLACK
+    records = []
+    while True:
+        moves = board.get_valid_moves(player)
+        if not moves:
+            if not board.has_moves(-player):
+                return board, records
+            player = -player
+            continue
+        records.append(board.apply(*rng.choice(moves), player))
+        player = -player
+
+
+@pytest.fixture(params=("trained", "default"))
+def evaluation(request):
+    return PatternEvaluation(default_weights() if request.param == "default" else None)
+
+
+def test_incremental_indices_match_scratch(evaluation):
+    rng = random.Random(0)
+    for _ in range(GAMES):
+        board, records = random_game(rng)
+        # Replay the game on a fresh board while the evaluation tracks it, then take it all back
+        tracked = Board()
+        evaluation.sync(tracked)
+        applied = []
+        for player, sq, _, _ in records:
+            applied.append(tracked.apply_square(sq, player))
+            evaluation.on_apply(applied[-1])
+            assert evaluation.indices == pattern_indices(tracked.black, tracked.white)
+            for side in (BLACK, WHITE):
+                assert evaluation.evaluate_board(tracked, side) == evaluation.evaluate_board(tracked.copy(), side)
+        assert (tracked.black, tracked.white) == (board.black, board.white)
+        for record in reversed(applied):
+            tracked.undo(record)
+            evaluation.on_undo(record)
+            assert evaluation.indices == pattern_indices(tracked.black, tracked.white)
+
+
+def test_batch_matches_evaluate_board(evaluation):
+    np = pytest.importorskip("numpy")
+    rng = random.Random(1)
+    positions = []
+    for _ in range(GAMES):
+        board, records = random_game(rng)
+        # Every position of the game, including the final one
+        for record in reversed(records):
+            positions.append((board.black, board.white, rng.choice((BLACK, WHITE))))
+            board.undo(record)
+    blacks, whites, players = zip(*positions)
+    scores = evaluation.evaluate_batch(np.array(blacks, dtype=np.uint64), np.array(whites, dtype=np.uint64),
+                                       np.array(players))
+    expected = [evaluation.evaluate_board(Board.from_bitboards(black, white), player)
+                for black, white, player in positions]
+    assert scores.tolist() == expected
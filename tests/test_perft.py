@@ -0,0 +1,23 @@
+"""Move generation against the reference perft counts of benchmarks.perft."""
+import pytest
+
+from benchmarks.perft import perft, perft_cases
+from core.board import Board
+from core.constants import BLACK
+
+# Deeper cases take minutes in pure Python; python -m benchmarks.perft 9 runs them all
+MAX_DEPTH = 7
+CASES = perft_cases(MAX_DEPTH)
+
+
+@pytest.mark.parametrize("name, board, player, depth, expected", CASES,
+                         ids=[f"{name}-{depth}" for name, _, _, depth, _ in CASES])
+def test_perft(name, board, player, depth, expected):
+    assert perft(board, player, depth) == expected
+
+
+def test_perft_leaves_board_unchanged():
+    board = Board()
+    before = (board.black, board.white, board.hash)
+    perft(board, BLACK, 4)
+    assert (board.black, board.white, board.hash) == before
@@ -0,0 +1,135 @@
+"""Minimax against a plain negamax, with its transposition table and selectivity, and against its parallel search."""
+import random
+
+import pytest
+
+from ai.algorithm import CHECK_INTERVAL, Minimax
+from ai.transposition import TranspositionTable
+from core.board import iter_bits
+from core.game_state import GameState
+
+
+def random_positions(count, seed=0, min_plies=10, max_plies=40):
+    """(board, player) midgame positions with at least two moves, from random games."""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        state = GameState()
+        for _ in range(rng.randrange(min_plies, max_plies)):
+            if state.game_over:
+                break
+            state.apply_move(*rng.choice(state.board.get_valid_moves(state.current_player)))
+        if not state.game_over and len(state.board.get_valid_moves(state.current_player)) > 1:
+            positions.append((state.board, state.current_player))
+    return positions
+
+
+def plain_negamax(evaluate, board, depth, player):
+    """Full-width negamax with the search's conventions: passes are free and the game end is a leaf."""
+    moves = board.valid_moves_mask(player)
+    if depth == 0 or not (moves or board.valid_moves_mask(-player)):
+        return evaluate.evaluate_board(board, player)
+    if not moves:
+        return -plain_negamax(evaluate, board, depth, -player)
+    best = None
+    for sq in iter_bits(moves):
+        child = board.make_move(*divmod(sq, board.size), player)
+        score = -plain_negamax(evaluate, child, depth - 1, -player)
+        best = score if best is None else max(best, score)
+    return best
+
+
+def root_values(search, board, player, depth):
+    """Plain negamax value of every root move, for a search of `depth` plies below the root move."""
+    return {move: -plain_negamax(search.evaluate, board.make_move(*move, player), depth, -player)
+            for move in board.get_valid_moves(player)}
+
+
+@pytest.mark.parametrize("pattern_eval", (False, True), ids=("discs", "patterns"))
+@pytest.mark.parametrize("depth", (0, 1, 2))
+def test_search_matches_plain_negamax(depth, pattern_eval):
+    # Aspiration windows, PVS re-searches, killers and history must not change the value
+    search = Minimax(pattern_eval=pattern_eval)
+    for board, player in random_positions(8, seed=depth):
+        move, stats = search.search(board, player, depth=depth)
+        values = root_values(search, board, player, depth)
+        assert stats.score == max(values.values())
+        assert values[move] == stats.score
+
+
+@pytest.mark.parametrize("pattern_eval", (False, True), ids=("discs", "patterns"))
+def test_transposition_table_keeps_root_score(pattern_eval):
+    plain = Minimax(pattern_eval=pattern_eval)
+    # A fresh table per search, and one kept across searches as the agents do
+    shared = Minimax(TranspositionTable(size_mb=8), pattern_eval=pattern_eval)
+    for board, player in random_positions(8, seed=3):
+        for depth in (3, 4):
+            score = plain.search(board, player, depth=depth)[1].score
+            fresh = Minimax(TranspositionTable(size_mb=8), pattern_eval=pattern_eval)
+            assert fresh.search(board, player, depth=depth)[1].score == score
+            assert shared.search(board, player, depth=depth)[1].score == score
+
+
+@pytest.mark.parametrize("use_tt", (False, True), ids=("no-tt", "tt"))
+def test_parallel_matches_serial_across_searches(use_tt):
+    # One instance of each for every search, as an agent uses them over a game
+    serial = Minimax(TranspositionTable(size_mb=8) if use_tt else None)
+    parallel = Minimax(TranspositionTable(size_mb=8) if use_tt else None, workers=2)
+    try:
+        for board, player in random_positions(10):
+            for depth in (4, 5):
+                move, stats = serial.search(board, player, depth=depth)
+                parallel_move, parallel_stats = parallel.search(board, player, depth=depth)
+                assert parallel_move == move
+                assert parallel_stats.score == stats.score
+    finally:
+        parallel.close()
+
+
+def test_selectivity_off_is_the_plain_search():
+    plain = Minimax(pattern_eval=True)
+    # Every selective option given, but both switches off
+    off = Minimax(pattern_eval=True, probcut=False, probcut_confidence=0.5, lmr=False, lmr_moves=1, lmr_reduction=2)
+    for board, player in random_positions(6, seed=5):
+        move, stats = plain.search(board, player, depth=5)
+        off_move, off_stats = off.search(board, player, depth=5)
+        assert (off_move, off_stats.score, off_stats.nodes) == (move, stats.score, stats.nodes)
+        assert off_stats.probcut_tries == off_stats.probcut_cuts == 0
+        assert off_stats.lmr_reductions == off_stats.lmr_researches == 0
+
+
+def test_selectivity_counters():
+    search = Minimax(pattern_eval=True, probcut=True, lmr=True)
+    probcut_cuts = lmr_reductions = 0
+    for board, player in random_positions(4, seed=6):
+        move, stats = search.search(board, player, depth=6)
+        assert move in board.get_valid_moves(player)
+        assert stats.probcut_cuts <= stats.probcut_tries
+        assert stats.lmr_researches <= stats.lmr_reductions
+        probcut_cuts += stats.probcut_cuts
+        lmr_reductions += stats.lmr_reductions
+    assert probcut_cuts > 0
+    assert lmr_reductions > 0
+
+
+@pytest.mark.parametrize("node_limit", (1, 500, 5000))
+def test_node_limit(node_limit):
+    search = Minimax(TranspositionTable(size_mb=8), pattern_eval=True)
+    for board, player in random_positions(5, seed=7):
+        move, stats = search.search(board, player, depth=60, node_limit=node_limit)
+        # The first iteration always finishes, so there is a move however small the budget
+        assert move in board.get_valid_moves(player)
+        assert stats.depth is not None and stats.depth >= 0
+        # The budget is checked every CHECK_INTERVAL nodes; a one-ply first iteration may pass it
+        first_iteration = stats.nodes_per_depth[0]
+        assert stats.nodes <= max(node_limit, first_iteration) + CHECK_INTERVAL
+        # ... and the search only stops once the budget is used up
+        assert stats.nodes >= node_limit
+
+
+def test_time_limit_still_returns_a_move():
+    search = Minimax(pattern_eval=True)
+    for board, player in random_positions(5, seed=8):
+        move, stats = search.search(board, player, depth=60, time_limit=1e-6)
+        assert move in board.get_valid_moves(player)
+        assert stats.depth == 0
@@ -0,0 +1,73 @@
+"""The game server's line protocol, over a real socket with one pool worker."""
+import asyncio
+import json
+import random
+
+import pytest
+
+from modes.server import GameServer
+
+
+class Client:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    async def send(self, line):
+        self.writer.write(line.encode() + b"\n")
+        await self.writer.drain()
+        return json.loads(await self.reader.readline())
+
+    async def request(self, **request):
+        return await self.send(json.dumps(request))
+
+
+def serve(test):
+    """Runs test(server, client) against a fresh server."""
+    async def run():
+        server = GameServer(workers=1)
+        port = await server.start(port=0)
+        client = Client(*await asyncio.open_connection("127.0.0.1", port))
+        try:
+            await test(server, client)
+        finally:
+            client.writer.close()
+            await server.close()
+    asyncio.run(run())
+
+
+def test_bad_requests():
+    async def test(server, client):
+        for line in ("{not json", "[]", "3", '"new"', "null"):
+            reply = await client.send(line)
+            assert reply['ok'] is False and reply['retry'] is False
+        assert (await client.request(op="launch", id=7)) == {'ok': False, 'error': "unknown op 'launch'",
+                                                              'retry': False, 'id': 7}
+        assert (await client.request(op="new", difficulty="expert"))['ok'] is False
+        assert (await client.request(op="state", session="nope"))['error'] == "unknown or expired session"
+        # The connection is still usable after every error
+        assert (await client.request(op="stats"))['ok'] is True
+    serve(test)
+
+
+def test_full_game():
+    async def test(server, client):
+        rng = random.Random(0)
+        reply = await client.request(op="new", difficulty="beginner", color="white", id="a")
+        assert reply['id'] == "a" and reply['human'] == "white" and len(reply['ai_moves']) == 1
+        session = reply['session']
+
+        assert (await client.request(op="move", session=session, move=[0, 0]))['error'] == "illegal move [0, 0]"
+        while not reply['game_over']:
+            assert reply['to_move'] == "white" and reply['moves']
+            reply = await client.request(op="move", session=session, move=rng.choice(reply['moves']))
+            assert reply['ok'] is True
+        black, white = reply['discs']
+        assert reply['board'].count("X") == black and reply['board'].count("O") == white
+        assert reply['winner'] == ("black" if black > white else "white" if white > black else "draw")
+
+        assert (await client.request(op="state", session=session))['game_over'] is True
+        assert (await client.request(op="close", session=session))['ok'] is True
+        assert (await client.request(op="state", session=session))['ok'] is False
+        assert (await client.request(op="stats"))['ai_moves'] > 0
+    serve(test)
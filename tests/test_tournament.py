@@ -0,0 +1,52 @@
+"""Tournament ratings: the Bradley-Terry fit on pairwise scores with known answers."""
+import math
+
+import pytest
+
+from modes.tournament import ELO_SCALE, elo_from_score, fit_ratings
+
+
+def expected_scores(ratings, games):
+    """pair_scores where every pair scored exactly what the ratings predict."""
+    pair_scores = {}
+    for a, ra in ratings.items():
+        for b, rb in ratings.items():
+            if a != b:
+                pair_scores[(a, b)] = (games / (1 + math.exp((rb - ra) / ELO_SCALE)), games)
+    return pair_scores
+
+
+def test_two_agents_match_the_score():
+    # 75% over 100 games is odds of 3:1
+    ratings = fit_ratings(["a", "b"], {("a", "b"): (75, 100), ("b", "a"): (25, 100)})
+    assert ratings["a"] == (0.0, 0.0)
+    rating, error = ratings["b"]
+    assert rating == pytest.approx(-ELO_SCALE * math.log(3))
+    # With a single opponent the fit is the plain score-to-Elo conversion
+    assert (rating, error) == pytest.approx(elo_from_score(0.25, 100))
+
+
+def test_ratings_are_recovered():
+    truth = {"a": 0.0, "b": 150.0, "c": -200.0, "d": 40.0}
+    ratings = fit_ratings(list(truth), expected_scores(truth, 50))
+    for spec, rating in truth.items():
+        assert ratings[spec][0] == pytest.approx(rating, abs=1e-6)
+    assert ratings["a"][1] == 0.0
+    assert all(error > 0 for spec, (_, error) in ratings.items() if spec != "a")
+
+
+def test_even_scores_are_equal_ratings():
+    specs = ["a", "b", "c"]
+    ratings = fit_ratings(specs, {(a, b): (10, 20) for a in specs for b in specs if a != b})
+    assert [rating for rating, _ in ratings.values()] == pytest.approx([0.0, 0.0, 0.0])
+
+
+def test_perfect_scores_are_unrated():
+    pair_scores = {("a", "b"): (6, 10), ("b", "a"): (4, 10),
+                   ("a", "c"): (10, 10), ("c", "a"): (0, 10),
+                   ("b", "c"): (10, 10), ("c", "b"): (0, 10)}
+    ratings = fit_ratings(["a", "b", "c", "d"], pair_scores)
+    # c lost every game and d played none: neither has a finite rating
+    assert ratings["c"] == ratings["d"] == (None, None)
+    assert ratings["a"][0] == 0.0
+    assert ratings["b"][0] == pytest.approx(-ELO_SCALE * math.log(1.5))
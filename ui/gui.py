@@ -1,10 +1,15 @@
 import customtkinter as ctk
+from tkinter import filedialog
+import threading
 import time
+from collections import deque
 import sys
 import os
 
-from core.constants import BLACK, WHITE, EMPTY, COLOR_MAP
+from core.constants import BLACK, WHITE, COLOR_MAP
 from core.game_controller import GameController
+from core.game_record import RecordWriter, Replay, record_offsets, read_record_at
+from modes.ava import MATCHUPS
 
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -25,64 +30,194 @@ COLOR_CELL_1 = "#266337"
 COLOR_CELL_HOVER = "#36804a"
 COLOR_LOSS_RED = "#ff5555"
 
-class BoardCell(ctk.CTkFrame):
-    def __init__(self, master, r, c, size, click_callback):
-        super().__init__(master, width=size, height=size, fg_color=COLOR_CELL_1, corner_radius=4)
-        self.pack_propagate(False)
-        self.r = r
-        self.c = c
-        self.click_callback = click_callback 
-        self.piece_frame = None
-        
-        # State tracking to prevent flickering
-        self.last_state = "empty" # "empty", "hint", "piece"
-        self.last_color = None
-
-        self.bind("<Enter>", self.on_enter)
-        self.bind("<Leave>", self.on_leave)
-        self.bind("<Button-1>", self.on_click) 
-
-    def on_enter(self, event):
-        # Only hover if empty
-        if self.last_state == "empty": 
-            self.configure(fg_color=COLOR_CELL_HOVER)
-    
-    def on_leave(self, event):
-        self.configure(fg_color=COLOR_CELL_1)
+# Saved games (see core.game_record)
+GAME_FILE_EXTENSION = ".othr"
+GAME_FILE_TYPES = [("Othello games", "*.othr"), ("All files", "*")]
+
+# Board drawing
+BOARD_MARGIN = 8
+CELL_GAP = 4
+HINT_DOT = 6  # radius
+# Delay before an AI move is shown, in ms; AvA games can change it from the speed control
+AI_MOVE_DELAY = 600
+AVA_SPEEDS = {"Slow": 1200, "Normal": 600, "Fast": 150, "Max": 0}
+# Menu names of the agent difficulties (see PvAMode.create_agent)
+DIFFICULTY_NAMES = {"beginner": "Beginner", "intermediate": "Intermediate", "advanced": "Advanced", "mcts": "MCTS"}
+# Uncapped AvA games draw at most one frame per display refresh
+FRAME_INTERVAL = 1 / 60
+# Analysis heatmap: the best move gets HEAT_HOT, moves HEAT_RANGE discs worse or more HEAT_COLD
+HEAT_HOT = (0x2c, 0xc9, 0x85)
+HEAT_COLD = (0x7a, 0x2a, 0x2a)
+HEAT_RANGE = 12
+
+
+def square_states(board, hints=(), heat=None):
+    """
+    What each of the 64 squares shows: a disc colour, "hint", "empty", or for
+    squares in heat (square -> (colour, label, best)) ("heat", colour, label, best).
+    """
+    black, white = board.black, board.white
+    states = []
+    for sq in range(64):
+        if black >> sq & 1:
+            states.append(COLOR_MAP[BLACK])
+        elif white >> sq & 1:
+            states.append(COLOR_MAP[WHITE])
+        elif heat and sq in heat:
+            states.append(("heat",) + heat[sq])
+        elif sq in hints:
+            states.append("hint")
+        else:
+            states.append("empty")
+    return states
+
+
+def heat_map(results):
+    """Heatmap squares for analysis results [(move, score in discs, line)], best first."""
+    if not results:
+        return {}
+    best = results[0][1]
+    heat = {}
+    for i, ((r, c), score, _) in enumerate(results):
+        warmth = 1 - min(1.0, (best - score) / HEAT_RANGE)
+        color = "#" + "".join(f"{round(lo + (hi - lo) * warmth):02x}" for lo, hi in zip(HEAT_COLD, HEAT_HOT))
+        label = f"{max(-64, min(64, score)):+.0f}"
+        heat[r * 8 + c] = (color, label, i == 0)
+    return heat
+
+
+class BoardCanvas(ctk.CTkCanvas):
+    """
+    The whole board on one canvas. The items of every square are created once;
+    render() compares the new square states with the drawn ones and only
+    reconfigures the squares that changed.
+    """
+    def __init__(self, master, size, click_callback):
+        super().__init__(master, width=size, height=size, bg=COLOR_BOARD_MAT, highlightthickness=0)
+        self.click_callback = click_callback
+        self.cell_size = (size - 2 * BOARD_MARGIN) / 8
+        self.cells = []              # per square: (background, disc, hint dot, heat label) item ids
+        self.drawn = ["empty"] * 64  # per square: the state on screen
+        self.hover = None
+
+        for sq in range(64):
+            r, c = divmod(sq, 8)
+            x0 = BOARD_MARGIN + c * self.cell_size + CELL_GAP / 2
+            y0 = BOARD_MARGIN + r * self.cell_size + CELL_GAP / 2
+            x1 = x0 + self.cell_size - CELL_GAP
+            y1 = y0 + self.cell_size - CELL_GAP
+            inset = (x1 - x0) * 0.125
+            cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+            background = self.create_rectangle(x0, y0, x1, y1, fill=COLOR_CELL_1, outline=COLOR_GOLD, width=0)
+            disc = self.create_oval(x0 + inset, y0 + inset, x1 - inset, y1 - inset, outline="", state="hidden")
+            dot = self.create_oval(cx - HINT_DOT, cy - HINT_DOT, cx + HINT_DOT, cy + HINT_DOT,
+                                   fill=COLOR_GOLD, outline="", state="hidden")
+            label = self.create_text(cx, cy, text="", fill=COLOR_TEXT_MAIN, font=("Roboto", 16, "bold"), state="hidden")
+            self.cells.append((background, disc, dot, label))
+
+        self.bind("<Button-1>", self.on_click)
+        self.bind("<Motion>", self.on_motion)
+        self.bind("<Leave>", lambda e: self.set_hover(None))
+
+    def square_at(self, x, y):
+        c = int((x - BOARD_MARGIN) // self.cell_size)
+        r = int((y - BOARD_MARGIN) // self.cell_size)
+        if 0 <= r < 8 and 0 <= c < 8:
+            return r * 8 + c
+        return None
 
     def on_click(self, event):
-        if self.click_callback: self.click_callback(self.r, self.c)
+        sq = self.square_at(event.x, event.y)
+        if sq is not None and self.click_callback:
+            self.click_callback(*divmod(sq, 8))
 
-    def set_state(self, state_type, color=None):
-      
-        if self.last_state == state_type and self.last_color == color:
-            return
+    def on_motion(self, event):
+        self.set_hover(self.square_at(event.x, event.y))
 
-        if self.last_state == "piece" and state_type == "piece" and self.piece_frame:
-            self.piece_frame.configure(fg_color=color)
-            self.last_color = color
+    def set_hover(self, sq):
+        if sq == self.hover:
             return
-
-        if self.piece_frame:
-            self.piece_frame.destroy()
-            self.piece_frame = None
-        
-        self.configure(fg_color=COLOR_CELL_1, border_width=0)
-
-        if state_type == "piece":
-            size = self.winfo_reqwidth() * 0.75
-            self.piece_frame = ctk.CTkFrame(self, width=size, height=size, corner_radius=size/2, fg_color=color, bg_color="transparent")
-            self.piece_frame.place(relx=0.5, rely=0.5, anchor="center")
-            self.piece_frame.bind("<Button-1>", self.on_click)
-            
-        elif state_type == "hint":
-            self.configure(border_width=2, border_color=COLOR_GOLD)
-            self.piece_frame = ctk.CTkFrame(self, width=12, height=12, corner_radius=6, fg_color=COLOR_GOLD)
-            self.piece_frame.place(relx=0.5, rely=0.5, anchor="center")
-            self.piece_frame.bind("<Button-1>", self.on_click)
-
-        self.last_state = state_type
-        self.last_color = color
+        if self.hover is not None:
+            self.itemconfigure(self.cells[self.hover][0], fill=COLOR_CELL_1)
+        self.hover = sq
+        # Only empty squares light up
+        if sq is not None and self.drawn[sq] == "empty":
+            self.itemconfigure(self.cells[sq][0], fill=COLOR_CELL_HOVER)
+
+    def render(self, states):
+        """Draws the squares whose state changed; returns how many did."""
+        changed = 0
+        for sq, state in enumerate(states):
+            if state != self.drawn[sq]:
+                self.draw_square(sq, state)
+                changed += 1
+        return changed
+
+    def draw_square(self, sq, state):
+        background, disc, dot, label = self.cells[sq]
+        if isinstance(state, tuple):
+            # Analysed move: coloured by how it scores, labelled with the score, the best one outlined
+            _, color, text, best = state
+            self.itemconfigure(background, fill=color, width=2 if best else 0)
+            self.itemconfigure(disc, state="hidden")
+            self.itemconfigure(dot, state="hidden")
+            self.itemconfigure(label, text=text, state="normal")
+            self.drawn[sq] = state
+            return
+        hovered = sq == self.hover and state == "empty"
+        self.itemconfigure(background, fill=COLOR_CELL_HOVER if hovered else COLOR_CELL_1,
+                           width=2 if state == "hint" else 0)
+        if state in ("empty", "hint"):
+            self.itemconfigure(disc, state="hidden")
+        else:
+            self.itemconfigure(disc, fill=state, state="normal")
+        self.itemconfigure(dot, state="normal" if state == "hint" else "hidden")
+        self.itemconfigure(label, state="hidden")
+        self.drawn[sq] = state
+
+
+class FrameStats:
+    """Render timing of a game screen over the last few seconds: frame time and updates per second."""
+    def __init__(self, window=2.0):
+        self.window = window
+        self.frames = deque()   # (time, seconds spent drawing, squares redrawn)
+        self.updates = deque()  # time of every board update the controller reported
+
+    def _trim(self, now):
+        while self.frames and now - self.frames[0][0] > self.window:
+            self.frames.popleft()
+        while self.updates and now - self.updates[0] > self.window:
+            self.updates.popleft()
+
+    def add_update(self):
+        now = time.perf_counter()
+        self.updates.append(now)
+        self._trim(now)
+
+    def add_frame(self, seconds, squares):
+        now = time.perf_counter()
+        self.frames.append((now, seconds, squares))
+        self._trim(now)
+
+    @property
+    def frame_ms(self):
+        return 1000 * sum(f[1] for f in self.frames) / len(self.frames) if self.frames else 0.0
+
+    @property
+    def max_frame_ms(self):
+        return 1000 * max((f[1] for f in self.frames), default=0.0)
+
+    @property
+    def updates_per_sec(self):
+        return len(self.updates) / self.window
+
+    @property
+    def frames_per_sec(self):
+        return len(self.frames) / self.window
+
+    def summary(self):
+        return (f"{self.updates_per_sec:.0f} updates/s · {self.frames_per_sec:.0f} fps · "
+                f"{self.frame_ms:.1f} ms/frame (max {self.max_frame_ms:.1f})")
 
 class GameScreen(ctk.CTkFrame):
     def __init__(self, master, on_back, agent_black, agent_white):
@@ -110,22 +245,25 @@ class GameScreen(ctk.CTkFrame):
         BOARD_SIZE = 750
         self.board_frame = ctk.CTkFrame(self, width=BOARD_SIZE, height=BOARD_SIZE, fg_color=COLOR_BOARD_MAT, corner_radius=8)
         self.board_frame.pack(pady=5)
-        
-        self.grid_inner = ctk.CTkFrame(self.board_frame, fg_color="transparent")
-        self.grid_inner.place(relx=0.5, rely=0.5, anchor="center")
-
-        self.cells = []
-        cell_size = (BOARD_SIZE - 24) / 8
-        for r in range(8):
-            row_cells = []
-            for c in range(8):
-                cell = BoardCell(self.grid_inner, r, c, cell_size, self.handle_cell_click)
-                cell.grid(row=r, column=c, padx=2, pady=2)
-                row_cells.append(cell)
-            self.cells.append(row_cells)
+
+        self.board_canvas = BoardCanvas(self.board_frame, BOARD_SIZE - 16, self.handle_cell_click)
+        self.board_canvas.place(relx=0.5, rely=0.5, anchor="center")
+
+        # AvA games get a speed control; the other modes show AI moves after a fixed pause
+        self.is_ava = bool(agent_black and agent_white)
+        self.move_delay = AI_MOVE_DELAY
+        self.frame_stats = FrameStats()
+        self._render_job = None
+        self._last_frame = 0.0
+        self._last_stats_text = 0.0
+        self._shown = None  # (black score, white score, player to move) on the score cards
+        self._history_shown = None  # (can undo, can redo) on the Undo/Redo buttons
+        # Latest analysis of the position on screen: square -> heatmap entry, None while there is none
+        self.heat = None
 
         self.bottom_bar = ctk.CTkFrame(self, fg_color="transparent")
         self.bottom_bar.pack(side="bottom", pady=30)
+        self.setup_bottom_buttons()
         
         # --- Initialize Controller ---
         self.controller = GameController(
@@ -134,56 +272,99 @@ class GameScreen(ctk.CTkFrame):
             callbacks={
                 'on_update': self.update_gui,
                 'on_status': self.update_status,
-                'on_ai_result': self.handle_ai_result
-            }
+                'on_ai_result': self.handle_ai_result,
+                'on_analysis': self.handle_analysis
+            },
+            ponder=True
         )
         
         # Initial Draw
         self.update_gui()
 
+    def destroy(self):
+        # Leaving the game (menu): stop the AI's background work first
+        if self.controller:
+            self.controller.close()
+        if self._render_job:
+            self.after_cancel(self._render_job)
+        super().destroy()
+
     def handle_cell_click(self, r, c):
         if self.controller:
             self.controller.handle_click(r, c)
 
     # --- UI CALLBACKS ---
     def handle_ai_result(self, move):
-        self.after(600, lambda: self.controller.finish_ai_move(move))
+        # Tag the result with the game it belongs to; a restart before it is shown makes it stale
+        # (the first AI move can finish before the controller is assigned; that is generation 0)
+        generation = self.controller.generation if self.controller else 0
+        self.after(self.move_delay, lambda: self.controller.finish_ai_move(move, generation))
+
+    def handle_analysis(self, results, stats, generation):
+        # Called on the analysis thread every time the analysis gets one ply deeper
+        self.after(0, lambda: self.show_analysis(results, stats, generation))
+
+    def show_analysis(self, results, stats, generation):
+        if not self.controller or generation != self.controller.analysis_generation:
+            return  # the board changed since; a new analysis is on its way
+        self.heat = heat_map(results)
+        self.render()
+        turn = "Black's Turn" if self.controller.get_current_player() == BLACK else "White's Turn"
+        self.lbl_status.configure(text=f"{turn} · analysis depth {stats.depth}", text_color=COLOR_GOLD)
+
+    def toggle_analysis(self):
+        enabled = bool(self.analysis_switch.get())
+        self.controller.set_analysis(enabled)
+        if not enabled:
+            self.heat = None
+            self.render()
+
+    def set_speed(self, name):
+        self.move_delay = AVA_SPEEDS[name]
 
     def update_status(self, text, is_busy=False):
+        # Search progress arrives from the AI thread; Tk may only be touched from the main thread
+        if threading.current_thread() is not threading.main_thread():
+            self.after(0, lambda: self.update_status(text, is_busy))
+            return
         self.lbl_status.configure(text=text, text_color=COLOR_ACCENT if is_busy else COLOR_GOLD)
 
     def update_gui(self):
+        """Called on every board change; draws now, or at the next frame when moves come uncapped"""
+        self.frame_stats.add_update()
+        self.heat = None  # belongs to the previous position
+        if self.move_delay > 0:
+            self.render()
+        elif self._render_job is None:
+            wait = self._last_frame + FRAME_INTERVAL - time.perf_counter()
+            self._render_job = self.after(max(0, int(wait * 1000)), self.render)
+
+    def render(self):
         """Reads state from Controller and paints the screen"""
-        # 1. Update Buttons
-        self.setup_bottom_buttons()
+        self._render_job = None
+        start = time.perf_counter()
 
-        # 2. Get Data (Purely read from controller)
+        # 1. Get Data (Purely read from controller)
         board = self.controller.get_board()
         current_plr = self.controller.get_current_player()
         is_game_over = self.controller.is_game_over()
         
-        # 3. Update Grid
-        valid_moves = self.controller.get_valid_moves()
-        show_hints = self.controller.should_show_hints()
-
-        for r in range(8):
-            for c in range(8):
-                cell = self.cells[r][c]
-                val = board.grid[r][c]
-                
-                if val != EMPTY:
-                    cell.set_state("piece", COLOR_MAP[val])
-                elif show_hints and (r, c) in valid_moves:
-                    cell.set_state("hint")
-                else:
-                    cell.set_state("empty")
-
-        # 4. Update Scores
-        b, w = self.controller.get_scores()
-        self.lbl_score_black.configure(text=str(b))
-        self.lbl_score_white.configure(text=str(w))
+        # 2. Update Grid: only the squares that changed since the last frame
+        hints = set()
+        if self.controller.should_show_hints():
+            hints = {r * 8 + c for r, c in self.controller.get_valid_moves()}
+        squares = self.board_canvas.render(square_states(board, hints, self.heat))
 
-        # 5. Update Status Pill
+        # 3. Update Scores and Highlight Active Score Card
+        b, w = self.controller.get_scores()
+        if self._shown != (b, w, current_plr):
+            self._shown = (b, w, current_plr)
+            self.lbl_score_black.configure(text=str(b))
+            self.lbl_score_white.configure(text=str(w))
+            self.card_black.configure(border_width=2 if current_plr == BLACK else 0, border_color=COLOR_GOLD)
+            self.card_white.configure(border_width=2 if current_plr == WHITE else 0, border_color=COLOR_GOLD)
+
+        # 4. Update Status Pill
         if is_game_over:
             self.lbl_status.configure(text="Game Over", text_color=COLOR_GOLD)
             self.show_game_over_overlay()
@@ -191,26 +372,81 @@ class GameScreen(ctk.CTkFrame):
             txt = "Black's Turn" if current_plr == BLACK else "White's Turn"
             self.lbl_status.configure(text=txt, text_color=COLOR_GOLD)
 
-        # 6. Highlight Active Score Card
-        self.card_black.configure(border_width=2 if current_plr == BLACK else 0, border_color=COLOR_GOLD)
-        self.card_white.configure(border_width=2 if current_plr == WHITE else 0, border_color=COLOR_GOLD)
+        if not self.is_ava:
+            history = (self.controller.can_undo(), self.controller.can_redo())
+            if self._history_shown != history:
+                self._history_shown = history
+                self.btn_undo.configure(state="normal" if history[0] else "disabled")
+                self.btn_redo.configure(state="normal" if history[1] else "disabled")
 
-    def setup_bottom_buttons(self):
-        for widget in self.bottom_bar.winfo_children(): widget.destroy()
+        now = time.perf_counter()
+        self._last_frame = now
+        self.frame_stats.add_frame(now - start, squares)
+        if self.is_ava and now - self._last_stats_text > 0.5:
+            self._last_stats_text = now
+            self.lbl_frame_stats.configure(text=self.frame_stats.summary())
 
+    def setup_bottom_buttons(self):
         self.btn_menu = ctk.CTkButton(self.bottom_bar, text="Menu", font=("Roboto", 14), fg_color=COLOR_CARD_BG, text_color="white", hover_color=COLOR_CARD_HOVER, width=120, height=40, corner_radius=8, command=self.on_back)
         self.btn_menu.pack(side="left", padx=15)
         
         self.btn_restart = ctk.CTkButton(self.bottom_bar, text="Restart", font=("Roboto", 14, "bold"), fg_color=COLOR_ACCENT, text_color="black", hover_color="#24a36b", width=120, height=40, corner_radius=8, command=self.restart_game_ui)
         self.btn_restart.pack(side="left", padx=15)
 
-    def restart_game_ui(self):
+        self.btn_save = ctk.CTkButton(self.bottom_bar, text="Save", font=("Roboto", 14), fg_color=COLOR_CARD_BG, text_color="white", hover_color=COLOR_CARD_HOVER, width=120, height=40, corner_radius=8, command=self.save_game)
+        self.btn_save.pack(side="left", padx=15)
+
+        if not self.is_ava:
+            self.btn_undo = ctk.CTkButton(self.bottom_bar, text="Undo", font=("Roboto", 14), fg_color=COLOR_CARD_BG, text_color="white", hover_color=COLOR_CARD_HOVER, width=90, height=40, corner_radius=8, command=self.undo_ui)
+            self.btn_undo.pack(side="left", padx=(15, 5))
+            self.btn_redo = ctk.CTkButton(self.bottom_bar, text="Redo", font=("Roboto", 14), fg_color=COLOR_CARD_BG, text_color="white", hover_color=COLOR_CARD_HOVER, width=90, height=40, corner_radius=8, command=self.redo_ui)
+            self.btn_redo.pack(side="left", padx=(5, 15))
+
+            self.analysis_switch = ctk.CTkSwitch(self.bottom_bar, text="Analysis", font=("Roboto", 14), text_color=COLOR_TEXT_SUB,
+                                                 progress_color=COLOR_ACCENT, command=self.toggle_analysis)
+            self.analysis_switch.pack(side="left", padx=15)
+
+        if self.is_ava:
+            self.speed_selector = ctk.CTkSegmentedButton(self.bottom_bar, values=list(AVA_SPEEDS), command=self.set_speed,
+                                                         selected_color=COLOR_ACCENT, selected_hover_color="#24a36b", height=40)
+            self.speed_selector.set("Normal")
+            self.speed_selector.pack(side="left", padx=15)
+            self.lbl_frame_stats = ctk.CTkLabel(self.bottom_bar, text="", font=("Roboto", 12), text_color=COLOR_TEXT_SUB)
+            self.lbl_frame_stats.pack(side="left", padx=15)
+
+    def save_game(self):
+        """Appends the game so far to a game-record file chosen by the user."""
+        path = filedialog.asksaveasfilename(parent=self, title="Save game", defaultextension=GAME_FILE_EXTENSION,
+                                            filetypes=GAME_FILE_TYPES, confirmoverwrite=False)
+        if not path:
+            return
+        try:
+            with RecordWriter(path) as writer:
+                writer.write(self.controller.get_record())
+        except OSError as e:
+            self.update_status(f"Save failed: {e.strerror}")
+            return
+        self.update_status(f"Saved to {os.path.basename(path)}")
+
+    def clear_game_over(self):
         for widget in self.winfo_children():
             if isinstance(widget, ctk.CTkFrame) and widget not in [self.top_bar, self.board_frame, self.bottom_bar, self.status_pill]:
                 widget.destroy()
         self.game_over_shown = False
+
+    def restart_game_ui(self):
+        self.clear_game_over()
         self.controller.restart()
 
+    def undo_ui(self):
+        # Undo and redo can leave a finished game, so the overlay goes; render shows it again if needed
+        self.clear_game_over()
+        self.controller.undo()
+
+    def redo_ui(self):
+        self.clear_game_over()
+        self.controller.redo()
+
     def show_game_over_overlay(self):
         if self.game_over_shown: return
         self.game_over_shown = True
@@ -251,6 +487,74 @@ class GameScreen(ctk.CTkFrame):
         setattr(self, f"lbl_score_{name.lower()}", lbl_score)
         return card
 
+class ReplayScreen(ctk.CTkFrame):
+    """Steps through the games of a game-record file, move by move."""
+    def __init__(self, master, on_back, path):
+        # Only the offsets are kept; each game is read when it is shown. Read first, so a bad file builds no widgets
+        offsets = list(record_offsets(path))
+        super().__init__(master, fg_color="transparent")
+        self.on_back = on_back
+        self.path = path
+        self.offsets = offsets
+        self.game_index = 0
+        self.record = None
+        self.replay = None
+        self.ply = 0
+
+        self.lbl_title = ctk.CTkLabel(self, text="", font=("Roboto", 22, "bold"), text_color="white")
+        self.lbl_title.pack(pady=(25, 5))
+
+        self.status_pill = ctk.CTkFrame(self, fg_color=COLOR_CARD_BG, corner_radius=20, height=35, width=360)
+        self.status_pill.pack(pady=(10, 15))
+        self.status_pill.pack_propagate(False)
+        self.lbl_status = ctk.CTkLabel(self.status_pill, text="", font=("Roboto", 15, "bold"), text_color=COLOR_GOLD)
+        self.lbl_status.place(relx=0.5, rely=0.5, anchor="center")
+
+        BOARD_SIZE = 750
+        self.board_frame = ctk.CTkFrame(self, width=BOARD_SIZE, height=BOARD_SIZE, fg_color=COLOR_BOARD_MAT, corner_radius=8)
+        self.board_frame.pack(pady=5)
+        self.board_canvas = BoardCanvas(self.board_frame, BOARD_SIZE - 16, None)
+        self.board_canvas.place(relx=0.5, rely=0.5, anchor="center")
+
+        self.slider = ctk.CTkSlider(self, from_=0, to=1, width=BOARD_SIZE, command=lambda value: self.show_ply(round(value)),
+                                    button_color=COLOR_ACCENT, progress_color=COLOR_ACCENT)
+        self.slider.pack(pady=10)
+
+        self.bottom_bar = ctk.CTkFrame(self, fg_color="transparent")
+        self.bottom_bar.pack(side="bottom", pady=30)
+        buttons = [("Menu", self.on_back), ("⏮ Game", lambda: self.show_game(self.game_index - 1)),
+                   ("◀", lambda: self.show_ply(self.ply - 1)), ("▶", lambda: self.show_ply(self.ply + 1)),
+                   ("Game ⏭", lambda: self.show_game(self.game_index + 1))]
+        for text, command in buttons:
+            ctk.CTkButton(self.bottom_bar, text=text, font=("Roboto", 14), fg_color=COLOR_CARD_BG, text_color="white", hover_color=COLOR_CARD_HOVER, width=100, height=40, corner_radius=8, command=command).pack(side="left", padx=10)
+
+        if self.offsets:
+            self.show_game(len(self.offsets) - 1)
+        else:
+            self.lbl_title.configure(text="No games in this file")
+
+    def show_game(self, index):
+        if not 0 <= index < len(self.offsets):
+            return
+        self.game_index = index
+        self.record = read_record_at(self.path, self.offsets[index])
+        self.replay = Replay(self.record)
+        result = f"{self.record.result:+d}" if self.record.complete else "unfinished"
+        self.lbl_title.configure(text=f"Game {index + 1}/{len(self.offsets)} · {self.record.black} vs {self.record.white} · {result}")
+        self.slider.configure(to=max(1, len(self.replay)), number_of_steps=max(1, len(self.replay)))
+        self.show_ply(len(self.replay))
+
+    def show_ply(self, ply):
+        if self.replay is None or not 0 <= ply <= len(self.replay):
+            return
+        self.ply = ply
+        board, player = self.replay.position(ply)
+        self.board_canvas.render(square_states(board))
+        self.slider.set(ply)
+        side = "Black" if player == BLACK else "White"
+        self.lbl_status.configure(text=f"Move {ply}/{len(self.replay)} · {side} to move · {board.black_count}-{board.white_count}")
+
+
 class GameModeButton(ctk.CTkFrame):
     def __init__(self, master, title, description, icon, command=None):
         super().__init__(master, fg_color=COLOR_CARD_BG, corner_radius=15, height=90, width=500)
@@ -274,11 +578,12 @@ class GameModeButton(ctk.CTkFrame):
         if self.command: self.command()
 
 class MenuScreen(ctk.CTkFrame):
-    def __init__(self, master, start_pvp, start_pva, start_ava):
+    def __init__(self, master, start_pvp, start_pva, start_ava, start_replay=None):
         super().__init__(master, fg_color="transparent")
         self.start_pvp = start_pvp
         self.start_pva = start_pva
         self.start_ava = start_ava
+        self.start_replay = start_replay
         
         try:
             self.after(100, lambda: self.master.state("zoomed"))
@@ -298,7 +603,9 @@ class MenuScreen(ctk.CTkFrame):
 
         GameModeButton(self.center_box, "Player vs Player", "Local Multiplayer", "👥", command=self.start_pvp).pack(pady=8)
         GameModeButton(self.center_box, "Player vs Computer", "Challenge the AI", "🤖", command=self.show_difficulty_selection).pack(pady=8)
-        GameModeButton(self.center_box, "Computer vs Computer", "Watch AI Battle", "💻", command=self.start_ava).pack(pady=8)
+        GameModeButton(self.center_box, "Computer vs Computer", "Watch AI Battle", "💻", command=self.show_matchup_selection).pack(pady=8)
+        if self.start_replay:
+            GameModeButton(self.center_box, "Replay", "Watch Saved Games", "🎞️", command=self.start_replay).pack(pady=8)
 
     def show_difficulty_selection(self):
         for widget in self.center_box.winfo_children(): widget.destroy()
@@ -308,9 +615,22 @@ class MenuScreen(ctk.CTkFrame):
         GameModeButton(self.center_box, "Beginner", "Easy Agent", "🐣", command=lambda: self._safe_start_pva('beginner')).pack(pady=8)
         GameModeButton(self.center_box, "Intermediate", "Medium Agent", "⚖️", command=lambda: self._safe_start_pva('intermediate')).pack(pady=8)
         GameModeButton(self.center_box, "Advanced", "Hard Agent", "🔥", command=lambda: self._safe_start_pva('advanced')).pack(pady=8)
+        GameModeButton(self.center_box, "MCTS", "Tree Search Agent", "🌳", command=lambda: self._safe_start_pva('mcts')).pack(pady=8)
         
         ctk.CTkButton(self.center_box, text="Back", fg_color=COLOR_CARD_BG, width=200, height=50, command=self.show_main_menu).pack(pady=20)
 
+    def show_matchup_selection(self):
+        for widget in self.center_box.winfo_children(): widget.destroy()
+
+        ctk.CTkLabel(self.center_box, text="Select Matchup", font=("Roboto", 48, "bold"), text_color="white").pack(pady=(0, 40))
+
+        for black, white in MATCHUPS:
+            title = f"{DIFFICULTY_NAMES[black]} vs {DIFFICULTY_NAMES[white]}"
+            GameModeButton(self.center_box, title, "Black vs White", "💻",
+                           command=lambda black=black, white=white: self.start_ava(black, white)).pack(pady=8)
+
+        ctk.CTkButton(self.center_box, text="Back", fg_color=COLOR_CARD_BG, width=200, height=50, command=self.show_main_menu).pack(pady=20)
+
     def _safe_start_pva(self, level):
         try:
             self.start_pva(level)